@@ -10,7 +10,13 @@ https://docs.djangoproject.com/en/3.2/howto/deployment/asgi/
 import os
 
 from django.core.asgi import get_asgi_application
+from django.urls import get_resolver
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings')
 
 application = get_asgi_application()
+
+# Import the URLconf, and so every view and serializer, now rather than
+# during the first request, so each gunicorn worker has them loaded
+# before it accepts connections.
+get_resolver().url_patterns
@@ -44,6 +44,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'core',
     'rest_framework.authtoken',
     'rest_framework',
@@ -82,21 +83,134 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'app.wsgi.application'
 
+# How scripts/run.sh serves the app: 'wsgi' with uWSGI, or 'asgi' with
+# gunicorn and uvicorn workers. In ASGI mode each process serves reads
+# of the hot endpoints on ASGI_READ_THREADS threads, each of which may
+# hold a database connection (see core.async_views).
+
+SERVER_MODE = os.environ.get('SERVER_MODE', 'wsgi')
+ASGI_READ_THREADS = int(os.environ.get('ASGI_READ_THREADS', 8))
+
 
 # Database
 # https://docs.djangoproject.com/en/3.2/ref/settings/#databases
 
 
+# core.db.backends.postgresql adds HEALTH_CHECKS and POOL to Django's
+# backend. Connections are kept for DB_CONN_MAX_AGE seconds and checked
+# before each request reuses them. With DB_POOL_SIZE above zero each
+# process instead hands connections back to a pool of that many at the
+# end of each request. Behind PgBouncer in transaction mode, set
+# DB_PGBOUNCER: sessions are shared between clients, so server-side
+# cursors are disabled.
+
+DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 0))
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': 'core.db.backends.postgresql',
         'HOST': os.environ.get('DB_HOST'),
         'NAME': os.environ.get('DB_NAME'),
         'USER': os.environ.get('DB_USER'),
-        'PASSWORD': os.environ.get('DB_PASS')
+        'PASSWORD': os.environ.get('DB_PASS'),
+        'CONN_MAX_AGE': (
+            0 if DB_POOL_SIZE
+            else int(os.environ.get('DB_CONN_MAX_AGE', 60))
+        ),
+        'HEALTH_CHECKS': bool(int(os.environ.get('DB_HEALTH_CHECKS', 1))),
+        'DISABLE_SERVER_SIDE_CURSORS': bool(
+            int(os.environ.get('DB_PGBOUNCER', 0))
+        ),
+        'POOL': {
+            'SIZE': DB_POOL_SIZE,
+            'MAX_LIFETIME': int(os.environ.get('DB_POOL_MAX_LIFETIME', 3600)),
+            'IDLE_TIMEOUT': int(os.environ.get('DB_POOL_IDLE_TIMEOUT', 300)),
+            'TIMEOUT': float(os.environ.get('DB_POOL_TIMEOUT', 5)),
+        },
+    }
+}
+
+# Read replica of the default database at DB_REPLICA_HOST. Safe requests
+# to the recipe endpoints read from it, except for users who wrote in the
+# last REPLICA_STICKY_SECONDS, which must exceed the replication lag.
+
+if os.environ.get('DB_REPLICA_HOST'):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'HOST': os.environ['DB_REPLICA_HOST'],
+        'NAME': os.environ.get(
+            'DB_REPLICA_NAME', DATABASES['default']['NAME']
+        ),
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['core.db.routers.ReplicaRouter']
+
+REPLICA_STICKY_SECONDS = int(os.environ.get('REPLICA_STICKY_SECONDS', 5))
+
+
+# Cache
+# https://docs.djangoproject.com/en/3.2/topics/cache/
+# The local-memory cache is private to each process, so deployments
+# running more than one worker must point REDIS_URL at a shared Redis;
+# scripts/run.sh refuses to start more than one without it.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
     }
 }
 
+if os.environ.get('REDIS_URL'):
+    CACHES['default'] = {
+        'BACKEND': 'django_redis.cache.RedisCache',
+        'LOCATION': os.environ['REDIS_URL'],
+        'OPTIONS': {
+            # Serve uncached responses instead of errors if Redis is down
+            'IGNORE_EXCEPTIONS': True,
+        },
+    }
+
+
+# Password hashing
+# PASSWORD_HASHER_PROFILE picks the hasher for new hashes: pbkdf2, argon2
+# (needs argon2-cffi) or bcrypt (needs bcrypt). The others still verify
+# existing hashes, which are replaced on the user's next login.
+
+PASSWORD_HASHER_PROFILE = os.environ.get('PASSWORD_HASHER_PROFILE', 'pbkdf2')
+_PASSWORD_HASHERS = {
+    'pbkdf2': 'user.hashers.PBKDF2PasswordHasher',
+    'argon2': 'user.hashers.Argon2PasswordHasher',
+    'bcrypt': 'user.hashers.BCryptSHA256PasswordHasher',
+}
+PASSWORD_HASHERS = [_PASSWORD_HASHERS[PASSWORD_HASHER_PROFILE]] + [
+    hasher for profile, hasher in _PASSWORD_HASHERS.items()
+    if profile != PASSWORD_HASHER_PROFILE
+]
+
+# Hasher costs; the defaults are Django 3.2's
+PASSWORD_PBKDF2_ITERATIONS = int(
+    os.environ.get('PASSWORD_PBKDF2_ITERATIONS', 260000)
+)
+PASSWORD_ARGON2_TIME_COST = int(os.environ.get('PASSWORD_ARGON2_TIME_COST', 2))
+PASSWORD_ARGON2_MEMORY_COST = int(
+    os.environ.get('PASSWORD_ARGON2_MEMORY_COST', 102400)
+)
+PASSWORD_ARGON2_PARALLELISM = int(
+    os.environ.get('PASSWORD_ARGON2_PARALLELISM', 8)
+)
+PASSWORD_BCRYPT_ROUNDS = int(os.environ.get('PASSWORD_BCRYPT_ROUNDS', 12))
+
+AUTHENTICATION_BACKENDS = ['user.backends.SlottedModelBackend']
+
+# Password hashes allowed in flight at once, counted over every process
+# sharing the cache; further logins are answered with a 503. A slot is
+# freed after LOGIN_HASH_SLOT_TIMEOUT seconds if its worker dies. In
+# ASGI mode each process hashes on LOGIN_HASH_THREADS threads of its own.
+LOGIN_HASH_SLOTS = int(os.environ.get('LOGIN_HASH_SLOTS', 2))
+LOGIN_HASH_SLOT_TIMEOUT = int(os.environ.get('LOGIN_HASH_SLOT_TIMEOUT', 30))
+LOGIN_HASH_THREADS = int(os.environ.get('LOGIN_HASH_THREADS', 2))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
@@ -140,6 +254,18 @@ MEDIA_URL = '/static/media/'
 MEDIA_ROOT ='/vol/web/media'
 STATIC_ROOT = '/vol/web/static'
 
+# Fingerprint of the static files, written when the image is built, so
+# containers started from it skip collectstatic when STATIC_ROOT holds
+# the same files
+STATIC_FINGERPRINT_FILE = BASE_DIR / 'static.fingerprint'
+
+# Uploads are named by content, so identical files are stored once
+DEFAULT_FILE_STORAGE = 'core.storage.ContentAddressedStorage'
+
+# Unreferenced media files modified more recently than this many seconds
+# are kept, as an upload of the same content may not be committed yet
+MEDIA_GC_GRACE = int(os.environ.get('MEDIA_GC_GRACE', 3600))
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/3.2/ref/settings/#default-auto-field
 
@@ -150,8 +276,66 @@ AUTH_USER_MODEL = 'core.User'
 
 REST_FRAMEWORK = {
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
+    # JSON is encoded and decoded with orjson when it is installed
+    'DEFAULT_RENDERER_CLASSES': [
+        'core.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'core.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+    'DEFAULT_AUTHENTICATION_CLASSES': [
+        'user.authentication.CachedTokenAuthentication',
+        'user.authentication.SignedTokenAuthentication',
+    ],
+    'DEFAULT_THROTTLE_RATES': {
+        'login_ip': os.environ.get('LOGIN_IP_RATE', '30/min'),
+        'login_email': os.environ.get('LOGIN_EMAIL_RATE', '10/min'),
+    },
 }
 
+# Token lookups cached by CachedTokenAuthentication: entries per process
+# and their lifetime, and the cache alias shared by all processes ('' to
+# disable) with its lifetime, in seconds
+AUTH_TOKEN_CACHE_SIZE = int(os.environ.get('AUTH_TOKEN_CACHE_SIZE', 10000))
+AUTH_TOKEN_CACHE_TTL = int(os.environ.get('AUTH_TOKEN_CACHE_TTL', 30))
+AUTH_TOKEN_SHARED_CACHE = os.environ.get('AUTH_TOKEN_SHARED_CACHE', 'default')
+AUTH_TOKEN_SHARED_CACHE_TTL = int(
+    os.environ.get('AUTH_TOKEN_SHARED_CACHE_TTL', 300)
+)
+
+# Lifetimes in seconds of signed access and refresh tokens
+SIGNED_TOKEN_ACCESS_TTL = int(os.environ.get('SIGNED_TOKEN_ACCESS_TTL', 900))
+SIGNED_TOKEN_REFRESH_TTL = int(
+    os.environ.get('SIGNED_TOKEN_REFRESH_TTL', 14 * 24 * 60 * 60)
+)
+
+# Default and maximum (?page_size=) page sizes for list endpoints
+API_PAGE_SIZE = int(os.environ.get('API_PAGE_SIZE', 100))
+API_MAX_PAGE_SIZE = int(os.environ.get('API_MAX_PAGE_SIZE', 1000))
+
+# Seconds list responses stay cached; writes invalidate them sooner
+API_CACHE_TIMEOUT = int(os.environ.get('API_CACHE_TIMEOUT', 300))
+
+# Maximum number of items accepted by /api/recipe/recipes/bulk/
+RECIPE_BULK_MAX_ITEMS = int(os.environ.get('RECIPE_BULK_MAX_ITEMS', 5000))
+
+# Largest recipe image file accepted, in bytes; keep the proxy's
+# client_max_body_size a little above it
+RECIPE_IMAGE_MAX_BYTES = int(
+    os.environ.get('RECIPE_IMAGE_MAX_BYTES', 10 * 2 ** 20)
+)
+
+# Largest recipe image accepted, in pixels (width * height)
+RECIPE_IMAGE_MAX_PIXELS = int(
+    os.environ.get('RECIPE_IMAGE_MAX_PIXELS', 40_000_000)
+)
+
+# Threads rendering image renditions in each process_image_jobs worker
+IMAGE_JOB_WORKERS = int(os.environ.get('IMAGE_JOB_WORKERS', 2))
+
 SPECTACULAR_SETTINGS = {
     'COMPONENT_SPLIT_REQUEST': True,
 }
\ No newline at end of file
@@ -26,6 +26,7 @@ urlpatterns = [
     path('api/docs/', SpectacularSwaggerView.as_view(url_name='api-schema'), name='api-docs'),
     path('api/user/',include('user.urls')),
     path('api/recipe/',include('recipe.urls')),
+    path('api/health/', include('core.urls')),
 ]
 
 if settings.DEBUG:
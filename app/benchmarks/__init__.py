@@ -0,0 +1,118 @@
+"""
+Benchmarks for the recipe API.
+
+Run a benchmark from the app directory with ``python -m benchmarks.<name>``.
+Each one creates a throwaway test database next to the configured one
+(``test_<DB_NAME>``), fills it with synthetic data, prints its results
+and drops the database again unless ``--keepdb`` is given.
+"""
+import argparse
+import os
+import statistics
+import time
+from contextlib import contextmanager
+
+import django
+
+
+def setup():
+    """Configure Django for a standalone benchmark script"""
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings')
+    django.setup()
+
+
+def get_parser(description):
+    """Return an argument parser with the options shared by benchmarks"""
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument(
+        '--keepdb', action='store_true',
+        help='Reuse the benchmark database and its data between runs',
+    )
+    return parser
+
+
+@contextmanager
+def benchmark_database(keepdb=False):
+    """Run the block against a fresh test database"""
+    from django.db import connection
+
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(
+        verbosity=0, autoclobber=True, keepdb=keepdb,
+    )
+    try:
+        yield connection
+    finally:
+        connection.creation.destroy_test_db(
+            old_name, verbosity=0, keepdb=keepdb,
+        )
+
+
+def measure(queryset, repeat):
+    """Return the median time in ms to evaluate the queryset"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        list(queryset.all())
+        timings.append((time.perf_counter() - start) * 1000)
+
+    return statistics.median(timings)
+
+
+def seed(connection, users, recipes_per_user, attrs_per_user=0,
+         links_per_recipe=0):
+    """Fill the database with synthetic users, recipes, tags, ingredients
+
+    Rows are generated inside Postgres with generate_series, which keeps
+    seeding millions of rows to seconds. Returns the created user ids.
+    Does nothing if the benchmark database already holds recipes.
+    """
+    from core.models import Recipe, User
+
+    if Recipe.objects.exists():
+        return list(User.objects.order_by('id').values_list('id', flat=True))
+
+    with connection.cursor() as cursor:
+        cursor.execute("""
+            INSERT INTO core_user (email, name, password, is_active,
+                                   is_staff, is_superuser, token_epoch)
+            SELECT 'bench' || u || '@example.com', 'Bench ' || u, '!',
+                   true, false, false, 0
+            FROM generate_series(1, %s) AS u
+        """, [users])
+        cursor.execute("""
+            INSERT INTO core_recipe (user_id, title, description,
+                                     time_minutes, price, link, updated_at,
+                                     image_renditions)
+            SELECT u.id, 'Recipe ' || r, 'Description of recipe ' || r,
+                   r %% 120, (r %% 100) + 0.99, '', now(), '{}'
+            FROM core_user AS u, generate_series(1, %s) AS r
+        """, [recipes_per_user])
+        for table in ['core_tag', 'core_ingredient']:
+            cursor.execute(f"""
+                INSERT INTO {table} (user_id, name, updated_at)
+                SELECT u.id, 'name ' || a, now()
+                FROM core_user AS u, generate_series(1, %s) AS a
+            """, [attrs_per_user])
+        cursor.execute('SELECT setseed(0.5)')
+        for table, column, target in [
+            ('core_recipe_tags', 'tag_id', 'core_tag'),
+            ('core_recipe_ingredients', 'ingredient_id', 'core_ingredient'),
+        ]:
+            # Link each recipe to up to links_per_recipe of its owner's
+            # objects, picked at random (repeatably, thanks to setseed).
+            cursor.execute(f"""
+                INSERT INTO {table} (recipe_id, {column})
+                SELECT l.recipe_id, t.id
+                FROM (
+                    SELECT r.id AS recipe_id, r.user_id,
+                           'name ' || (floor(random() * %s) + 1) AS name
+                    FROM core_recipe AS r, generate_series(1, %s)
+                ) AS l
+                JOIN {target} AS t
+                  ON t.user_id = l.user_id AND t.name = l.name
+                ON CONFLICT DO NOTHING
+            """, [attrs_per_user, links_per_recipe])
+        cursor.execute('ANALYZE')
+
+    return list(User.objects.order_by('id').values_list('id', flat=True))
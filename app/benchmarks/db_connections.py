@@ -0,0 +1,99 @@
+"""
+Benchmark of database connection handling.
+
+Simulates --requests requests on each of --threads threads, each request
+running one query between the connection handling Django does at the
+start and end of every request, for three setups of
+core.db.backends.postgresql:
+
+- a new connection per request (CONN_MAX_AGE = 0, the old default)
+- persistent connections (CONN_MAX_AGE = 60) with health checks
+- the in-process pool (POOL SIZE = --pool-size) with health checks
+
+Prints the median and 95th percentile latency of a request and the
+requests per second. Connection costs grow with the distance to the
+server and with TLS, so point DB_HOST at a database like production's
+for realistic numbers.
+
+    python -m benchmarks.db_connections --requests 500 --threads 4
+"""
+import statistics
+import threading
+import time
+
+from benchmarks import benchmark_database, get_parser, setup
+
+
+def run(settings_dict, requests, threads):
+    """Return the request latencies in ms and the elapsed seconds"""
+    from core.db.backends.postgresql.base import DatabaseWrapper
+
+    timings = []
+    lock = threading.Lock()
+
+    def worker():
+        wrapper = DatabaseWrapper(settings_dict, 'default')
+        own = []
+        for _ in range(requests):
+            start = time.perf_counter()
+            wrapper.close_if_unusable_or_obsolete()
+            with wrapper.cursor() as cursor:
+                cursor.execute('SELECT count(*) FROM core_recipe')
+                cursor.fetchone()
+            wrapper.close_if_unusable_or_obsolete()
+            own.append((time.perf_counter() - start) * 1000)
+        wrapper.close()
+        with lock:
+            timings.extend(own)
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    start = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+
+    return timings, time.perf_counter() - start
+
+
+def main():
+    parser = get_parser(__doc__)
+    parser.add_argument(
+        '--requests', type=int, default=500,
+        help='Requests per thread',
+    )
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--pool-size', type=int, default=4)
+    args = parser.parse_args()
+    setup()
+
+    from core.db.pool import close_pools, get_metrics
+
+    with benchmark_database(keepdb=args.keepdb) as connection:
+        base = {**connection.settings_dict, 'HEALTH_CHECKS': True}
+        setups = [
+            ('new connection', {
+                **base, 'CONN_MAX_AGE': 0, 'HEALTH_CHECKS': False,
+                'POOL': {},
+            }),
+            ('persistent', {**base, 'CONN_MAX_AGE': 60, 'POOL': {}}),
+            ('pooled', {
+                **base, 'CONN_MAX_AGE': 0,
+                'POOL': {'SIZE': args.pool_size},
+            }),
+        ]
+
+        print(f'{args.threads} threads x {args.requests} requests')
+        print(f'{"":<16} {"p50":>8} {"p95":>8} {"req/s":>8}')
+        for label, settings_dict in setups:
+            timings, elapsed = run(settings_dict, args.requests, args.threads)
+            p95 = statistics.quantiles(timings, n=20)[-1]
+            print(f'{label:<16} {statistics.median(timings):>6.2f}ms '
+                  f'{p95:>6.2f}ms {len(timings) / elapsed:>8.0f}')
+
+        print(f'connections: {get_metrics().get("default")}')
+        close_pools()
+
+
+if __name__ == '__main__':
+    main()
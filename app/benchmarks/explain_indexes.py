@@ -0,0 +1,83 @@
+"""
+EXPLAIN benchmark for the recipe, tag and ingredient indexes.
+
+Seeds ``--rows`` recipes, tags and ingredients (1M by default) and prints
+the EXPLAIN ANALYZE plan of the hot per-user queries twice: with the
+indexes from core.0008, and with them dropped inside a rolled back
+transaction.
+
+    python -m benchmarks.explain_indexes --rows 1000000 --users 1000
+"""
+from benchmarks import benchmark_database, get_parser, seed, setup
+
+DROPS = [
+    'DROP INDEX recipe_user_id_desc_idx',
+    'ALTER TABLE core_tag DROP CONSTRAINT unique_tag_name_per_user',
+    'ALTER TABLE core_ingredient '
+    'DROP CONSTRAINT unique_ingredient_name_per_user',
+]
+
+
+def get_queries(user_id):
+    """Return the queries to explain, by label"""
+    from core.models import Recipe, Tag, Ingredient
+
+    names = [f'name {i}' for i in range(1, 31)]
+    return {
+        'recipe list (user, -id)': (
+            Recipe.objects.filter(user_id=user_id).order_by('-id')[:100]
+        ),
+        'tag list (user, -name)': (
+            Tag.objects.filter(user_id=user_id).order_by('-name')[:100]
+        ),
+        'tag lookup (user, name IN ...)': (
+            Tag.objects.filter(user_id=user_id, name__in=names)
+        ),
+        'ingredient lookup (user, name IN ...)': (
+            Ingredient.objects.filter(user_id=user_id, name__in=names)
+        ),
+    }
+
+
+def explain(queries):
+    """Print the plan and execution time of each query"""
+    for label, queryset in queries.items():
+        plan = queryset.explain(analyze=True, buffers=True)
+        lines = plan.splitlines()
+        print(f'--- {label}')
+        print('\n'.join(lines[:6]))
+        print(lines[-1])
+
+
+def main():
+    parser = get_parser(__doc__)
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--users', type=int, default=1000)
+    args = parser.parse_args()
+    setup()
+
+    from django.db import transaction
+
+    with benchmark_database(keepdb=args.keepdb) as connection:
+        per_user = max(args.rows // args.users, 1)
+        user_ids = seed(
+            connection, args.users, per_user,
+            attrs_per_user=per_user, links_per_recipe=0,
+        )
+        queries = get_queries(user_ids[len(user_ids) // 2])
+
+        print('=== with indexes')
+        explain(queries)
+
+        print('=== without indexes')
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                for statement in DROPS:
+                    cursor.execute(statement)
+                cursor.execute('ANALYZE')
+            explain(queries)
+            transaction.set_rollback(True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+"""
+Benchmark of JSON rendering and parsing.
+
+Renders a list of --recipes recipes shaped like the list endpoint's
+output with DRF's JSONRenderer and with core.renderers.FastJSONRenderer,
+once with prices as strings (as the serializers emit them) and once as
+Decimals, then parses the result with both parsers. Prints the median
+time and the peak memory allocated by Python per call. Needs no
+database.
+
+    python -m benchmarks.json_rendering --recipes 10000
+"""
+import decimal
+import io
+import statistics
+import time
+import tracemalloc
+
+from benchmarks import get_parser, setup
+
+
+def make_payload(recipes, links, decimal_prices):
+    """Return a list representation of synthetic recipes"""
+    names = [{'id': i, 'name': f'name {i}'} for i in range(100)]
+    return {
+        'next': None,
+        'previous': None,
+        'results': [
+            {
+                'id': i,
+                'title': f'Recipe {i}',
+                'time_minutes': i % 120,
+                'price': (
+                    decimal.Decimal(f'{i % 100}.99') if decimal_prices
+                    else f'{i % 100}.99'
+                ),
+                'link': '',
+                'tags': names[i % 50:i % 50 + links],
+                'ingredients': names[i % 70:i % 70 + links],
+            }
+            for i in range(recipes)
+        ],
+    }
+
+
+def profile(func, repeat):
+    """Return (median ms, peak KiB allocated) of calling func"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return statistics.median(timings), peak / 1024
+
+
+def main():
+    parser = get_parser(__doc__)
+    parser.add_argument('--recipes', type=int, default=10000)
+    parser.add_argument(
+        '--links', type=int, default=5,
+        help='Tags and ingredients per recipe',
+    )
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    setup()
+
+    from rest_framework.parsers import JSONParser
+    from rest_framework.renderers import JSONRenderer
+
+    from core.parsers import FastJSONParser
+    from core.renderers import FastJSONRenderer, orjson
+
+    if orjson is None:
+        print('orjson is not installed: both pairs use the stdlib json')
+
+    cases = []
+    for label, decimal_prices in [('string prices', False),
+                                  ('Decimal prices', True)]:
+        payload = make_payload(args.recipes, args.links, decimal_prices)
+        for renderer in [JSONRenderer(), FastJSONRenderer()]:
+            cases.append((
+                f'render, {label}', type(renderer).__name__,
+                lambda r=renderer, p=payload: r.render(p),
+            ))
+
+    body = JSONRenderer().render(make_payload(args.recipes, args.links, False))
+    for json_parser in [JSONParser(), FastJSONParser()]:
+        cases.append((
+            'parse', type(json_parser).__name__,
+            lambda p=json_parser: p.parse(io.BytesIO(body)),
+        ))
+
+    print(f'{args.recipes} recipes, {len(body) / 2 ** 20:.1f} MiB of JSON')
+    print(f'{"":<24} {"class":<18} {"median":>9} {"peak alloc":>12}')
+    for label, name, func in cases:
+        median, peak = profile(func, args.repeat)
+        print(f'{label:<24} {name:<18} {median:>7.1f}ms {peak:>9.0f}KiB')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""
+Benchmark of recipe list serialization.
+
+Compares RecipeSerializer over model instances with prefetched tags and
+ingredients against the rows based path used by the list endpoint
+(recipe.rows), for one list of --recipes recipes. Prints the median
+time to turn loaded objects into JSON, and to query and render the
+list end to end.
+
+    python -m benchmarks.list_serialization --recipes 10000
+"""
+import statistics
+import time
+
+from benchmarks import benchmark_database, get_parser, seed, setup
+
+
+def median_ms(func, repeat):
+    """Return the median time in ms to call func"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+
+    return statistics.median(timings)
+
+
+def main():
+    parser = get_parser(__doc__)
+    parser.add_argument('--recipes', type=int, default=10000)
+    parser.add_argument(
+        '--attrs', type=int, default=100,
+        help='Tags and ingredients per user',
+    )
+    parser.add_argument(
+        '--links', type=int, default=5,
+        help='Tags and ingredients per recipe',
+    )
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    setup()
+
+    from rest_framework.renderers import JSONRenderer
+
+    from core.models import Recipe
+    from recipe.rows import (
+        get_recipe_related,
+        recipe_rows_to_representation,
+    )
+    from recipe.serializers import RecipeSerializer
+
+    fields = RecipeSerializer.Meta.fields
+    columns = [
+        field for field in fields if field not in ('tags', 'ingredients')
+    ]
+    renderer = JSONRenderer()
+
+    with benchmark_database(keepdb=args.keepdb) as connection:
+        user_id, = seed(
+            connection, 1, args.recipes,
+            attrs_per_user=args.attrs, links_per_recipe=args.links,
+        )
+        recipes = Recipe.objects.filter(user_id=user_id).order_by('-id')
+
+        def load_instances():
+            return list(recipes.prefetch_related('tags', 'ingredients'))
+
+        def load_rows():
+            rows = list(recipes.values(*columns))
+            related = get_recipe_related([row['id'] for row in rows], fields)
+            return rows, related
+
+        def serializer_path(instances):
+            return renderer.render(
+                RecipeSerializer(instances, many=True).data
+            )
+
+        def rows_path(loaded):
+            return renderer.render(
+                recipe_rows_to_representation(loaded[0], fields, loaded[1])
+            )
+
+        instances = load_instances()
+        loaded = load_rows()
+        if serializer_path(instances) != rows_path(loaded):
+            print('Warning: the two paths render different JSON')
+
+        results = [
+            (
+                'serialize + render',
+                median_ms(lambda: serializer_path(instances), args.repeat),
+                median_ms(lambda: rows_path(loaded), args.repeat),
+            ),
+            (
+                'query + serialize + render',
+                median_ms(
+                    lambda: serializer_path(load_instances()), args.repeat,
+                ),
+                median_ms(lambda: rows_path(load_rows()), args.repeat),
+            ),
+        ]
+
+        print(f'{len(loaded[0])} recipes, up to {args.links} tags and '
+              'ingredients each')
+        print(f'{"":<28} {"serializer":>12} {"rows":>10} {"speedup":>8}')
+        for label, serializer_ms, rows_ms in results:
+            print(f'{label:<28} {serializer_ms:>10.0f}ms {rows_ms:>8.0f}ms '
+                  f'{serializer_ms / rows_ms:>7.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,216 @@
+"""
+Benchmark of logins under concurrent load, with the real process model.
+
+Forks --processes worker processes that accept connections from one
+shared socket and serve one request at a time, as uWSGI workers with
+the default UWSGI_THREADS=1 do. The workers share a cache, as they
+share Redis in production: the database cache by default, or the Redis
+at --redis. --clients threads then send --requests logins to
+/api/user/token/ while one more client keeps requesting /api/health/,
+for each number of hashing slots in --slots (0: one per client, which
+never sheds a login).
+
+Prints logins per second, login latency, the logins shed with a 503 by
+admission control and the latency of the health requests, which shows
+how many workers the logins leave to other requests.
+
+    python -m benchmarks.login_throughput --processes 4 --slots 0,2,1
+"""
+import http.client
+import os
+import signal
+import socket
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+from urllib.parse import urlencode
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer
+
+from benchmarks import benchmark_database, get_parser, setup
+
+
+class QuietHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def start_workers(processes):
+    """Fork the workers on a shared socket, return its port and pids"""
+    from django.core.wsgi import get_wsgi_application
+    from django.db import connections
+    from django.urls import reverse
+
+    application = get_wsgi_application()
+    # Load the views before forking, as uWSGI does without lazy-apps
+    reverse('core:health')
+    listener = socket.socket()
+    listener.bind(('127.0.0.1', 0))
+    listener.listen(128)
+    port = listener.getsockname()[1]
+    # Each worker opens its own database connections
+    connections.close_all()
+
+    pids = []
+    for _ in range(processes):
+        pid = os.fork()
+        if pid == 0:
+            server = WSGIServer(
+                ('127.0.0.1', port), QuietHandler, bind_and_activate=False,
+            )
+            server.socket = listener
+            server.server_name, server.server_port = '127.0.0.1', port
+            server.setup_environ()
+            server.set_app(application)
+            try:
+                server.serve_forever()
+            finally:
+                os._exit(0)
+        pids.append(pid)
+
+    listener.close()
+    return port, pids
+
+
+def stop_workers(pids):
+    for pid in pids:
+        os.kill(pid, signal.SIGTERM)
+    for pid in pids:
+        os.waitpid(pid, 0)
+
+
+def request(port, method, path, body=None):
+    """Send one request on a new connection, return (status, seconds)"""
+    headers = {'Content-Type': 'application/x-www-form-urlencoded'}
+    start = time.perf_counter()
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=120)
+    try:
+        conn.request(method, path, body, headers)
+        res = conn.getresponse()
+        res.read()
+    finally:
+        conn.close()
+    return res.status, time.perf_counter() - start
+
+
+def run_clients(port, clients, requests, user_count):
+    """Send the logins, polling the health endpoint meanwhile
+
+    Returns (statuses and latencies of the logins, health latencies).
+    """
+    done = threading.Event()
+    health = []
+
+    def health_client():
+        while not done.is_set():
+            health.append(request(port, 'GET', '/api/health/')[1])
+            time.sleep(0.05)
+
+    def login(i):
+        body = urlencode({
+            'email': f'login{i % user_count}@example.com',
+            'password': 'benchmark password',
+        })
+        return request(port, 'POST', '/api/user/token/', body)
+
+    poller = threading.Thread(target=health_client)
+    poller.start()
+    with ThreadPoolExecutor(clients) as executor:
+        logins = list(executor.map(login, range(requests)))
+    done.set()
+    poller.join()
+
+    return logins, health
+
+
+def percentiles(latencies):
+    """Return the median and 95th percentile in ms"""
+    latencies = sorted(latencies) or [0]
+    p95 = latencies[max(int(len(latencies) * 0.95) - 1, 0)]
+    return statistics.median(latencies) * 1000, p95 * 1000
+
+
+def main():
+    parser = get_parser(__doc__)
+    parser.add_argument('--processes', type=int, default=4)
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--users', type=int, default=100)
+    parser.add_argument(
+        '--slots', default='0,2,1',
+        help='Comma separated numbers of hashing slots to compare',
+    )
+    parser.add_argument(
+        '--redis', help='Redis URL of the cache the workers share',
+    )
+    args = parser.parse_args()
+    setup()
+
+    from django.contrib.auth import get_user_model, hashers
+    from django.core.cache import cache
+    from django.core.management import call_command
+    from django.test.utils import override_settings
+
+    from user import backends
+    from user.throttles import LoginIPThrottle
+
+    if args.redis:
+        caches = {'default': {
+            'BACKEND': 'django_redis.cache.RedisCache',
+            'LOCATION': args.redis,
+        }}
+    else:
+        caches = {'default': {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+            'LOCATION': 'benchmark_cache',
+        }}
+
+    rates = {'login_ip': '1000000/min', 'login_email': '1000000/min'}
+    with benchmark_database(keepdb=args.keepdb), \
+            override_settings(CACHES=caches, ALLOWED_HOSTS=['127.0.0.1']), \
+            patch.dict(LoginIPThrottle.THROTTLE_RATES, rates):
+        call_command('createcachetable', verbosity=0)
+        User = get_user_model()
+        if not User.objects.filter(email__startswith='login').exists():
+            # One hash shared by all users keeps seeding fast
+            password = hashers.make_password('benchmark password')
+            User.objects.bulk_create([
+                User(email=f'login{i}@example.com', password=password)
+                for i in range(args.users)
+            ])
+
+        print(f'{"slots":>5} {"logins/s":>9} {"p50 (ms)":>9} '
+              f'{"p95 (ms)":>9} {"503s":>5} {"health p50":>11} '
+              f'{"health p95":>11}')
+        for slots in map(int, args.slots.split(',')):
+            cache.clear()
+            limit = backends.HashingSlots(
+                slots or args.clients, timeout=30,
+            )
+            with patch.object(backends, 'hashing_slots', limit):
+                port, pids = start_workers(args.processes)
+                try:
+                    start = time.perf_counter()
+                    logins, health = run_clients(
+                        port, args.clients, args.requests, args.users,
+                    )
+                    elapsed = time.perf_counter() - start
+                finally:
+                    stop_workers(pids)
+
+            codes = [code for code, _ in logins]
+            others = len(codes) - codes.count(200) - codes.count(503)
+            if others:
+                print(f'{others} logins failed for another reason')
+            p50, p95 = percentiles(
+                [elapsed for code, elapsed in logins if code == 200]
+            )
+            health_p50, health_p95 = percentiles(health)
+            print(f'{slots or "-":>5} {codes.count(200) / elapsed:>9.1f} '
+                  f'{p50:>9.0f} {p95:>9.0f} {codes.count(503):>5} '
+                  f'{health_p50:>11.0f} {health_p95:>11.0f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+"""
+Benchmark of writing recipes one request at a time versus in bulk.
+
+Creates and then updates --recipes recipes, each with tags and an
+ingredient, through the recipe endpoints one request per recipe and
+through /api/recipe/recipes/bulk/ in batches of --batch items. Prints
+the elapsed time, recipes per second and queries per recipe of each.
+
+    python -m benchmarks.recipe_bulk --recipes 500 --batch 100
+"""
+import time
+
+from benchmarks import benchmark_database, get_parser, setup
+
+
+def item(i):
+    """Return the payload of the i-th recipe"""
+    return {
+        'title': f'Recipe {i}', 'time_minutes': 10, 'price': '2.50',
+        'tags': [{'name': 'Dinner'}, {'name': f'Tag {i % 20}'}],
+        'ingredients': [{'name': 'Salt'}],
+    }
+
+
+def timed(func):
+    """Return the seconds and queries func takes"""
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    with CaptureQueriesContext(connection) as queries:
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+
+    return elapsed, len(queries)
+
+
+def main():
+    parser = get_parser(__doc__)
+    parser.add_argument('--recipes', type=int, default=500)
+    parser.add_argument('--batch', type=int, default=100)
+    args = parser.parse_args()
+    setup()
+
+    from django.contrib.auth import get_user_model
+    from django.test.utils import setup_test_environment
+    from django.urls import reverse
+    from rest_framework.test import APIClient
+
+    from core.models import Recipe
+
+    setup_test_environment()
+    list_url = reverse('recipe:recipe-list')
+    bulk_url = reverse('recipe:recipe-bulk')
+    count = args.recipes
+
+    with benchmark_database(keepdb=args.keepdb):
+        user = get_user_model().objects.create_user(
+            email=f'bulk{time.time_ns()}@example.com', password='x',
+        )
+        client = APIClient()
+        client.force_authenticate(user)
+
+        def single_create():
+            for i in range(count):
+                client.post(list_url, item(i), format='json')
+
+        def single_update():
+            for recipe_id in Recipe.objects.filter(
+                user=user,
+            ).values_list('id', flat=True):
+                client.patch(
+                    reverse('recipe:recipe-detail', args=[recipe_id]),
+                    {'title': 'Updated', 'tags': [{'name': 'Lunch'}]},
+                    format='json',
+                )
+
+        def bulk_create():
+            for start in range(0, count, args.batch):
+                stop = min(start + args.batch, count)
+                client.post(bulk_url, {'create': [
+                    item(i) for i in range(start, stop)
+                ]}, format='json')
+
+        def bulk_update():
+            ids = list(Recipe.objects.filter(
+                user=user,
+            ).values_list('id', flat=True))
+            for start in range(0, len(ids), args.batch):
+                client.post(bulk_url, {'update': [
+                    {'id': recipe_id, 'title': 'Updated',
+                     'tags': [{'name': 'Lunch'}]}
+                    for recipe_id in ids[start:start + args.batch]
+                ]}, format='json')
+
+        def clear():
+            Recipe.objects.filter(user=user).delete()
+
+        print(f'{count} recipes, bulk batches of {args.batch}')
+        print(f'{"":<14} {"seconds":>8} {"recipes/s":>10} '
+              f'{"queries/recipe":>15}')
+        for label, create, update in [
+            ('single', single_create, single_update),
+            ('bulk', bulk_create, bulk_update),
+        ]:
+            for action, func in [('create', create), ('update', update)]:
+                elapsed, queries = timed(func)
+                print(f'{label + " " + action:<14} {elapsed:>8.2f} '
+                      f'{count / elapsed:>10.0f} {queries / count:>15.1f}')
+            clear()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""
+Benchmark of the recipe tag/ingredient filters.
+
+Compares the previous join + DISTINCT filter with the EXISTS based
+filters from recipe.filters on a synthetic dataset, for a first page
+of results and for a full count.
+
+    python -m benchmarks.recipe_filters --users 20 --recipes 10000
+"""
+from benchmarks import benchmark_database, get_parser, measure, seed, setup
+
+
+def main():
+    parser = get_parser(__doc__)
+    parser.add_argument('--users', type=int, default=20)
+    parser.add_argument(
+        '--recipes', type=int, default=10000, help='Recipes per user',
+    )
+    parser.add_argument(
+        '--attrs', type=int, default=100,
+        help='Tags and ingredients per user',
+    )
+    parser.add_argument(
+        '--links', type=int, default=5,
+        help='Tags and ingredients per recipe',
+    )
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    setup()
+
+    from django.db.models import Count
+    from django.http import QueryDict
+
+    from core.models import Recipe, Tag, Ingredient
+    from recipe.filters import filter_recipes
+
+    with benchmark_database(keepdb=args.keepdb) as connection:
+        user_ids = seed(
+            connection, args.users, args.recipes,
+            attrs_per_user=args.attrs, links_per_recipe=args.links,
+        )
+        user_id = user_ids[len(user_ids) // 2]
+        # Filter on the user's three most used tags and ingredients
+        tag_ids = list(Tag.objects.filter(user_id=user_id).annotate(
+            n=Count('recipe'),
+        ).order_by('-n').values_list('id', flat=True)[:3])
+        ingredient_ids = list(Ingredient.objects.filter(
+            user_id=user_id,
+        ).annotate(
+            n=Count('recipe'),
+        ).order_by('-n').values_list('id', flat=True)[:3])
+        recipes = Recipe.objects.filter(user_id=user_id).order_by('-id')
+
+        def params(mode):
+            query = QueryDict(mutable=True)
+            query['tags'] = ','.join(map(str, tag_ids))
+            query['ingredients'] = ','.join(map(str, ingredient_ids))
+            query['tags_match'] = query['ingredients_match'] = mode
+            return query
+
+        cases = {
+            'join + DISTINCT': recipes.filter(
+                tags__id__in=tag_ids, ingredients__id__in=ingredient_ids,
+            ).distinct(),
+            'EXISTS, any of': filter_recipes(recipes, params('any')),
+            'EXISTS, all of': filter_recipes(recipes, params('all')),
+        }
+
+        print(f'{"filter":<20} {"rows":>8} {"page (ms)":>10} {"all (ms)":>10}')
+        for label, queryset in cases.items():
+            count = queryset.aggregate(n=Count('id'))['n']
+            page = measure(queryset[:100], args.repeat)
+            full = measure(queryset.values_list('id'), args.repeat)
+            print(f'{label:<20} {count:>8} {page:>10.1f} {full:>10.1f}')
+
+
+if __name__ == '__main__':
+    main()
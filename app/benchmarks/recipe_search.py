@@ -0,0 +1,58 @@
+"""
+Benchmark of the full-text recipe search.
+
+Seeds recipes with tags and ingredients, fills their search vectors and
+times the first page of ranked results for a few searches of one user,
+using the same queryset as the list endpoint.
+
+    python -m benchmarks.recipe_search --users 1000 --recipes 10000
+"""
+from benchmarks import benchmark_database, get_parser, measure, seed, setup
+
+SEARCHES = ['name 7', '"recipe 1234"', 'description -name', 'missing']
+
+
+def main():
+    parser = get_parser(__doc__)
+    parser.add_argument('--users', type=int, default=100)
+    parser.add_argument(
+        '--recipes', type=int, default=10000, help='Recipes per user',
+    )
+    parser.add_argument(
+        '--attrs', type=int, default=100,
+        help='Tags and ingredients per user',
+    )
+    parser.add_argument(
+        '--links', type=int, default=5,
+        help='Tags and ingredients per recipe',
+    )
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    setup()
+
+    from django.db.models import Count
+
+    from core.models import Recipe
+    from recipe.search import get_search_vector, search_recipes
+
+    with benchmark_database(keepdb=args.keepdb) as connection:
+        user_ids = seed(
+            connection, args.users, args.recipes,
+            attrs_per_user=args.attrs, links_per_recipe=args.links,
+        )
+        if Recipe.objects.filter(search_vector__isnull=True).exists():
+            Recipe.objects.update(search_vector=get_search_vector())
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE core_recipe')
+
+        recipes = Recipe.objects.filter(user_id=user_ids[len(user_ids) // 2])
+        print(f'{"search":<20} {"rows":>8} {"page (ms)":>10}')
+        for text in SEARCHES:
+            queryset = search_recipes(recipes, text)
+            count = queryset.aggregate(n=Count('id'))['n']
+            page = queryset.order_by('-search_rank', '-id')[:100]
+            print(f'{text:<20} {count:>8} {measure(page, args.repeat):>10.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+"""
+Concurrent read requests under ASGI
+
+Under ASGI, Django 3.2 runs every synchronous view of a process on one
+shared thread, one request at a time. Views wrapped by
+read_concurrently() become async views that run GET, HEAD and OPTIONS
+requests on a pool of ASGI_READ_THREADS threads instead, so reads
+proceed in parallel while slow clients and uploads only cost the event
+loop. Other methods keep running on the shared thread, except logins:
+views wrapped by login_concurrently() take POST requests on
+LOGIN_HASH_THREADS threads of their own, so a password hash never holds
+the shared thread and the writes queued behind it.
+
+Each read and login thread keeps its own database connection, handled
+at the start and end of every request as Django does for its own
+thread.
+"""
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+
+READ_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+@functools.lru_cache(maxsize=None)
+def get_read_executor():
+    """Return the process's pool of read threads, started on first use"""
+    return ThreadPoolExecutor(
+        max_workers=settings.ASGI_READ_THREADS,
+        thread_name_prefix='read',
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def get_login_executor():
+    """Return the process's pool of login threads, started on first use"""
+    return ThreadPoolExecutor(
+        max_workers=settings.LOGIN_HASH_THREADS,
+        thread_name_prefix='login',
+    )
+
+
+def _run_view(view, request, *args, **kwargs):
+    """Run a view and render its response on the current thread"""
+    close_old_connections()
+    try:
+        response = view(request, *args, **kwargs)
+        if callable(getattr(response, 'render', None)):
+            # Also moves JSON encoding off the shared thread
+            response = response.render()
+        return response
+    finally:
+        close_old_connections()
+
+
+def _concurrently(view, methods, get_executor):
+    """Return an async view running the given methods on an executor"""
+    if settings.SERVER_MODE != 'asgi':
+        return view
+
+    shared_view = sync_to_async(view)
+
+    @functools.wraps(view)
+    async def async_view(request, *args, **kwargs):
+        if request.method in methods:
+            run = sync_to_async(
+                _run_view,
+                thread_sensitive=False,
+                executor=get_executor(),
+            )
+            return await run(view, request, *args, **kwargs)
+
+        return await shared_view(request, *args, **kwargs)
+
+    return async_view
+
+
+def read_concurrently(view):
+    """Return view, with its reads on the read threads in ASGI mode
+
+    In WSGI mode the view is returned unchanged, as async views would
+    cost an event loop per request there.
+    """
+    return _concurrently(view, READ_METHODS, get_read_executor)
+
+
+def login_concurrently(view):
+    """Return view, with its POSTs on the login threads in ASGI mode"""
+    return _concurrently(view, ('POST',), get_login_executor)
+
+
+def read_concurrently_patterns(patterns, names):
+    """Wrap the views of the named URL patterns with read_concurrently()"""
+    for pattern in patterns:
+        if pattern.name in names:
+            pattern.callback = read_concurrently(pattern.callback)
+
+    return patterns
@@ -0,0 +1,3 @@
+"""
+Database support for the API
+"""
@@ -0,0 +1,6 @@
+"""
+PostgreSQL backend with connection health checks and pooling
+
+Set ENGINE to 'core.db.backends.postgresql' and configure it with the
+HEALTH_CHECKS and POOL keys of the database's settings.
+"""
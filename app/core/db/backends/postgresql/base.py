@@ -0,0 +1,112 @@
+"""
+PostgreSQL database wrapper with health checks and an optional pool
+
+Settings, next to Django's own in DATABASES:
+
+HEALTH_CHECKS
+    Check that a persistent connection still works, with a SELECT 1,
+    the first time it is used by each request. A connection the server
+    or a proxy dropped in between is replaced instead of failing the
+    request.
+POOL
+    {'SIZE', 'MAX_LIFETIME', 'IDLE_TIMEOUT', 'TIMEOUT'}. With a SIZE
+    above zero, connections closed by Django are handed back to an
+    in-process pool (core.db.pool) and reused; use CONN_MAX_AGE = 0 so
+    they are handed back at the end of each request.
+"""
+from django.db.backends.postgresql import base
+
+from core.db import pool
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.health_check_needed = False
+        self.connection_pool = None
+
+    @property
+    def pool_options(self):
+        """Return the POOL settings, or None if pooling is disabled"""
+        options = self.settings_dict.get('POOL') or {}
+        if options.get('SIZE', 0) <= 0:
+            return None
+        return options
+
+    def get_new_connection(self, conn_params):
+        options = self.pool_options
+        if options is None:
+            pool.count(self.alias, 'opened')
+            return super().get_new_connection(conn_params)
+
+        connection_pool = pool.get_pool(
+            self.alias,
+            key=tuple(sorted(conn_params.items())),
+            size=options['SIZE'],
+            max_lifetime=options.get('MAX_LIFETIME', 3600),
+            idle_timeout=options.get('IDLE_TIMEOUT', 300),
+            timeout=options.get('TIMEOUT', 5),
+        )
+        check = self._check_raw if self.settings_dict.get(
+            'HEALTH_CHECKS'
+        ) else None
+        connection = connection_pool.acquire(
+            lambda: super(DatabaseWrapper, self).get_new_connection(
+                conn_params
+            ),
+            check,
+        )
+        self.isolation_level = self.settings_dict['OPTIONS'].get(
+            'isolation_level', connection.isolation_level,
+        )
+        self.connection_pool = connection_pool
+        return connection
+
+    def _close(self):
+        if self.connection is None:
+            return
+
+        connection_pool = self.connection_pool
+        if connection_pool is None:
+            pool.count(self.alias, 'closed')
+            return super()._close()
+
+        self.connection_pool = None
+        # A connection closed inside an atomic block stays referenced
+        # until the block exits, so it must not be handed out again
+        connection_pool.release(
+            self.connection,
+            discard=self.errors_occurred or self.in_atomic_block,
+        )
+
+    def close_if_unusable_or_obsolete(self):
+        super().close_if_unusable_or_obsolete()
+        # Called at the start and end of each request; a connection kept
+        # until the next request is checked when that request uses it
+        if self.connection is not None and self.settings_dict.get(
+            'HEALTH_CHECKS'
+        ):
+            self.health_check_needed = True
+
+    def ensure_connection(self):
+        if (
+            self.health_check_needed
+            and self.connection is not None
+            and not self.in_atomic_block
+        ):
+            self.health_check_needed = False
+            if not self.is_usable():
+                pool.count(self.alias, 'health_check_failures')
+                self.errors_occurred = True
+                self.close()
+        super().ensure_connection()
+
+    def _check_raw(self, connection):
+        """Return whether a psycopg2 connection still works"""
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+        except base.Database.Error:
+            return False
+        return True
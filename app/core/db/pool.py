@@ -0,0 +1,258 @@
+"""
+In-process pool of database connections
+
+Each process keeps one pool per database alias, shared by its threads.
+Connections handed back are reused by the next request instead of being
+closed, until they outlive the pool's maximum lifetime or sit idle for
+longer than its idle timeout.
+"""
+import logging
+import os
+import threading
+import time
+from collections import Counter
+
+from django.db import OperationalError
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_pools = {}
+# Pools inherited from a parent process. Their connections belong to the
+# parent: closing them, even by garbage collection, would end the
+# parent's sessions, so they are kept referenced and never touched.
+_inherited = []
+_metrics = {}
+
+
+class PoolTimeout(OperationalError):
+    """No pooled connection became free in time"""
+
+
+def count(alias, name, value=1):
+    """Add value to the named connection counter of a database alias"""
+    with _lock:
+        _metrics.setdefault(alias, Counter())[name] += value
+
+
+def get_pool(alias, key, size, max_lifetime, idle_timeout, timeout):
+    """Return this process's pool for a database alias
+
+    A new pool is made when key, which identifies the server, database
+    and credentials connected to, differs from the current pool's.
+    """
+    pid = os.getpid()
+    replaced = None
+    with _lock:
+        pool = _pools.get(alias)
+        if pool is not None and pool.pid != pid:
+            _inherited.append(pool)
+            pool = None
+        if pool is not None and pool.key != key:
+            replaced = pool
+            pool = None
+        if pool is None:
+            pool = _pools[alias] = ConnectionPool(
+                alias, key, size, max_lifetime, idle_timeout, timeout,
+            )
+
+    if replaced is not None:
+        replaced.close()
+    return pool
+
+
+def close_pools():
+    """Close this process's pools and their idle connections"""
+    pid = os.getpid()
+    with _lock:
+        pools = [pool for pool in _pools.values() if pool.pid == pid]
+        for pool in pools:
+            del _pools[pool.alias]
+
+    for pool in pools:
+        pool.close()
+
+
+def get_metrics():
+    """Return {alias: connection counters and pool gauges}"""
+    pid = os.getpid()
+    with _lock:
+        metrics = {
+            alias: dict(counter) for alias, counter in _metrics.items()
+        }
+        pools = [pool for pool in _pools.values() if pool.pid == pid]
+
+    for pool in pools:
+        metrics.setdefault(pool.alias, {})['pool'] = pool.stats()
+
+    return metrics
+
+
+class ConnectionPool:
+    """Bounded pool of psycopg2 connections
+
+    At most size connections are open at once; callers wait up to
+    timeout seconds for one to be handed back before PoolTimeout is
+    raised. The most recently used idle connection is handed out first,
+    so connections beyond what the load needs go idle and expire.
+    """
+
+    def __init__(self, alias, key, size, max_lifetime, idle_timeout,
+                 timeout):
+        self.alias = alias
+        self.key = key
+        self.size = size
+        self.max_lifetime = max_lifetime
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout
+        self.pid = os.getpid()
+        self._cond = threading.Condition()
+        # (connection, time handed back) of idle connections, oldest first
+        self._idle = []
+        self._created = {}
+        self._in_use = 0
+        self.closed = False
+
+    def acquire(self, connect, check=None):
+        """Return an idle connection, or a new one from connect()
+
+        check, when given, is called with an idle connection before it is
+        handed out and returns whether the connection still works.
+        """
+        deadline = time.monotonic() + self.timeout
+        while True:
+            conn, expired = self._reserve(deadline)
+            self._discard(expired)
+            if conn is None:
+                break
+            if check is None or check(conn):
+                count(self.alias, 'reused')
+                return conn
+
+            count(self.alias, 'health_check_failures')
+            with self._cond:
+                self._in_use -= 1
+                self._created.pop(conn, None)
+                self._cond.notify()
+            self._discard([conn])
+
+        try:
+            conn = connect()
+        except Exception:
+            with self._cond:
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+
+        count(self.alias, 'opened')
+        with self._cond:
+            self._created[conn] = time.monotonic()
+        return conn
+
+    def release(self, conn, discard=False):
+        """Hand a connection back to the pool
+
+        Connections that are closed, not in autocommit mode, inside a
+        transaction, past their lifetime or marked for discarding are
+        closed instead of reused.
+        """
+        now = time.monotonic()
+        with self._cond:
+            self._in_use -= 1
+            created = self._created.get(conn)
+            reusable = (
+                not discard
+                and not self.closed
+                and created is not None
+                and not conn.closed
+                and conn.autocommit
+                and conn.info.transaction_status == TRANSACTION_STATUS_IDLE
+                and now - created < self.max_lifetime
+            )
+            if reusable:
+                self._idle.append((conn, now))
+            else:
+                self._created.pop(conn, None)
+            self._cond.notify()
+
+        if not reusable:
+            self._discard([conn])
+
+    def close(self):
+        """Close the idle connections, and those handed back from now on"""
+        with self._cond:
+            self.closed = True
+            expired = [conn for conn, _ in self._idle]
+            self._idle = []
+            for conn in expired:
+                del self._created[conn]
+        self._discard(expired)
+
+    def stats(self):
+        """Return the pool's size limit and idle and in use connections"""
+        with self._cond:
+            return {
+                'size': self.size,
+                'idle': len(self._idle),
+                'in_use': self._in_use,
+            }
+
+    def _reserve(self, deadline):
+        """Claim a slot, returning (idle connection or None, expired)
+
+        Blocks until a slot is free, raising PoolTimeout at deadline.
+        """
+        with self._cond:
+            waited = False
+            while True:
+                expired = self._expire()
+                if self._idle:
+                    conn, _ = self._idle.pop()
+                    self._in_use += 1
+                    return conn, expired
+                if self._in_use + len(self._idle) < self.size:
+                    self._in_use += 1
+                    return None, expired
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    count(self.alias, 'timeouts')
+                    self._discard(expired)
+                    raise PoolTimeout(
+                        f'No connection to {self.alias!r} became free '
+                        f'within {self.timeout}s (pool size {self.size})'
+                    )
+                if not waited:
+                    count(self.alias, 'waits')
+                    waited = True
+                self._discard(expired)
+                self._cond.wait(remaining)
+
+    def _expire(self):
+        """Remove and return idle connections past their time"""
+        now = time.monotonic()
+        keep, expired = [], []
+        for conn, released in self._idle:
+            if (
+                now - released >= self.idle_timeout
+                or now - self._created[conn] >= self.max_lifetime
+            ):
+                expired.append(conn)
+                del self._created[conn]
+            else:
+                keep.append((conn, released))
+        self._idle = keep
+        return expired
+
+    def _discard(self, conns):
+        """Close connections dropped from the pool"""
+        for conn in conns:
+            count(self.alias, 'closed')
+            try:
+                conn.close()
+            except Exception:
+                logger.warning(
+                    'Failed to close a connection to %r', self.alias,
+                    exc_info=True,
+                )
@@ -0,0 +1,56 @@
+"""
+Database routers
+
+Writes always go to the default database. Reads go there too unless
+code running inside read_from() picks another alias, such as a read
+replica, for the current thread or task.
+"""
+import contextvars
+from contextlib import contextmanager
+
+from django.db import DEFAULT_DB_ALIAS, connections
+
+REPLICA = 'replica'
+
+_read_alias = contextvars.ContextVar('read_alias', default=None)
+
+
+def replica_configured():
+    """Return whether a read replica database is configured"""
+    return REPLICA in connections.databases
+
+
+@contextmanager
+def read_from(alias):
+    """Send the reads of the block to the alias"""
+    token = _read_alias.set(alias)
+    try:
+        yield
+    finally:
+        _read_alias.reset(token)
+
+
+class ReplicaRouter:
+    """Route reads to the alias chosen with read_from(), writes to default
+
+    The replica mirrors the default database, so relations between their
+    objects are allowed and migrations only run on the default database.
+    """
+
+    def db_for_read(self, model, **hints):
+        return _read_alias.get()
+
+    def db_for_write(self, model, **hints):
+        # Objects read from the replica are saved to the primary
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        aliases = {DEFAULT_DB_ALIAS, REPLICA}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db == REPLICA:
+            return False
+        return None
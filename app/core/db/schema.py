@@ -0,0 +1,54 @@
+"""
+Checking for and applying pending migrations
+
+Migrating holds a session level advisory lock, so of many containers
+starting at once one migrates while the others wait, then find nothing
+left to apply. As the lock belongs to the connection's session, that
+connection must go to the database directly, not through PgBouncer in
+transaction mode.
+"""
+import contextlib
+
+from django.db.migrations.executor import MigrationExecutor
+
+# Key of the advisory lock held while migrating
+MIGRATION_LOCK_ID = int.from_bytes(b'migrate', 'big')
+
+# Aliases of databases found fully migrated by this process
+_migrated = set()
+
+
+def pending_migrations(connection):
+    """Return the migrations not yet applied to connection's database"""
+    executor = MigrationExecutor(connection)
+    targets = executor.loader.graph.leaf_nodes()
+    return [
+        migration for migration, _ in executor.migration_plan(targets)
+    ]
+
+
+def is_migrated(connection):
+    """Return whether connection's database has every migration applied
+
+    Once it has, that is remembered for the life of the process.
+    """
+    if connection.alias not in _migrated:
+        if pending_migrations(connection):
+            return False
+        _migrated.add(connection.alias)
+
+    return True
+
+
+@contextlib.contextmanager
+def migration_lock(connection):
+    """Hold the migration lock, waiting for any other holder"""
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT pg_advisory_lock(%s)', [MIGRATION_LOCK_ID])
+    try:
+        yield
+    finally:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT pg_advisory_unlock(%s)', [MIGRATION_LOCK_ID],
+            )
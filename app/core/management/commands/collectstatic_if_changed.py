@@ -0,0 +1,91 @@
+"""
+Django command to collect static files only when they changed.
+"""
+import hashlib
+import os
+
+from django.apps import apps
+from django.conf import settings
+from django.contrib.staticfiles.finders import get_finders
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+
+# Written to STATIC_ROOT with the fingerprint of the collected files
+FINGERPRINT_NAME = '.fingerprint'
+
+
+def fingerprint():
+    """Return a hash of the names and contents of the static files
+
+    The files are those collectstatic collects, so the hash changes
+    whenever its output would.
+    """
+    ignore_patterns = apps.get_app_config('staticfiles').ignore_patterns
+    files = {}
+    for finder in get_finders():
+        for path, storage in finder.list(ignore_patterns):
+            # As in collectstatic, the first finder listing a path wins
+            files.setdefault(path, storage)
+
+    digest = hashlib.sha256()
+    for path in sorted(files):
+        content = hashlib.sha256()
+        with files[path].open(path) as source:
+            for chunk in iter(lambda: source.read(64 * 1024), b''):
+                content.update(chunk)
+        digest.update(f'{path}\0{content.hexdigest()}\n'.encode())
+
+    return digest.hexdigest()
+
+
+def read(path):
+    """Return the contents of a fingerprint file, None if missing"""
+    try:
+        with open(path) as source:
+            return source.read().strip()
+    except FileNotFoundError:
+        return None
+
+
+def write(path, value):
+    """Write a fingerprint file"""
+    with open(path, 'w') as output:
+        output.write(value)
+
+
+class Command(BaseCommand):
+    """Django command to collect static files on container start
+
+    With --build, run in the Dockerfile, only writes the fingerprint of
+    the image's static files to STATIC_FINGERPRINT_FILE. On start the
+    command compares that fingerprint, or a fresh one when the file is
+    missing, with the one left in STATIC_ROOT by the last collection,
+    and collects only when they differ.
+    """
+    help = 'Run collectstatic if the static files changed since last run'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--build', action='store_true',
+            help='Only write the fingerprint to STATIC_FINGERPRINT_FILE',
+        )
+
+    def handle(self, *args, **options):
+        """Entry point for command"""
+        if options['build']:
+            write(settings.STATIC_FINGERPRINT_FILE, fingerprint())
+            return
+
+        current = read(settings.STATIC_FINGERPRINT_FILE) or fingerprint()
+        collected_path = os.path.join(settings.STATIC_ROOT, FINGERPRINT_NAME)
+        if read(collected_path) == current:
+            self.stdout.write('Static files unchanged, skipping.')
+            return
+
+        call_command(
+            'collectstatic', interactive=False,
+            verbosity=options['verbosity'],
+            stdout=self.stdout, stderr=self.stderr,
+        )
+        # Only once everything is collected, so a failed run is retried
+        write(collected_path, current)
@@ -0,0 +1,38 @@
+"""
+Django command to export a user's recipes as newline-delimited JSON.
+"""
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from recipe.export import iter_ndjson
+
+
+class Command(BaseCommand):
+    """Django command to stream a user's recipes to a file or stdout"""
+    help = "Export a user's recipes, with tags and ingredients, as NDJSON"
+
+    def add_arguments(self, parser):
+        parser.add_argument('email', help='Email of the recipe owner')
+        parser.add_argument(
+            '--output', '-o',
+            help='File to write to (defaults to stdout)',
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=2000,
+            help='Number of recipes read from the database at a time',
+        )
+
+    def handle(self, *args, **options):
+        """Entry point for command"""
+        try:
+            user = get_user_model().objects.get(email=options['email'])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f"No user with email {options['email']}")
+
+        chunks = iter_ndjson(user, chunk_size=options['chunk_size'])
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as output:
+                output.writelines(chunks)
+        else:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
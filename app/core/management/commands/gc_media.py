@@ -0,0 +1,89 @@
+"""
+Django command to delete media files no recipe refers to.
+"""
+import os
+import time
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+
+from core.models import ImageJob, Recipe
+from recipe.images import rendition_names
+
+# Directories below MEDIA_ROOT holding files managed by the API
+MANAGED_DIRS = ['uploads/recipe']
+
+
+class Command(BaseCommand):
+    """Django command to sweep orphaned media files
+
+    Collects every name referenced by a recipe image, its renditions or
+    a queued job, then deletes the other files in the managed
+    directories. Files modified within the grace period are kept, since
+    an upload of the same content may not be committed yet.
+    """
+    help = 'Delete recipe images and renditions no longer referenced'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace', type=int, default=settings.MEDIA_GC_GRACE,
+            help='Keep files modified less than this many seconds ago',
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Only report what would be deleted',
+        )
+
+    def handle(self, *args, **options):
+        """Entry point for command"""
+        # Taken before reading the references, so files saved during the
+        # sweep are always newer
+        cutoff = time.time() - options['grace']
+        referenced = self._referenced()
+
+        deleted = kept = freed = 0
+        for name, path in self._files():
+            if name in referenced:
+                kept += 1
+                continue
+            stat = os.stat(path)
+            if stat.st_mtime > cutoff:
+                kept += 1
+                continue
+
+            deleted += 1
+            freed += stat.st_size
+            if options['dry_run']:
+                self.stdout.write(f'Would delete {name}')
+            else:
+                default_storage.delete(name)
+
+        verb = 'Would free' if options['dry_run'] else 'Freed'
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb} {freed} bytes in {deleted} files, kept {kept}'
+        ))
+
+    def _referenced(self):
+        """Return the names of all media files in use"""
+        referenced = set(
+            ImageJob.objects.values_list('source', flat=True).distinct()
+        )
+        recipes = Recipe.objects.filter(image__isnull=False).exclude(
+            image='',
+        ).values_list('image', 'image_renditions')
+        for image, renditions in recipes.iterator(chunk_size=2000):
+            referenced.add(image)
+            referenced.update(rendition_names(renditions))
+
+        return referenced
+
+    def _files(self):
+        """Yield the (name, path) of the files in the managed directories"""
+        for directory in MANAGED_DIRS:
+            root = default_storage.path(directory)
+            for dirpath, _, filenames in os.walk(root):
+                for filename in filenames:
+                    path = os.path.join(dirpath, filename)
+                    name = os.path.relpath(path, default_storage.location)
+                    yield name.replace(os.sep, '/'), path
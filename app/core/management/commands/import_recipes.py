@@ -0,0 +1,200 @@
+"""
+Django command to bulk import recipes from NDJSON or CSV files.
+"""
+import csv
+import json
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from core.models import Recipe, Tag, Ingredient
+from recipe.cache import invalidate_user
+from recipe.search import update_search_vectors
+
+RECIPE_FIELDS = ['title', 'description', 'time_minutes', 'price', 'link']
+
+
+class Command(BaseCommand):
+    """Django command to import recipes in chunks with bulk inserts"""
+    help = 'Import recipes with their tag and ingredient names from files'
+
+    def add_arguments(self, parser):
+        parser.add_argument('files', nargs='+', help='Files to import')
+        parser.add_argument(
+            '--format', choices=['ndjson', 'csv'],
+            help='Input format (defaults to the file extension)',
+        )
+        parser.add_argument(
+            '--user',
+            help='Email of the owner for rows without a "user" column',
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=1000,
+            help='Number of recipes inserted per transaction',
+        )
+        parser.add_argument(
+            '--separator', default='|',
+            help='Separator for tag and ingredient names in CSV files',
+        )
+
+    def handle(self, *args, **options):
+        """Entry point for command"""
+        self.options = options
+        self.users = {}
+        # (model, user id) -> {name: id}, so no name is looked up twice
+        self.attr_ids = {}
+        self.imported = 0
+        self.skipped = 0
+
+        for path in options['files']:
+            fmt = options['format'] or path.rsplit('.', 1)[-1].lower()
+            if fmt not in ('ndjson', 'jsonl', 'csv'):
+                raise CommandError(f'Unknown format for {path}')
+
+            with open(path, newline='', encoding='utf-8') as source:
+                rows = (
+                    self._read_csv(source) if fmt == 'csv'
+                    else self._read_ndjson(source)
+                )
+                while True:
+                    chunk = list(islice(rows, options['chunk_size']))
+                    if not chunk:
+                        break
+                    self._import_chunk(path, chunk)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {self.imported} recipes, skipped {self.skipped}.'
+        ))
+
+    def _read_ndjson(self, source):
+        """Yield (line number, row) pairs from an NDJSON file"""
+        for line_no, line in enumerate(source, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as exc:
+                row = exc
+            yield line_no, row
+
+    def _read_csv(self, source):
+        """Yield (line number, row) pairs from a CSV file"""
+        separator = self.options['separator']
+        for line_no, row in enumerate(csv.DictReader(source), start=2):
+            for field in ['tags', 'ingredients']:
+                row[field] = [
+                    name for name in (row.get(field) or '').split(separator)
+                    if name.strip()
+                ]
+            yield line_no, row
+
+    def _get_user(self, email):
+        """Return the user with the given email"""
+        email = email or self.options['user']
+        if not email:
+            raise ValidationError('No user given for row.')
+        if email not in self.users:
+            user = get_user_model().objects.filter(email=email).first()
+            if user is None:
+                raise ValidationError(f'Unknown user {email}.')
+            self.users[email] = user
+
+        return self.users[email]
+
+    def _get_names(self, model, values):
+        """Return the names of tags or ingredients given as str or dict
+
+        Names are stripped and checked like the API does, so a bad name
+        skips its row instead of failing the chunk's insert.
+        """
+        label = model._meta.verbose_name
+        max_length = model._meta.get_field('name').max_length
+        names = []
+        for value in values or []:
+            name = value['name'] if isinstance(value, dict) else value
+            name = str(name).strip()
+            if not name:
+                raise ValidationError(f'Empty {label} name.')
+            if len(name) > max_length:
+                raise ValidationError(
+                    f'{label.capitalize()} name longer than {max_length} '
+                    'characters.'
+                )
+            names.append(name)
+
+        return list(dict.fromkeys(names))
+
+    def _build_recipe(self, row):
+        """Return an unsaved recipe and its tag and ingredient names"""
+        if isinstance(row, ValueError):
+            raise row
+        if not isinstance(row, dict):
+            raise ValidationError('Row is not a JSON object.')
+        recipe = Recipe(
+            user=self._get_user(row.get('user')),
+            **{
+                field: row[field] for field in RECIPE_FIELDS
+                if row.get(field) not in (None, '')
+            },
+        )
+        recipe.clean_fields(exclude=['user', 'image'])
+
+        return (
+            recipe,
+            self._get_names(Tag, row.get('tags')),
+            self._get_names(Ingredient, row.get('ingredients')),
+        )
+
+    def _resolve_names(self, model, names_by_user):
+        """Fill the name to id maps for any names not seen before"""
+        for user, names in names_by_user.items():
+            known = self.attr_ids.setdefault((model, user.id), {})
+            missing = [name for name in names if name not in known]
+            if missing:
+                objs = model.objects.get_or_create_many(user, missing)
+                known.update({name: obj.id for name, obj in objs.items()})
+
+    def _import_chunk(self, path, chunk):
+        """Insert one chunk of rows"""
+        entries = []
+        for line_no, row in chunk:
+            try:
+                entries.append(self._build_recipe(row))
+            except (ValidationError, ValueError, TypeError, KeyError) as exc:
+                self.skipped += 1
+                self.stderr.write(f'{path}:{line_no}: skipped, {exc}')
+
+        tag_names = {}
+        ingredient_names = {}
+        for recipe, tags, ingredients in entries:
+            tag_names.setdefault(recipe.user, set()).update(tags)
+            ingredient_names.setdefault(recipe.user, set()).update(ingredients)
+
+        with transaction.atomic():
+            self._resolve_names(Tag, tag_names)
+            self._resolve_names(Ingredient, ingredient_names)
+            Recipe.objects.bulk_create([recipe for recipe, _, _ in entries])
+            Recipe.tags.through.objects.bulk_create([
+                Recipe.tags.through(
+                    recipe_id=recipe.id,
+                    tag_id=self.attr_ids[(Tag, recipe.user_id)][name],
+                )
+                for recipe, tags, _ in entries for name in tags
+            ])
+            Recipe.ingredients.through.objects.bulk_create([
+                Recipe.ingredients.through(
+                    recipe_id=recipe.id,
+                    ingredient_id=self.attr_ids[
+                        (Ingredient, recipe.user_id)
+                    ][name],
+                )
+                for recipe, _, ingredients in entries for name in ingredients
+            ])
+            update_search_vectors(recipe.id for recipe, _, _ in entries)
+            for user_id in {recipe.user_id for recipe, _, _ in entries}:
+                invalidate_user(user_id)
+
+        self.imported += len(entries)
@@ -0,0 +1,45 @@
+"""
+Django command to apply migrations only when some are pending.
+"""
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from core.db.schema import migration_lock, pending_migrations
+
+
+class Command(BaseCommand):
+    """Django command to migrate on container start
+
+    When nothing is pending, as on most starts, this costs a read of the
+    migrations table and takes no locks. Otherwise it waits for the
+    migration lock, so of many containers starting at once only one
+    migrates, and checks again once it holds the lock, as the previous
+    holder has usually applied everything.
+    """
+    help = 'Apply pending migrations under an advisory lock'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--database', default=DEFAULT_DB_ALIAS,
+            help='Database to migrate',
+        )
+
+    def handle(self, *args, **options):
+        """Entry point for command"""
+        connection = connections[options['database']]
+        if not pending_migrations(connection):
+            self.stdout.write('No migrations to apply.')
+            return
+
+        self.stdout.write('Waiting for the migration lock...')
+        with migration_lock(connection):
+            if not pending_migrations(connection):
+                self.stdout.write('Migrations applied by another container.')
+                return
+
+            call_command(
+                'migrate', database=connection.alias, interactive=False,
+                verbosity=options['verbosity'],
+                stdout=self.stdout, stderr=self.stderr,
+            )
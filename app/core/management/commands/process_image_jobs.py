@@ -0,0 +1,156 @@
+"""
+Django command to render queued recipe image renditions.
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from PIL import Image
+
+from core.models import ImageJob, Recipe
+from recipe.cache import invalidate_user
+from recipe.images import render
+
+# Errors retrying cannot fix
+PERMANENT_ERRORS = (Image.UnidentifiedImageError, Image.DecompressionBombError)
+
+
+class Command(BaseCommand):
+    """Django command to work through the image job queue
+
+    Jobs are claimed with SELECT ... FOR UPDATE SKIP LOCKED, so several
+    workers can share the queue. Only rendering runs on the thread pool;
+    the queue is read and written from the main thread.
+    """
+    help = 'Render the renditions of uploaded recipe images'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=settings.IMAGE_JOB_WORKERS,
+            help='Number of images rendered at once',
+        )
+        parser.add_argument(
+            '--batch', type=int,
+            help='Jobs claimed at a time (defaults to twice the workers)',
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Exit once the queue is empty instead of polling',
+        )
+        parser.add_argument(
+            '--poll-interval', type=float, default=2.0,
+            help='Seconds to wait before checking an empty queue again',
+        )
+        parser.add_argument(
+            '--stale-after', type=int, default=600,
+            help='Seconds after which a running job is taken over',
+        )
+        parser.add_argument(
+            '--max-attempts', type=int, default=3,
+            help='Attempts before a job is marked as failed',
+        )
+
+    def handle(self, *args, **options):
+        """Entry point for command"""
+        self.options = options
+        batch = options['batch'] or options['workers'] * 2
+        done = failed = 0
+
+        with ThreadPoolExecutor(
+            options['workers'], thread_name_prefix='image-render',
+        ) as executor:
+            while True:
+                jobs = self._claim(batch)
+                if not jobs:
+                    if options['once']:
+                        break
+                    time.sleep(options['poll_interval'])
+                    continue
+
+                futures = {
+                    executor.submit(render, job.source): job for job in jobs
+                }
+                for future in as_completed(futures):
+                    if self._finish(futures[future], future):
+                        done += 1
+                    else:
+                        failed += 1
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Rendered {done} images, {failed} failed'
+        ))
+
+    def _claim(self, batch):
+        """Mark up to batch jobs as running and return them"""
+        stale = timezone.now() - timedelta(seconds=self.options['stale_after'])
+        ImageJob.objects.filter(
+            status=ImageJob.RUNNING,
+            updated_at__lt=stale,
+            attempts__gte=self.options['max_attempts'],
+        ).update(status=ImageJob.FAILED, error='Timed out')
+
+        with transaction.atomic():
+            jobs = list(
+                ImageJob.objects.select_for_update(skip_locked=True).filter(
+                    Q(status=ImageJob.PENDING)
+                    | Q(status=ImageJob.RUNNING, updated_at__lt=stale)
+                ).order_by('id')[:batch]
+            )
+            ImageJob.objects.filter(pk__in=[job.pk for job in jobs]).update(
+                status=ImageJob.RUNNING,
+                attempts=F('attempts') + 1,
+                updated_at=timezone.now(),
+            )
+
+        current = set(
+            Recipe.objects.filter(
+                pk__in=[job.recipe_id for job in jobs],
+            ).values_list('pk', 'image')
+        )
+        obsolete = [
+            job.pk for job in jobs
+            if (job.recipe_id, job.source) not in current
+        ]
+        # The image was replaced or removed since the job was queued
+        ImageJob.objects.filter(pk__in=obsolete).delete()
+
+        return [job for job in jobs if job.pk not in obsolete]
+
+    def _finish(self, job, future):
+        """Record the outcome of a job, returning True on success"""
+        try:
+            renditions = future.result()
+        except Exception as exc:
+            attempts = job.attempts + 1
+            permanent = isinstance(exc, PERMANENT_ERRORS)
+            ImageJob.objects.filter(pk=job.pk).update(
+                status=(
+                    ImageJob.FAILED
+                    if permanent or attempts >= self.options['max_attempts']
+                    else ImageJob.PENDING
+                ),
+                error=f'{type(exc).__name__}: {exc}',
+                updated_at=timezone.now(),
+            )
+            self.stderr.write(f'Failed to render {job.source}: {exc}')
+            return False
+
+        recipes = Recipe.objects.filter(pk=job.recipe_id, image=job.source)
+        user_id = recipes.values_list('user_id', flat=True).first()
+        updated = recipes.update(
+            image_renditions=renditions, updated_at=timezone.now(),
+        )
+        # If the image was replaced while rendering, gc_media removes the
+        # renditions; other images may share them
+        if updated:
+            invalidate_user(user_id)
+        ImageJob.objects.filter(pk=job.pk).delete()
+
+        if self.options['verbosity'] > 1:
+            self.stdout.write(f'Rendered {job.source}')
+        return True
@@ -0,0 +1,50 @@
+# Generated by Django 3.2.25 on 2026-10-17 04:24
+
+from django.db import migrations
+from django.db.models import Count, Min
+
+
+def merge_duplicate_names(apps, schema_editor):
+    """Merge tags and ingredients sharing a name for the same user
+
+    The oldest object of each group is kept and the recipes linked to
+    the others are moved over to it, so the unique constraint added in
+    the next migration can be created.
+    """
+    Recipe = apps.get_model('core', 'Recipe')
+    for field, model_name in [('tags', 'Tag'), ('ingredients', 'Ingredient')]:
+        model = apps.get_model('core', model_name)
+        through = getattr(Recipe, field).through
+        target_id = f'{model_name.lower()}_id'
+        duplicates = model.objects.values('user', 'name').annotate(
+            keep=Min('id'), count=Count('id'),
+        ).filter(count__gt=1)
+
+        for duplicate in duplicates:
+            others = model.objects.filter(
+                user=duplicate['user'], name=duplicate['name'],
+            ).exclude(id=duplicate['keep'])
+            linked = set(through.objects.filter(
+                **{target_id: duplicate['keep']}
+            ).values_list('recipe_id', flat=True))
+
+            for link in through.objects.filter(**{f'{target_id}__in': others}):
+                if link.recipe_id in linked:
+                    link.delete()
+                    continue
+                setattr(link, target_id, duplicate['keep'])
+                link.save()
+                linked.add(link.recipe_id)
+
+            others.delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_recipe_image'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_names, migrations.RunPython.noop),
+    ]
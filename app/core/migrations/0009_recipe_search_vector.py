@@ -0,0 +1,46 @@
+# Generated by Django 3.2.25 on 2026-10-17 04:52
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+# Same vector as recipe.search.get_search_vector(), written out so the
+# migration does not depend on the current models. Filled in before the
+# index is built, which is much faster than updating an indexed column.
+BACKFILL_SQL = """
+UPDATE core_recipe AS r SET search_vector =
+    setweight(to_tsvector('english', coalesce(r.title, '')), 'A')
+    || setweight(to_tsvector('english', coalesce(r.description, '')), 'B')
+    || setweight(to_tsvector('english', coalesce((
+        SELECT string_agg(t.name, ' ')
+        FROM core_recipe_tags AS rt
+        JOIN core_tag AS t ON t.id = rt.tag_id
+        WHERE rt.recipe_id = r.id
+    ), '')), 'C')
+    || setweight(to_tsvector('english', coalesce((
+        SELECT string_agg(i.name, ' ')
+        FROM core_recipe_ingredients AS ri
+        JOIN core_ingredient AS i ON i.id = ri.ingredient_id
+        WHERE ri.recipe_id = r.id
+    ), '')), 'C')
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_recipe_attr_unique_names'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunSQL(BACKFILL_SQL, migrations.RunSQL.noop),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='recipe_search_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 3.2.25 on 2026-10-17 05:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_image_renditions'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(condition=models.Q(('image', ''), _negated=True), fields=['image'], name='recipe_image_idx'),
+        ),
+    ]
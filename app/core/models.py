@@ -5,11 +5,17 @@ import uuid
 import os
 
 from django.conf import settings
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin
 
 def recipe_image_file_path(instance, filename):
-    """ Generate file path for new recipe image """
+    """ Generate file path for new recipe image
+
+    The content addressed storage keeps only the directory and extension
+    and names the file after a hash of its content.
+    """
     ext = filename.split('.')[-1]
     filename = f'{uuid.uuid4()}.{ext}'
 
@@ -46,6 +52,8 @@ class User(AbstractBaseUser, PermissionsMixin):
     name = models.CharField(max_length=255)
     is_active = models.BooleanField(default=True)
     is_staff = models.BooleanField(default=False)
+    # Bumped to revoke all signed tokens issued to the user so far
+    token_epoch = models.PositiveIntegerField(default=0)
 
     objects = UserManager()
 
@@ -65,10 +73,56 @@ class Recipe(models.Model):
     tags = models.ManyToManyField('Tag')
     ingredients = models.ManyToManyField('Ingredient')
     image = models.ImageField(null=True, upload_to=recipe_image_file_path)
+    updated_at = models.DateTimeField(auto_now=True)
+    # Resized copies of the image, filled in by process_image_jobs
+    image_renditions = models.JSONField(default=dict, editable=False)
+    # Weighted title, description, tag and ingredient names, kept up to
+    # date by recipe.search
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            # Serves the per-user, newest first list ordering
+            models.Index(
+                fields=['user', '-id'], name='recipe_user_id_desc_idx',
+            ),
+            GinIndex(fields=['search_vector'], name='recipe_search_idx'),
+            # Counts the recipes sharing a stored image
+            models.Index(
+                fields=['image'], name='recipe_image_idx',
+                condition=~models.Q(image=''),
+            ),
+        ]
 
     def __str__(self):
         return self.title
 
+
+class RecipeAttrManager(models.Manager):
+    """ Manager for user owned recipe attributes """
+
+    def get_or_create_many(self, user, names):
+        """ Return a name to object map, creating missing names in bulk """
+        names = list(dict.fromkeys(names))
+        existing = {
+            obj.name: obj
+            for obj in self.filter(user=user, name__in=names)
+        }
+        missing = [name for name in names if name not in existing]
+        if missing:
+            # Names are unique per user, so concurrent writers inserting
+            # the same name are skipped and the winner's row is read back.
+            self.bulk_create(
+                [self.model(user=user, name=name) for name in missing],
+                ignore_conflicts=True,
+            )
+            existing.update(
+                (obj.name, obj)
+                for obj in self.filter(user=user, name__in=missing)
+            )
+
+        return existing
+
 class Tag(models.Model):
     """ Tag for filtering recipes """
     user = models.ForeignKey(
@@ -76,6 +130,16 @@ class Tag(models.Model):
         on_delete=models.CASCADE,
     )
     name = models.CharField(max_length=255)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = RecipeAttrManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'name'], name='unique_tag_name_per_user',
+            ),
+        ]
 
     def __str__(self):
         return self.name
@@ -87,6 +151,71 @@ class Ingredient(models.Model):
         on_delete=models.CASCADE,
     )
     name = models.CharField(max_length=255)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = RecipeAttrManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'name'],
+                name='unique_ingredient_name_per_user',
+            ),
+        ]
+
+    def __str__(self):
+        return self.name
+
+
+class ImageJob(models.Model):
+    """ Queued rendition work for an uploaded recipe image """
+    PENDING = 'pending'
+    RUNNING = 'running'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (FAILED, 'Failed'),
+    ]
+
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='image_jobs',
+    )
+    # Name of the stored image to render; stale once the image changes
+    source = models.CharField(max_length=255)
+    status = models.CharField(
+        max_length=10, choices=STATUS_CHOICES, default=PENDING,
+    )
+    attempts = models.PositiveSmallIntegerField(default=0)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # Serves the worker's claim query
+            models.Index(
+                fields=['status', 'updated_at'],
+                name='imagejob_status_updated_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.source} ({self.status})'
+
+
+class UsedRefreshToken(models.Model):
+    """ Refresh token already exchanged, by its unique id """
+    jti = models.CharField(max_length=32, primary_key=True)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='used_refresh_tokens',
+    )
+    # Once past, the token itself has expired and the row can go
+    expires_at = models.DateTimeField()
 
     def __str__(self):
-        return self.name
\ No newline at end of file
+        return self.jti
@@ -0,0 +1,46 @@
+"""
+Parsers for the API
+"""
+import codecs
+
+from django.conf import settings
+from rest_framework import parsers
+
+from core.renderers import FastJSONRenderer, orjson
+
+
+class FastJSONParser(parsers.JSONParser):
+    """JSONParser decoding with orjson when it is installed
+
+    Bodies orjson rejects are parsed again by JSONParser, which accepts
+    integers beyond 64 bits and words its errors as before. Installs
+    without orjson, and bodies in encodings other than UTF-8, use
+    JSONParser itself.
+    """
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        if orjson is None or codecs.lookup(encoding).name != 'utf-8':
+            return super().parse(stream, media_type, parser_context)
+
+        body = stream.read() if stream is not None else b''
+        try:
+            return orjson.loads(body)
+        except orjson.JSONDecodeError:
+            return super().parse(
+                _BytesStream(body), media_type, parser_context,
+            )
+
+
+class _BytesStream:
+    """Minimal stream over bytes already read from the request"""
+
+    def __init__(self, data):
+        self.data = data
+
+    def read(self, size=-1):
+        data = self.data if size is None or size < 0 else self.data[:size]
+        self.data = self.data[len(data):]
+        return data
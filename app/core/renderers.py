@@ -0,0 +1,70 @@
+"""
+Renderers for the API
+"""
+import decimal
+
+from rest_framework import renderers
+from rest_framework.utils import encoders
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+_encoder = encoders.JSONEncoder()
+
+
+def encode_default(obj):
+    """Return a JSON encodable stand-in for objects orjson cannot encode"""
+    # Checked first as the most common case, e.g. prices in values()
+    # rows; rendered as floats like DRF's encoder does
+    if isinstance(obj, decimal.Decimal):
+        return float(obj)
+
+    return _encoder.default(obj)
+
+
+class FastJSONRenderer(renderers.JSONRenderer):
+    """JSONRenderer encoding with orjson when it is installed
+
+    The output decodes to the same values as JSONRenderer's: compact,
+    UTF-8, with U+2028 and U+2029 escaped and dates formatted by DRF's
+    encoder. Floats needing an exponent are spelled differently (1e16
+    for 1e+16, 1e-7 for 1e-07), and NaN and infinite floats become null
+    instead of raising. Indented or ASCII-only output, data orjson
+    rejects (such as integers beyond 64 bits) and installs without
+    orjson use JSONRenderer itself.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            orjson is None
+            or data is None
+            or not self.compact
+            or self.ensure_ascii
+            or self.get_indent(accepted_media_type, renderer_context or {})
+        ):
+            return super().render(
+                data, accepted_media_type, renderer_context,
+            )
+
+        try:
+            ret = orjson.dumps(
+                data,
+                default=encode_default,
+                option=(
+                    orjson.OPT_NON_STR_KEYS
+                    | orjson.OPT_PASSTHROUGH_DATETIME
+                    | orjson.OPT_PASSTHROUGH_DATACLASS
+                ),
+            )
+        except orjson.JSONEncodeError:
+            return super().render(
+                data, accepted_media_type, renderer_context,
+            )
+
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(
+                b'\xe2\x80\xa9', b'\\u2029',
+            )
+        return ret
@@ -0,0 +1,56 @@
+"""
+File storage for uploaded media
+"""
+import hashlib
+import os
+import posixpath
+import re
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.core.files.utils import validate_file_name
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """File system storage naming files after the SHA-256 of their content
+
+    The directory and extension of the requested name are kept, the
+    file name becomes the digest below a two character fan-out
+    directory: uploads/recipe/3f/3fa9...c2.jpg. Saving content that is
+    already stored writes nothing and returns the existing name, so
+    identical uploads share one file. Its modification time is updated,
+    marking it as recently used for the garbage collector.
+    """
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        validate_file_name(name, allow_relative_path=True)
+
+        name = self.get_content_name(name, content)
+        if self.exists(name):
+            os.utime(self.path(name))
+            return name
+
+        stored = self._save(name, content)
+        if stored != name:
+            # Another process saved the same content in the meantime
+            self.delete(stored)
+
+        return name
+
+    def get_content_name(self, name, content):
+        """Return the name content is stored under"""
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        content.seek(0)
+        digest = digest.hexdigest()
+
+        directory, filename = posixpath.split(name.replace('\\', '/'))
+        extension = os.path.splitext(filename)[1].lower()
+        extension = re.sub(r'[^a-z0-9.]', '', extension)[:10]
+
+        return posixpath.join(directory, digest[:2], digest + extension)
@@ -0,0 +1,120 @@
+"""
+Tests for serving reads and logins concurrently under ASGI
+"""
+import threading
+from unittest.mock import patch
+
+from asgiref.sync import async_to_sync
+from django.test import SimpleTestCase, override_settings
+from django.urls import path
+
+from rest_framework import permissions
+from rest_framework.response import Response
+from rest_framework.test import APIRequestFactory
+from rest_framework.views import APIView
+
+from core.async_views import (
+    login_concurrently,
+    read_concurrently,
+    read_concurrently_patterns,
+)
+
+
+class ThreadView(APIView):
+    """Report the thread the request ran on"""
+    authentication_classes = []
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request):
+        return Response({'thread': threading.current_thread().name})
+
+    def post(self, request):
+        return Response({'thread': threading.current_thread().name})
+
+
+class ReadConcurrentlyTests(SimpleTestCase):
+    """Test read_concurrently()"""
+
+    def setUp(self):
+        self.factory = APIRequestFactory()
+
+    def test_unchanged_in_wsgi_mode(self):
+        """Test views are left synchronous in WSGI mode"""
+        view = ThreadView.as_view()
+
+        self.assertIs(read_concurrently(view), view)
+
+    @override_settings(SERVER_MODE='asgi')
+    def test_reads_on_read_threads(self):
+        """Test GET requests run and render on the read threads"""
+        view = read_concurrently(ThreadView.as_view())
+
+        res = async_to_sync(view)(self.factory.get('/'))
+
+        self.assertTrue(res.is_rendered)
+        self.assertTrue(res.data['thread'].startswith('read'))
+
+    @override_settings(SERVER_MODE='asgi')
+    def test_writes_on_shared_thread(self):
+        """Test other methods run on the shared thread"""
+        view = read_concurrently(ThreadView.as_view())
+
+        res = async_to_sync(view)(self.factory.post('/'))
+
+        self.assertEqual(res.data['thread'], threading.current_thread().name)
+
+    @override_settings(SERVER_MODE='asgi')
+    @patch('core.async_views.close_old_connections')
+    def test_connections_handled_per_request(self, close_old_connections):
+        """Test read threads handle their connections around each request"""
+        view = read_concurrently(ThreadView.as_view())
+
+        async_to_sync(view)(self.factory.get('/'))
+
+        self.assertEqual(close_old_connections.call_count, 2)
+
+    @override_settings(SERVER_MODE='asgi')
+    def test_view_attributes_kept(self):
+        """Test the wrapper keeps the view's attributes"""
+        view = ThreadView.as_view()
+
+        wrapped = read_concurrently(view)
+
+        self.assertIs(wrapped.cls, ThreadView)
+        self.assertTrue(wrapped.csrf_exempt)
+
+    @override_settings(SERVER_MODE='asgi')
+    def test_named_patterns(self):
+        """Test only the named URL patterns are wrapped"""
+        view = ThreadView.as_view()
+        patterns = [
+            path('read/', view, name='read'),
+            path('other/', view, name='other'),
+        ]
+
+        read_concurrently_patterns(patterns, ['read'])
+
+        self.assertIsNot(patterns[0].callback, view)
+        self.assertIs(patterns[1].callback, view)
+
+
+class LoginConcurrentlyTests(SimpleTestCase):
+    """Test login_concurrently()"""
+
+    def setUp(self):
+        self.factory = APIRequestFactory()
+
+    def test_unchanged_in_wsgi_mode(self):
+        """Test views are left synchronous in WSGI mode"""
+        view = ThreadView.as_view()
+
+        self.assertIs(login_concurrently(view), view)
+
+    @override_settings(SERVER_MODE='asgi')
+    def test_logins_on_login_threads(self):
+        """Test POST requests run off the shared thread"""
+        view = login_concurrently(ThreadView.as_view())
+
+        res = async_to_sync(view)(self.factory.post('/'))
+
+        self.assertTrue(res.data['thread'].startswith('login'))
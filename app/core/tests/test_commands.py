@@ -2,11 +2,23 @@
 Test custom Django management commands.
 """
 
+from decimal import Decimal
+import io
+import json
+import os
+import tempfile
+
 from unittest.mock import patch
 from psycopg2 import OperationalError as Psycopg2OpError
+from django.contrib.auth import get_user_model
 from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
 from django.db.utils import OperationalError
-from django.test import SimpleTestCase
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from core.db.schema import migration_lock
+from core.models import Recipe, Tag, Ingredient
 
 @patch('core.management.commands.wait_for_db.Command.check')
 class CommandTest(SimpleTestCase):
@@ -31,3 +43,275 @@ class CommandTest(SimpleTestCase):
         self.assertEqual(patched_check.call_count, 6)
         patched_check.assert_called_with(databases=['default'])
 
+
+class ExportRecipesCommandTests(TestCase):
+    """Test the export_recipes command"""
+
+    def test_export_recipes_to_file(self):
+        """Test recipes are written as one JSON document per line"""
+        user = get_user_model().objects.create_user(
+            'user@example.com', 'test123',
+        )
+        for title in ['Curry', 'Soup', 'Salad']:
+            Recipe.objects.create(
+                user=user, title=title, time_minutes=5, price=Decimal('1.00'),
+            )
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'recipes.ndjson')
+            call_command(
+                'export_recipes', 'user@example.com',
+                output=path, chunk_size=2,
+            )
+            with open(path) as output:
+                recipes = [json.loads(line) for line in output]
+
+        self.assertEqual(
+            [recipe['title'] for recipe in recipes],
+            ['Curry', 'Soup', 'Salad'],
+        )
+
+    def test_export_recipes_unknown_user(self):
+        """Test exporting for an unknown user fails"""
+        with self.assertRaises(CommandError):
+            call_command('export_recipes', 'nobody@example.com')
+
+
+class ImportRecipesCommandTests(TestCase):
+    """Test the import_recipes command"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'user@example.com', 'test123',
+        )
+        self.tmpdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _write(self, name, content):
+        """Write content to a file in the temporary directory"""
+        path = os.path.join(self.tmpdir.name, name)
+        with open(path, 'w') as source:
+            source.write(content)
+        return path
+
+    def test_import_recipes_from_ndjson(self):
+        """Test importing recipes, reusing existing tags"""
+        dinner = Tag.objects.create(user=self.user, name='Dinner')
+        rows = [
+            {
+                'title': f'Recipe {i}', 'time_minutes': 10, 'price': '2.50',
+                'tags': ['Dinner', f'Tag {i % 2}'],
+                'ingredients': [{'name': 'Salt'}],
+            }
+            for i in range(5)
+        ]
+        path = self._write(
+            'recipes.ndjson', '\n'.join(json.dumps(row) for row in rows),
+        )
+
+        call_command(
+            'import_recipes', path, user='user@example.com', chunk_size=2,
+            stdout=io.StringIO(),
+        )
+
+        recipes = Recipe.objects.filter(user=self.user)
+        self.assertEqual(recipes.count(), 5)
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 3)
+        self.assertEqual(Ingredient.objects.filter(user=self.user).count(), 1)
+        self.assertEqual(dinner.recipe_set.count(), 5)
+        recipe = recipes.get(title='Recipe 3')
+        self.assertEqual(recipe.price, Decimal('2.50'))
+        self.assertEqual(
+            sorted(tag.name for tag in recipe.tags.all()), ['Dinner', 'Tag 1'],
+        )
+
+    def test_import_recipes_from_csv(self):
+        """Test importing recipes from CSV with per-row owners"""
+        other = get_user_model().objects.create_user(
+            'other@example.com', 'test123',
+        )
+        path = self._write('recipes.csv', (
+            'user,title,time_minutes,price,tags,ingredients\n'
+            'user@example.com,Curry,30,5.00,Spicy|Dinner,Rice|Chicken\n'
+            'other@example.com,Soup,20,3.00,Dinner,Leek\n'
+        ))
+
+        call_command('import_recipes', path, stdout=io.StringIO())
+
+        curry = Recipe.objects.get(user=self.user)
+        soup = Recipe.objects.get(user=other)
+        self.assertEqual(curry.title, 'Curry')
+        self.assertEqual(curry.ingredients.count(), 2)
+        self.assertEqual(
+            [tag.name for tag in soup.tags.all()], ['Dinner'],
+        )
+        self.assertEqual(soup.tags.get().user, other)
+
+    def test_import_recipes_skips_invalid_rows(self):
+        """Test invalid rows are reported and the rest imported"""
+        path = self._write('recipes.ndjson', '\n'.join([
+            json.dumps({'title': 'Good', 'time_minutes': 5, 'price': '1'}),
+            json.dumps({'title': 'Bad', 'time_minutes': 'x', 'price': '1'}),
+            '{not json',
+            json.dumps({
+                'title': 'Stranger', 'time_minutes': 5, 'price': '1',
+                'user': 'nobody@example.com',
+            }),
+        ]))
+        stderr = io.StringIO()
+
+        call_command(
+            'import_recipes', path, user='user@example.com',
+            stdout=io.StringIO(), stderr=stderr,
+        )
+
+        self.assertEqual(
+            list(Recipe.objects.values_list('title', flat=True)), ['Good'],
+        )
+        self.assertEqual(len(stderr.getvalue().splitlines()), 3)
+
+    def test_import_recipes_checks_names(self):
+        """Test rows with bad tag or ingredient names are skipped"""
+        path = self._write('recipes.ndjson', '\n'.join(json.dumps({
+            'title': title, 'time_minutes': 5, 'price': '1', **links,
+        }) for title, links in [
+            ('Good', {'tags': [' Dinner ', 'Dinner']}),
+            ('Long', {'tags': ['x' * 256]}),
+            ('Empty', {'ingredients': [{'name': '  '}]}),
+        ]))
+        stderr = io.StringIO()
+
+        call_command(
+            'import_recipes', path, user='user@example.com',
+            stdout=io.StringIO(), stderr=stderr,
+        )
+
+        recipe = Recipe.objects.get()
+        self.assertEqual(recipe.title, 'Good')
+        self.assertEqual(
+            [tag.name for tag in recipe.tags.all()], ['Dinner'],
+        )
+        self.assertEqual(len(stderr.getvalue().splitlines()), 2)
+
+
+class CollectstaticIfChangedTests(SimpleTestCase):
+    """Test the collectstatic_if_changed command"""
+
+    def setUp(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.static_root = os.path.join(tmpdir.name, 'static')
+        self.fingerprint_file = os.path.join(tmpdir.name, 'fingerprint')
+        patcher = override_settings(
+            STATIC_ROOT=self.static_root,
+            STATIC_FINGERPRINT_FILE=self.fingerprint_file,
+        )
+        patcher.enable()
+        self.addCleanup(patcher.disable)
+
+    def run_command(self, *args):
+        call_command('collectstatic_if_changed', *args, stdout=io.StringIO())
+
+    def test_collects_first_time(self):
+        """Test static files are collected into an empty STATIC_ROOT"""
+        self.run_command()
+
+        self.assertTrue(os.path.exists(
+            os.path.join(self.static_root, 'admin', 'css', 'base.css'),
+        ))
+
+    @patch('core.management.commands.collectstatic_if_changed.call_command')
+    def test_skips_when_unchanged(self, patched_call_command):
+        """Test collecting is skipped when the files were collected"""
+        self.run_command('--build')
+        os.makedirs(self.static_root)
+        with open(self.fingerprint_file) as built, open(
+            os.path.join(self.static_root, '.fingerprint'), 'w',
+        ) as collected:
+            collected.write(built.read())
+
+        self.run_command()
+
+        patched_call_command.assert_not_called()
+
+    @patch('core.management.commands.collectstatic_if_changed.call_command')
+    def test_collects_when_changed(self, patched_call_command):
+        """Test files are collected when the build's fingerprint differs"""
+        self.run_command('--build')
+        os.makedirs(self.static_root)
+        with open(os.path.join(self.static_root, '.fingerprint'), 'w') as f:
+            f.write('previous')
+
+        self.run_command()
+
+        patched_call_command.assert_called_once()
+        self.assertEqual(patched_call_command.call_args[0], ('collectstatic',))
+
+    def test_fingerprint_written_after_collecting(self):
+        """Test the next run skips after files were collected"""
+        self.run_command()
+
+        with patch(
+            'core.management.commands.collectstatic_if_changed.call_command',
+        ) as patched_call_command:
+            self.run_command()
+
+        patched_call_command.assert_not_called()
+
+
+@patch('core.management.commands.migrate_if_needed.call_command')
+@patch('core.management.commands.migrate_if_needed.pending_migrations')
+class MigrateIfNeededTests(TestCase):
+    """Test the migrate_if_needed command"""
+
+    def test_nothing_pending(self, patched_pending, patched_call_command):
+        """Test nothing is migrated or locked when nothing is pending"""
+        patched_pending.return_value = []
+
+        with patch(
+            'core.management.commands.migrate_if_needed.migration_lock',
+        ) as patched_lock:
+            call_command('migrate_if_needed', stdout=io.StringIO())
+
+        patched_lock.assert_not_called()
+        patched_call_command.assert_not_called()
+
+    def test_migrates_pending(self, patched_pending, patched_call_command):
+        """Test pending migrations are applied"""
+        patched_pending.return_value = ['migration']
+
+        call_command('migrate_if_needed', stdout=io.StringIO())
+
+        patched_call_command.assert_called_once()
+        self.assertEqual(patched_call_command.call_args[0], ('migrate',))
+
+    def test_applied_while_waiting(
+        self, patched_pending, patched_call_command,
+    ):
+        """Test migrations applied by the lock's previous holder are not"""
+        patched_pending.side_effect = [['migration'], []]
+
+        call_command('migrate_if_needed', stdout=io.StringIO())
+
+        patched_call_command.assert_not_called()
+
+
+class MigrationLockTests(TestCase):
+    """Test the migration advisory lock"""
+
+    def advisory_locks(self):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT count(*) FROM pg_locks WHERE locktype = 'advisory' "
+                'AND pid = pg_backend_pid()'
+            )
+            return cursor.fetchone()[0]
+
+    def test_lock_held_and_released(self):
+        """Test the lock is held inside the block only"""
+        with migration_lock(connection):
+            self.assertEqual(self.advisory_locks(), 1)
+
+        self.assertEqual(self.advisory_locks(), 0)
@@ -0,0 +1,290 @@
+"""
+Tests for the database backend's health checks and connection pool
+"""
+import time
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.db import connection, connections
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.db import pool, schema
+from core.db.backends.postgresql.base import DatabaseWrapper
+
+HEALTH_URL = reverse('core:health')
+CONNECTIONS_URL = reverse('core:connections')
+READY_URL = reverse('core:ready')
+
+
+def terminate(wrapper):
+    """End the server session of a wrapper's connection"""
+    pid = wrapper.connection.get_backend_pid()
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT pg_terminate_backend(%s)', [pid])
+
+
+class ConnectionTestCase(TestCase):
+
+    def setUp(self):
+        # Each test gets its own pools and counters
+        for registry in [pool._pools, pool._metrics]:
+            patcher = mock.patch.dict(registry, clear=True)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def make_wrapper(self, **options):
+        """Return a wrapper of the default database's connection settings"""
+        settings_dict = {
+            **connections['default'].settings_dict,
+            'CONN_MAX_AGE': 0 if options.get('SIZE') else 60,
+            'HEALTH_CHECKS': options.pop('HEALTH_CHECKS', True),
+            'POOL': options,
+        }
+        wrapper = DatabaseWrapper(settings_dict, 'default')
+        self.addCleanup(self.close_wrapper, wrapper)
+        return wrapper
+
+    def close_wrapper(self, wrapper):
+        wrapper.close()
+        connection_pool = pool._pools.get(wrapper.alias)
+        if connection_pool is not None:
+            connection_pool.close()
+
+    def metrics(self, wrapper):
+        return pool.get_metrics().get(wrapper.alias, {})
+
+
+class PersistentConnectionTests(ConnectionTestCase):
+    """Test persistent connections and their health checks"""
+
+    def test_connection_kept_between_requests(self):
+        """Test a connection is reused by the next request"""
+        wrapper = self.make_wrapper()
+        wrapper.ensure_connection()
+        raw = wrapper.connection
+
+        wrapper.close_if_unusable_or_obsolete()
+        with wrapper.cursor() as cursor:
+            cursor.execute('SELECT 1')
+
+        self.assertIs(wrapper.connection, raw)
+        self.assertEqual(self.metrics(wrapper)['opened'], 1)
+
+    def test_dropped_connection_replaced(self):
+        """Test a connection dropped between requests is replaced"""
+        wrapper = self.make_wrapper()
+        wrapper.ensure_connection()
+        raw = wrapper.connection
+        terminate(wrapper)
+
+        wrapper.close_if_unusable_or_obsolete()
+        with wrapper.cursor() as cursor:
+            cursor.execute('SELECT 1')
+            self.assertEqual(cursor.fetchone(), (1,))
+
+        self.assertIsNot(wrapper.connection, raw)
+        metrics = self.metrics(wrapper)
+        self.assertEqual(metrics['health_check_failures'], 1)
+        self.assertEqual(metrics['opened'], 2)
+
+    def test_checked_once_per_request(self):
+        """Test only the first query of a request checks the connection"""
+        wrapper = self.make_wrapper()
+        wrapper.ensure_connection()
+        wrapper.close_if_unusable_or_obsolete()
+
+        with wrapper.cursor() as cursor:
+            cursor.execute('SELECT 1')
+        self.assertFalse(wrapper.health_check_needed)
+
+    def test_health_checks_disabled(self):
+        """Test connections are not checked without HEALTH_CHECKS"""
+        wrapper = self.make_wrapper(HEALTH_CHECKS=False)
+        wrapper.ensure_connection()
+        wrapper.close_if_unusable_or_obsolete()
+
+        self.assertFalse(wrapper.health_check_needed)
+
+
+class ConnectionPoolTests(ConnectionTestCase):
+    """Test the in-process connection pool"""
+
+    def test_connection_reused(self):
+        """Test a connection handed back is reused"""
+        wrapper = self.make_wrapper(SIZE=2)
+        wrapper.ensure_connection()
+        raw = wrapper.connection
+        wrapper.close()
+
+        self.assertFalse(raw.closed)
+        wrapper.ensure_connection()
+
+        self.assertIs(wrapper.connection, raw)
+        metrics = self.metrics(wrapper)
+        self.assertEqual(metrics['opened'], 1)
+        self.assertEqual(metrics['reused'], 1)
+        self.assertEqual(metrics['pool'], {'size': 2, 'idle': 0, 'in_use': 1})
+
+    def test_shared_between_wrappers(self):
+        """Test connections of the same alias share one pool"""
+        first = self.make_wrapper(SIZE=2)
+        second = self.make_wrapper(SIZE=2)
+        first.ensure_connection()
+        raw = first.connection
+        first.close()
+
+        second.ensure_connection()
+
+        self.assertIs(second.connection, raw)
+
+    def test_idle_timeout(self):
+        """Test connections idle for too long are closed"""
+        wrapper = self.make_wrapper(SIZE=2, IDLE_TIMEOUT=0)
+        wrapper.ensure_connection()
+        raw = wrapper.connection
+        wrapper.close()
+
+        wrapper.ensure_connection()
+
+        self.assertIsNot(wrapper.connection, raw)
+        self.assertTrue(raw.closed)
+
+    def test_max_lifetime(self):
+        """Test connections past their lifetime are not reused"""
+        wrapper = self.make_wrapper(SIZE=2, MAX_LIFETIME=0)
+        wrapper.ensure_connection()
+        raw = wrapper.connection
+        wrapper.close()
+
+        self.assertTrue(raw.closed)
+        self.assertEqual(self.metrics(wrapper)['pool']['idle'], 0)
+
+    def test_discarded_after_errors(self):
+        """Test connections that saw errors are not reused"""
+        wrapper = self.make_wrapper(SIZE=2)
+        wrapper.ensure_connection()
+        raw = wrapper.connection
+        wrapper.errors_occurred = True
+        wrapper.close()
+
+        self.assertTrue(raw.closed)
+
+    def test_discarded_in_transaction(self):
+        """Test connections closed in a transaction are not reused"""
+        wrapper = self.make_wrapper(SIZE=2)
+        wrapper.ensure_connection()
+        raw = wrapper.connection
+        wrapper.set_autocommit(False)
+        with wrapper.cursor() as cursor:
+            cursor.execute('SELECT 1')
+        wrapper.close()
+
+        self.assertTrue(raw.closed)
+
+    def test_size_limit(self):
+        """Test waiting for a free connection times out"""
+        first = self.make_wrapper(SIZE=1, TIMEOUT=0.05)
+        second = self.make_wrapper(SIZE=1, TIMEOUT=0.05)
+        first.ensure_connection()
+
+        start = time.monotonic()
+        with self.assertRaises(pool.PoolTimeout):
+            second.ensure_connection()
+
+        self.assertGreaterEqual(time.monotonic() - start, 0.05)
+        metrics = self.metrics(first)
+        self.assertEqual(metrics['waits'], 1)
+        self.assertEqual(metrics['timeouts'], 1)
+
+        first.close()
+        second.ensure_connection()
+        self.assertEqual(metrics['pool']['size'], 1)
+
+    def test_dropped_connection_replaced(self):
+        """Test an idle connection dropped by the server is replaced"""
+        wrapper = self.make_wrapper(SIZE=2)
+        wrapper.ensure_connection()
+        raw = wrapper.connection
+        terminate(wrapper)
+        wrapper.close()
+
+        with wrapper.cursor() as cursor:
+            cursor.execute('SELECT 1')
+
+        self.assertIsNot(wrapper.connection, raw)
+        self.assertEqual(self.metrics(wrapper)['health_check_failures'], 1)
+
+    def test_new_pool_for_other_database(self):
+        """Test connections are not reused for other connection settings"""
+        wrapper = self.make_wrapper(SIZE=2)
+        wrapper.ensure_connection()
+        raw = wrapper.connection
+        wrapper.close()
+
+        wrapper.settings_dict['OPTIONS'] = {'application_name': 'other'}
+        wrapper.ensure_connection()
+
+        self.assertIsNot(wrapper.connection, raw)
+        self.assertTrue(raw.closed)
+
+
+class HealthApiTests(TestCase):
+    """Test the health endpoint"""
+    databases = '__all__'
+
+    def test_health(self):
+        """Test the health endpoint needs no login and reveals no details"""
+        res = APIClient().get(HEALTH_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, {'status': 'ok'})
+
+    def test_connection_metrics_admin_only(self):
+        """Test connection metrics are only shown to admins"""
+        client = APIClient()
+        user = get_user_model().objects.create_user(
+            email='user@example.com', password='test123',
+        )
+        admin = get_user_model().objects.create_superuser(
+            'admin@example.com', 'test123',
+        )
+
+        anonymous = client.get(CONNECTIONS_URL)
+        client.force_authenticate(user)
+        regular = client.get(CONNECTIONS_URL)
+        client.force_authenticate(admin)
+        res = client.get(CONNECTIONS_URL)
+
+        self.assertEqual(anonymous.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(regular.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIsInstance(res.data, dict)
+
+
+class ReadinessApiTests(TestCase):
+    """Test the readiness endpoint"""
+
+    def setUp(self):
+        patcher = mock.patch.object(schema, '_migrated', set())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_ready(self):
+        """Test a migrated database is ready, and remembered as such"""
+        res = APIClient().get(READY_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['status'], 'ready')
+        self.assertEqual(schema._migrated, {'default'})
+
+    @mock.patch('core.db.schema.pending_migrations', return_value=['0001'])
+    def test_migrations_pending(self, _):
+        """Test the app is not ready before migrating"""
+        res = APIClient().get(READY_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(res.data['status'], 'migrations pending')
@@ -2,6 +2,7 @@
 Tests for models.
 """
 from unittest.mock import patch
+from django.db import IntegrityError
 from django.test import TestCase
 from django.contrib.auth import get_user_model
 from decimal import Decimal
@@ -88,6 +89,32 @@ class ModelTests(TestCase):
 
         self.assertEqual(str(ingredient), ingredient.name)
 
+    def test_tag_name_unique_per_user(self):
+        """ Test a user cannot have two tags with the same name """
+        user = create_user()
+        models.Tag.objects.create(user=user, name='Vegan')
+        models.Tag.objects.create(
+            user=create_user(email='other@example.com'), name='Vegan',
+        )
+
+        with self.assertRaises(IntegrityError):
+            models.Tag.objects.create(user=user, name='Vegan')
+
+    def test_get_or_create_many(self):
+        """ Test existing names are reused and missing ones created """
+        user = create_user()
+        salt = models.Ingredient.objects.create(user=user, name='Salt')
+
+        with self.assertNumQueries(3):
+            objs = models.Ingredient.objects.get_or_create_many(
+                user, ['Salt', 'Pepper', 'Salt'],
+            )
+
+        self.assertEqual(objs['Salt'], salt)
+        self.assertEqual(objs['Pepper'].user, user)
+        self.assertIsNotNone(objs['Pepper'].id)
+        self.assertEqual(models.Ingredient.objects.count(), 2)
+
     @patch('core.models.uuid.uuid4')
     def test_recipe_file_name_uuid(self, mock_uuid):
         """ Test that image is saved in the correct location """
@@ -0,0 +1,136 @@
+"""
+Tests for the orjson backed renderer and parser
+"""
+import datetime
+import decimal
+import io
+import json
+import uuid
+from unittest.mock import patch
+
+from django.test import SimpleTestCase
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from core import parsers, renderers
+from core.parsers import FastJSONParser
+from core.renderers import FastJSONRenderer
+
+PAYLOAD = {
+    'id': 1,
+    'title': 'Crème brûlée \u2028 \u2029 "quoted" </script>',
+    'price': decimal.Decimal('5.25'),
+    'rating': 4.5,
+    'created': datetime.datetime(
+        2021, 5, 1, 12, 30, 15, 123456, tzinfo=datetime.timezone.utc,
+    ),
+    'day': datetime.date(2021, 5, 1),
+    'duration': datetime.timedelta(minutes=90),
+    'uuid': uuid.UUID('12345678-1234-5678-1234-567812345678'),
+    'label': gettext_lazy('Recipe'),
+    'tags': ({'id': 1, 'name': 'Vegan'}, {'id': 2, 'name': 'Dessert'}),
+    'counts': {1: 'one', 2: 'two'},
+    'names': {'only'},
+    'link': None,
+    'big': 2 ** 70,
+}
+
+
+class FastJSONRendererTests(SimpleTestCase):
+    """Test FastJSONRenderer matches JSONRenderer"""
+
+    def test_same_output_as_json_renderer(self):
+        """Test rendering gives the bytes JSONRenderer gives"""
+        small = {key: value for key, value in PAYLOAD.items() if key != 'big'}
+
+        self.assertEqual(
+            FastJSONRenderer().render(small), JSONRenderer().render(small),
+        )
+
+    def test_same_values_as_json_renderer(self):
+        """Test floats, Decimals and non-ASCII text decode the same"""
+        data = {
+            'floats': [1e16, 1e-7, 0.1, 1 / 3, -0.0, 1e300, 5e-324],
+            'decimals': [
+                decimal.Decimal('1e16'), decimal.Decimal('0.10'),
+                decimal.Decimal('12345678901234567890.5'),
+            ],
+            'text': 'Crème \U0001f600 \u00e9\u0301 \x00\x1f\x7f',
+        }
+
+        fast = FastJSONRenderer().render(data)
+
+        self.assertEqual(json.loads(fast), json.loads(JSONRenderer().render(
+            data,
+        )))
+        self.assertIn('Crème 😀'.encode(), fast)
+
+    def test_large_integers_fall_back(self):
+        """Test data orjson cannot encode is rendered by JSONRenderer"""
+        self.assertEqual(
+            FastJSONRenderer().render(PAYLOAD),
+            JSONRenderer().render(PAYLOAD),
+        )
+
+    def test_line_separators_escaped(self):
+        """Test U+2028 and U+2029 are escaped for JavaScript"""
+        rendered = FastJSONRenderer().render({'text': '\u2028\u2029'})
+
+        self.assertEqual(rendered, b'{"text":"\\u2028\\u2029"}')
+
+    def test_indent_uses_json_renderer(self):
+        """Test indented output is left to JSONRenderer"""
+        rendered = FastJSONRenderer().render(
+            {'id': 1}, 'application/json; indent=2',
+        )
+
+        self.assertEqual(rendered, b'{\n  "id": 1\n}')
+
+    def test_none_renders_empty(self):
+        self.assertEqual(FastJSONRenderer().render(None), b'')
+
+    def test_without_orjson(self):
+        """Test the renderer works when orjson is not installed"""
+        with patch.object(renderers, 'orjson', None):
+            rendered = FastJSONRenderer().render({'price': PAYLOAD['price']})
+
+        self.assertEqual(rendered, b'{"price":5.25}')
+
+
+class FastJSONParserTests(SimpleTestCase):
+    """Test FastJSONParser matches JSONParser"""
+
+    def parse(self, body, parser=None):
+        return (parser or FastJSONParser()).parse(io.BytesIO(body))
+
+    def test_parse(self):
+        """Test bodies parse as with JSONParser"""
+        body = '{"title": "Crème", "price": 5.25, "tags": [{"id": 1}]}'
+
+        self.assertEqual(
+            self.parse(body.encode()),
+            JSONParser().parse(io.BytesIO(body.encode())),
+        )
+
+    def test_large_integers(self):
+        """Test integers beyond 64 bits still parse"""
+        self.assertEqual(self.parse(b'{"n": 1180591620717411303424}'), {
+            'n': 2 ** 70,
+        })
+
+    def test_invalid_json(self):
+        """Test malformed bodies raise the usual parse error"""
+        with self.assertRaisesMessage(ParseError, 'JSON parse error'):
+            self.parse(b'{"title": ')
+
+    def test_constants_rejected(self):
+        """Test NaN and Infinity are refused, as STRICT_JSON asks"""
+        with self.assertRaises(ParseError):
+            self.parse(b'{"price": NaN}')
+
+    def test_without_orjson(self):
+        """Test the parser works when orjson is not installed"""
+        with patch.object(parsers, 'orjson', None):
+            self.assertEqual(self.parse(b'[1, 2]'), [1, 2])
@@ -0,0 +1,230 @@
+"""
+Tests for content addressed media storage and its garbage collection
+"""
+import io
+import os
+import shutil
+import tempfile
+import time
+from decimal import Decimal
+
+from PIL import Image
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core.management.commands.gc_media import Command
+from core.models import Recipe
+from core.storage import ContentAddressedStorage
+
+
+def make_image(color):
+    buffer = io.BytesIO()
+    Image.new('RGB', (10, 10), color).save(buffer, 'PNG')
+
+    return SimpleUploadedFile('photo.png', buffer.getvalue(), 'image/png')
+
+
+def age(name, seconds=7200):
+    """Make a stored file look older than the grace period"""
+    path = default_storage.path(name)
+    then = time.time() - seconds
+    os.utime(path, (then, then))
+
+
+class MediaTestCase(TestCase):
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.addCleanup(shutil.rmtree, self.media_root)
+
+        self.user = get_user_model().objects.create_user(
+            'user@example.com', 'test123',
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def create_recipe(self):
+        return Recipe.objects.create(
+            user=self.user, title='Sample recipe', time_minutes=10,
+            price=Decimal('5.00'),
+        )
+
+    def upload(self, recipe, image):
+        url = reverse('recipe:recipe-upload-image', args=[recipe.id])
+        self.client.post(url, {'image': image}, format='multipart')
+        recipe.refresh_from_db()
+
+
+class ContentAddressedStorageTests(MediaTestCase):
+    """Test files are named and deduplicated by content"""
+
+    def test_name_from_content(self):
+        """Test the name is the content's digest below a fan-out dir"""
+        storage = ContentAddressedStorage()
+
+        name = storage.save('uploads/recipe/a.PNG', ContentFile(b'abc'))
+
+        digest = (
+            'ba7816bf8f01cfea414140de5dae2223b00361a396177a9cb410ff61f20015ad'
+        )
+        self.assertEqual(name, f'uploads/recipe/ba/{digest}.png')
+        with storage.open(name) as f:
+            self.assertEqual(f.read(), b'abc')
+
+    def test_identical_content_stored_once(self):
+        """Test saving the same content twice keeps one file"""
+        storage = ContentAddressedStorage()
+
+        first = storage.save('uploads/recipe/a.png', ContentFile(b'abc'))
+        age(first)
+        second = storage.save('uploads/recipe/b.png', ContentFile(b'abc'))
+
+        self.assertEqual(first, second)
+        self.assertEqual(len(os.listdir(os.path.dirname(
+            storage.path(first)
+        ))), 1)
+        # Reuse counts as a fresh use for the garbage collector
+        self.assertGreater(
+            os.path.getmtime(storage.path(first)), time.time() - 60,
+        )
+
+    def test_recipes_share_uploaded_image(self):
+        """Test the same image uploaded to two recipes is stored once"""
+        first, second = self.create_recipe(), self.create_recipe()
+
+        self.upload(first, make_image('red'))
+        self.upload(second, make_image('red'))
+
+        self.assertEqual(first.image.name, second.image.name)
+
+
+class ReleaseImageTests(MediaTestCase):
+    """Test unreferenced images are deleted"""
+
+    def test_replaced_image_deleted(self):
+        """Test replacing an image deletes the old file"""
+        recipe = self.create_recipe()
+        self.upload(recipe, make_image('red'))
+        old = recipe.image.name
+        age(old)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.upload(recipe, make_image('blue'))
+
+        self.assertNotEqual(recipe.image.name, old)
+        self.assertFalse(default_storage.exists(old))
+
+    def test_shared_image_kept(self):
+        """Test an image other recipes use survives replacement"""
+        first, second = self.create_recipe(), self.create_recipe()
+        self.upload(first, make_image('red'))
+        self.upload(second, make_image('red'))
+        shared = first.image.name
+        age(shared)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.upload(first, make_image('blue'))
+
+        self.assertTrue(default_storage.exists(shared))
+
+    def test_recent_image_kept(self):
+        """Test files within the grace period are left to gc_media"""
+        recipe = self.create_recipe()
+        self.upload(recipe, make_image('red'))
+        old = recipe.image.name
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.upload(recipe, make_image('blue'))
+
+        self.assertTrue(default_storage.exists(old))
+
+    def test_deleted_recipe_releases_image(self):
+        """Test deleting a recipe deletes its image"""
+        recipe = self.create_recipe()
+        self.upload(recipe, make_image('red'))
+        name = recipe.image.name
+        age(name)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe.delete()
+
+        self.assertFalse(default_storage.exists(name))
+
+
+class GcMediaTests(MediaTestCase):
+    """Test the gc_media command"""
+
+    def run_gc(self, *args):
+        out = io.StringIO()
+        call_command('gc_media', *args, stdout=out)
+        return out.getvalue()
+
+    def test_orphans_deleted(self):
+        """Test old unreferenced files are deleted, others kept"""
+        recipe = self.create_recipe()
+        self.upload(recipe, make_image('red'))
+        age(recipe.image.name)
+        orphan = default_storage.save(
+            'uploads/recipe/orphan.png', ContentFile(b'orphan'),
+        )
+        age(orphan)
+        recent = default_storage.save(
+            'uploads/recipe/recent.png', ContentFile(b'recent'),
+        )
+
+        out = self.run_gc()
+
+        self.assertFalse(default_storage.exists(orphan))
+        self.assertTrue(default_storage.exists(recent))
+        self.assertTrue(default_storage.exists(recipe.image.name))
+        self.assertIn('in 1 files', out)
+
+    def test_renditions_kept(self):
+        """Test renditions of current images are referenced"""
+        recipe = self.create_recipe()
+        self.upload(recipe, make_image('red'))
+        call_command('process_image_jobs', once=True, stdout=io.StringIO())
+        recipe.refresh_from_db()
+        for path, _, files in os.walk(self.media_root):
+            for filename in files:
+                os.utime(os.path.join(path, filename), (0, 0))
+
+        self.run_gc()
+
+        thumbnail = recipe.image_renditions['thumbnail']['webp']
+        self.assertTrue(default_storage.exists(
+            thumbnail[len(default_storage.base_url):]
+        ))
+
+    def test_recipes_without_image_skipped(self):
+        """Test recipes with a NULL or empty image reference nothing"""
+        self.create_recipe()
+        # Saving stores no image as '', but updates can leave a NULL
+        Recipe.objects.filter(pk=self.create_recipe().pk).update(image=None)
+
+        referenced = Command()._referenced()
+
+        self.assertEqual(referenced, set())
+
+    def test_dry_run(self):
+        """Test a dry run deletes nothing"""
+        orphan = default_storage.save(
+            'uploads/recipe/orphan.png', ContentFile(b'orphan'),
+        )
+        age(orphan)
+
+        out = self.run_gc('--dry-run')
+
+        self.assertTrue(default_storage.exists(orphan))
+        self.assertIn(f'Would delete {orphan}', out)
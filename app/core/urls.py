@@ -0,0 +1,17 @@
+"""
+URL mapping for the core app
+"""
+from django.urls import path
+
+from core import views
+
+app_name = 'core'
+
+urlpatterns = [
+    path('', views.HealthView.as_view(), name='health'),
+    path('ready/', views.ReadinessView.as_view(), name='ready'),
+    path(
+        'connections/', views.ConnectionMetricsView.as_view(),
+        name='connections',
+    ),
+]
@@ -0,0 +1,89 @@
+"""
+Views for the core app
+"""
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import extend_schema
+from rest_framework import permissions, status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from core.db.pool import get_metrics
+from core.db.schema import is_migrated
+
+
+class HealthView(APIView):
+    """Report whether the databases answer
+
+    Public, so it reports a bare status; ConnectionMetricsView gives
+    admins the details.
+    """
+    authentication_classes = []
+    permission_classes = [permissions.AllowAny]
+
+    @extend_schema(responses={200: OpenApiTypes.OBJECT,
+                              503: OpenApiTypes.OBJECT})
+    def get(self, request):
+        healthy = True
+        for alias in connections:
+            try:
+                with connections[alias].cursor() as cursor:
+                    cursor.execute('SELECT 1')
+            except DatabaseError:
+                healthy = False
+
+        return Response(
+            {'status': 'ok' if healthy else 'unavailable'},
+            status=(
+                status.HTTP_200_OK if healthy
+                else status.HTTP_503_SERVICE_UNAVAILABLE
+            ),
+        )
+
+
+class ConnectionMetricsView(APIView):
+    """Report database connection metrics, to admins only
+
+    Metrics are those of the process that served the request: counters
+    of connections opened, reused and closed, failed health checks, pool
+    waits and timeouts, and the pool's idle and in use connections.
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    @extend_schema(responses={200: OpenApiTypes.OBJECT})
+    def get(self, request):
+        return Response(get_metrics())
+
+
+class ReadinessView(APIView):
+    """Report whether this process is ready to serve traffic
+
+    Ready means the URLs and views are loaded, which they are for any
+    process answering, the default database answers and it has every
+    migration applied. The container's healthcheck probes this, and the
+    proxy only starts once it passes.
+    """
+    authentication_classes = []
+    permission_classes = [permissions.AllowAny]
+
+    @extend_schema(responses={200: OpenApiTypes.OBJECT,
+                              503: OpenApiTypes.OBJECT})
+    def get(self, request):
+        connection = connections[DEFAULT_DB_ALIAS]
+        try:
+            # Also opens the connection the process's requests will use
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            migrated = is_migrated(connection)
+        except DatabaseError:
+            state = 'database unavailable'
+        else:
+            state = 'ready' if migrated else 'migrations pending'
+
+        return Response(
+            {'status': state},
+            status=(
+                status.HTTP_200_OK if state == 'ready'
+                else status.HTTP_503_SERVICE_UNAVAILABLE
+            ),
+        )
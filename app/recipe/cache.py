@@ -0,0 +1,140 @@
+"""
+Per-user caching and conditional GETs for recipes, tags and ingredients
+
+Every user has a change marker: a random generation and the time of
+their last write. Writes replace the marker, which orphans all of the
+user's cached lists at once (orphaned entries simply expire) and changes
+the ETag and Last-Modified of every response built from their data.
+"""
+import hashlib
+import time
+import uuid
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.utils.cache import (
+    get_conditional_response,
+    patch_cache_control,
+    quote_etag,
+)
+from django.utils.http import http_date
+from rest_framework import status
+from rest_framework.response import Response
+
+
+def _marker_key(user_id):
+    return f'recipe:marker:{user_id}'
+
+
+def _new_marker():
+    return (uuid.uuid4().hex, time.time())
+
+
+def get_marker(user_id):
+    """Return the user's (generation, last modified timestamp) marker
+
+    A missing marker, never written or lost to eviction, is recreated
+    with the current time: deletes and link changes leave no trace in
+    the updated_at columns, so the database cannot tell when the user's
+    data last changed, and a later date only costs a full response.
+    """
+    key = _marker_key(user_id)
+    marker = cache.get(key)
+    if marker is None:
+        cache.add(key, _new_marker(), timeout=None)
+        marker = cache.get(key) or _new_marker()
+
+    return marker
+
+
+def invalidate_user(user_id):
+    """Record a change to the user's data"""
+    key = _marker_key(user_id)
+    cache.set(key, _new_marker(), timeout=None)
+    if connection.in_atomic_block:
+        # A request reading the new marker before the transaction
+        # commits still sees the old rows and may cache them, so replace
+        # it again once the changes are visible.
+        transaction.on_commit(
+            lambda: cache.set(key, _new_marker(), timeout=None)
+        )
+
+
+def get_request_url(request):
+    """Return the absolute request URL with normalized query parameters"""
+    params = sorted(
+        (key, value)
+        for key, values in request.query_params.lists()
+        for value in values if value
+    )
+
+    return f'{request.build_absolute_uri(request.path)}?{urlencode(params)}'
+
+
+class ConditionalGetMixin:
+    """Answer GET requests with validators from the user's change marker
+
+    Requests whose If-None-Match or If-Modified-Since header is still
+    current get a 304 before any query or serialization runs. Responses
+    dated within the second of the last write carry no Last-Modified.
+    """
+
+    def get_conditional_response(self, request, get_response):
+        """Return a 304, or the response of get_response(marker, url)"""
+        marker = get_marker(request.user.pk)
+        generation, modified = marker
+        url = get_request_url(request)
+        etag = quote_etag(hashlib.sha256(
+            f'{generation}:{request.accepted_media_type}:{url}'.encode()
+        ).hexdigest())
+        # Last-Modified has whole seconds: date the data by the second
+        # after the write, and only once that second has begun, so that
+        # a later write always gets a later date. Until then only the
+        # ETag validates.
+        last_modified = int(modified) + 1
+        if last_modified > time.time():
+            last_modified = None
+
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified,
+        )
+        if response is None:
+            response = get_response(marker, url)
+        if response.status_code in (
+            status.HTTP_200_OK, status.HTTP_304_NOT_MODIFIED,
+        ):
+            response['ETag'] = etag
+            if last_modified is not None:
+                response['Last-Modified'] = http_date(last_modified)
+            # Per-user data: no shared caches, always revalidate
+            patch_cache_control(response, private=True, no_cache=True)
+
+        return response
+
+
+class CachedListMixin(ConditionalGetMixin):
+    """Serve list responses from the cache
+
+    The serialized data is cached rather than the rendered response, so
+    content negotiation still happens on every request.
+    """
+
+    def list(self, request, *args, **kwargs):
+        parent = super()
+
+        def get_response(marker, url):
+            digest = hashlib.sha256(url.encode()).hexdigest()
+            key = f'recipe:list:{request.user.pk}:{marker[0]}:{digest}'
+            data = cache.get(key)
+            if data is not None:
+                return Response(data)
+
+            response = parent.list(request, *args, **kwargs)
+            if response.status_code == status.HTTP_200_OK:
+                cache.set(key, response.data, settings.API_CACHE_TIMEOUT)
+
+            return response
+
+        return self.get_conditional_response(request, get_response)
@@ -0,0 +1,74 @@
+"""
+Query parameter filters for the recipe app
+"""
+from django.db.models import Exists, OuterRef
+from rest_framework.exceptions import ValidationError
+
+from core.models import Recipe, Tag, Ingredient
+from recipe.search import search_recipes
+
+# Query parameter -> (through model, column holding the related id)
+RELATIONS = {
+    'tags': (Recipe.tags.through, 'tag_id'),
+    'ingredients': (Recipe.ingredients.through, 'ingredient_id'),
+}
+MATCH_MODES = ['any', 'all']
+
+
+def _params_to_ints(param, value):
+    """Convert a comma separated string of IDs to a list of integers"""
+    try:
+        return [int(str_id) for str_id in value.split(',') if str_id]
+    except ValueError:
+        raise ValidationError(
+            {param: ['Expected a comma separated list of IDs.']}
+        )
+
+
+def filter_recipes(queryset, query_params):
+    """Filter recipes by the search=, tags= and ingredients= parameters
+
+    Each parameter becomes a correlated EXISTS subquery on the link
+    table instead of a join, so recipes are never repeated and no
+    DISTINCT is needed. <param>_match=any (the default) keeps recipes
+    linked to any of the IDs, <param>_match=all those linked to all.
+    search= keeps full-text matches, annotated with their search_rank.
+    """
+    text = query_params.get('search', '').strip()
+    if text:
+        queryset = search_recipes(queryset, text)
+
+    for param, (through, column) in RELATIONS.items():
+        value = query_params.get(param)
+        if not value:
+            continue
+
+        ids = _params_to_ints(param, value)
+        mode = query_params.get(f'{param}_match', 'any')
+        if mode not in MATCH_MODES:
+            raise ValidationError(
+                {f'{param}_match': [f'Expected one of {MATCH_MODES}.']}
+            )
+
+        links = through.objects.filter(recipe_id=OuterRef('pk'))
+        if mode == 'any':
+            queryset = queryset.filter(
+                Exists(links.filter(**{f'{column}__in': ids}))
+            )
+        else:
+            for obj_id in dict.fromkeys(ids):
+                queryset = queryset.filter(
+                    Exists(links.filter(**{column: obj_id}))
+                )
+
+    return queryset
+
+
+def filter_assigned(queryset):
+    """Keep the tags or ingredients linked to at least one recipe"""
+    param = {Tag: 'tags', Ingredient: 'ingredients'}[queryset.model]
+    through, column = RELATIONS[param]
+
+    return queryset.filter(
+        Exists(through.objects.filter(**{column: OuterRef('pk')}))
+    )
@@ -0,0 +1,139 @@
+"""
+Resized renditions of recipe images
+
+Uploads only store the original and queue an ImageJob; the
+process_image_jobs command renders the renditions below in the
+background and records their URLs in Recipe.image_renditions.
+"""
+import io
+import os
+from datetime import timedelta
+from urllib.parse import unquote
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from core.models import ImageJob, Recipe
+
+# Longest side in pixels of each rendition; smaller images keep their size
+RENDITIONS = {
+    'thumbnail': 150,
+    'medium': 600,
+    'large': 1600,
+}
+
+# File extension -> Pillow format of each rendition
+FORMATS = {
+    'webp': 'WEBP',
+    'jpeg': 'JPEG',
+}
+
+QUALITY = 82
+
+RENDITION_DIR = 'uploads/recipe/renditions/'
+
+
+def enqueue_renditions(recipe):
+    """Queue rendering of the current image of a recipe"""
+    # Jobs for an earlier image of the recipe have nothing left to do
+    ImageJob.objects.filter(
+        recipe=recipe, status=ImageJob.PENDING,
+    ).delete()
+
+    return ImageJob.objects.create(recipe=recipe, source=recipe.image.name)
+
+
+def _open(source):
+    """Return the stored image, decoded no larger than needed"""
+    with default_storage.open(source) as stored:
+        image = Image.open(stored)
+        # JPEG decoding can downscale by powers of two for free
+        largest = max(RENDITIONS.values())
+        image.draft('RGB', (largest, largest))
+        image.load()
+
+    # Turn the pixels upright, as the orientation tag is dropped with
+    # the rest of the EXIF data
+    image = ImageOps.exif_transpose(image)
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'A' in image.getbands() else 'RGB')
+
+    return image
+
+
+def render(source):
+    """Write the renditions of a stored image and return their details
+
+    Returns {rendition: {'width', 'height', <extension>: url}}. No EXIF
+    data is written, so camera details and locations are not published.
+    """
+    image = _open(source)
+    icc_profile = image.info.get('icc_profile')
+    stem = os.path.splitext(os.path.basename(source))[0]
+
+    renditions = {}
+    for name, size in sorted(
+        RENDITIONS.items(), key=lambda item: item[1], reverse=True,
+    ):
+        # Each rendition is scaled down from the previous, larger one
+        image = image.copy()
+        image.thumbnail((size, size), Image.LANCZOS, reducing_gap=3.0)
+        details = {'width': image.width, 'height': image.height}
+
+        for extension, fmt in FORMATS.items():
+            output = image
+            if fmt == 'JPEG' and output.mode == 'RGBA':
+                output = Image.new('RGB', image.size, (255, 255, 255))
+                output.paste(image, mask=image.getchannel('A'))
+
+            buffer = io.BytesIO()
+            output.save(
+                buffer, fmt, quality=QUALITY, icc_profile=icc_profile,
+            )
+            stored = default_storage.save(
+                f'{RENDITION_DIR}{stem}-{name}.{extension}',
+                ContentFile(buffer.getvalue()),
+            )
+            details[extension] = default_storage.url(stored)
+
+        renditions[name] = details
+
+    return renditions
+
+
+def rendition_names(renditions):
+    """Return the storage names of the files listed in renditions"""
+    base_url = default_storage.base_url
+    names = []
+    for details in renditions.values():
+        for extension in FORMATS:
+            url = details.get(extension)
+            if url and url.startswith(base_url):
+                names.append(unquote(url[len(base_url):]))
+
+    return names
+
+
+def release_image(name):
+    """Delete a stored image no recipe uses any more
+
+    Files modified within MEDIA_GC_GRACE seconds are kept, as an upload
+    of the same content may be about to use them; gc_media removes them
+    later. Renditions can be shared by different images, so they are
+    always left to gc_media. Returns True if the file was deleted.
+    """
+    if not name or Recipe.objects.filter(image=name).exists():
+        return False
+
+    try:
+        modified = default_storage.get_modified_time(name)
+    except FileNotFoundError:
+        return False
+    if modified > timezone.now() - timedelta(seconds=settings.MEDIA_GC_GRACE):
+        return False
+
+    default_storage.delete(name)
+    return True
@@ -0,0 +1,55 @@
+"""
+Pagination for the recipe app
+"""
+from decimal import Decimal
+
+from django.conf import settings
+from django.db.models import DecimalField, ExpressionWrapper, F, Value
+from django.db.models.functions import Cast
+from rest_framework.pagination import CursorPagination
+
+
+def search_position():
+    """Return (search_rank, id) packed into one unique, exact number
+
+    DRF's cursors hold the value of the first ordering field only, and
+    page through ties on it by offset. Ranks tie often, so search
+    results are ordered by this instead: the rank rounded to 12 decimal
+    places, shifted left of the id by 19 digits, so that it orders as
+    (rank, id) does and no two recipes share a position.
+    """
+    rank = Cast('search_rank', DecimalField(max_digits=30, decimal_places=12))
+
+    return ExpressionWrapper(
+        rank * Value(Decimal('1e31')) + F('id'),
+        output_field=DecimalField(),
+    )
+
+
+class RecipeCursorPagination(CursorPagination):
+    """Keyset pagination over recipes, newest first"""
+    ordering = '-id'
+    page_size = settings.API_PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = settings.API_MAX_PAGE_SIZE
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if 'search_rank' in queryset.query.annotations:
+            queryset = queryset.annotate(search_position=search_position())
+
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_ordering(self, request, queryset, view):
+        """Order search results by rank, best first"""
+        if 'search_position' in queryset.query.annotations:
+            return ('-search_position',)
+
+        return super().get_ordering(request, queryset, view)
+
+
+class RecipeAttrCursorPagination(RecipeCursorPagination):
+    """Keyset pagination over tags and ingredients, by name
+
+    Names are unique per user, so the name alone is a stable cursor.
+    """
+    ordering = '-name'
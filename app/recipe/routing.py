@@ -0,0 +1,44 @@
+"""
+Reading recipes, tags and ingredients from the read replica
+
+Safe requests read from the replica, except for users who wrote within
+the last REPLICA_STICKY_SECONDS: their change marker (see recipe.cache)
+records when, and they read from the primary until the replica has had
+time to replay their writes.
+"""
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from rest_framework.permissions import SAFE_METHODS
+
+from core.db.routers import REPLICA, read_from, replica_configured
+from recipe.cache import get_marker
+
+
+def wrote_recently(user_id):
+    """Return whether the user changed their data within the window"""
+    _, modified = get_marker(user_id)
+    return time.time() - modified < settings.REPLICA_STICKY_SECONDS
+
+
+class ReplicaReadMixin:
+    """Run the reads of safe requests against the read replica
+
+    Authentication and permission checks read from the primary, as the
+    replica may not have a token or user change yet.
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        self._read_routing = ExitStack()
+        with self._read_routing:
+            return super().dispatch(request, *args, **kwargs)
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if (
+            request.method in SAFE_METHODS
+            and replica_configured()
+            and not wrote_recently(request.user.pk)
+        ):
+            self._read_routing.enter_context(read_from(REPLICA))
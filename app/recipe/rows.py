@@ -0,0 +1,111 @@
+"""
+Read-only representations built from .values() rows
+
+List responses are built from plain rows and per-page maps of related
+objects instead of model instances and nested serializers, skipping
+DRF's per-field machinery. The output matches the serializers byte for
+byte.
+"""
+from collections import defaultdict
+
+from rest_framework.response import Response
+
+from core.models import Recipe
+
+# Recipe m2m fields and the through table column of their target
+RECIPE_RELATIONS = {'tags': 'tag', 'ingredients': 'ingredient'}
+
+
+def get_related(field, target, recipe_ids):
+    """Return {recipe id: [{id, name}]} for a recipe m2m field
+
+    Objects are listed in the order they were linked. Each object's dict
+    is shared by all recipes linked to it.
+    """
+    through = getattr(Recipe, field).through
+    rows = through.objects.filter(
+        recipe_id__in=recipe_ids,
+    ).order_by('id').values_list(
+        'recipe_id', f'{target}__id', f'{target}__name',
+    )
+
+    objs = {}
+    related = defaultdict(list)
+    for recipe_id, obj_id, name in rows:
+        obj = objs.get(obj_id)
+        if obj is None:
+            obj = objs[obj_id] = {'id': obj_id, 'name': name}
+        related[recipe_id].append(obj)
+
+    return related
+
+
+def get_recipe_related(recipe_ids, fields):
+    """Return {field: get_related() map} for the m2m fields listed"""
+    return {
+        field: get_related(field, target, recipe_ids)
+        for field, target in RECIPE_RELATIONS.items()
+        if field in fields
+    }
+
+
+def recipe_rows_to_representation(rows, fields, related=None):
+    """Return the RecipeSerializer representation of recipe rows
+
+    related is the get_recipe_related() result for the rows, fetched
+    when not given.
+    """
+    if related is None:
+        related = get_recipe_related([row['id'] for row in rows], fields)
+
+    data = []
+    for row in rows:
+        item = {}
+        for field in fields:
+            if field in related:
+                item[field] = related[field].get(row['id'], [])
+            elif field == 'price':
+                # As DecimalField renders it
+                item[field] = '{:f}'.format(row['price'])
+            else:
+                item[field] = row[field]
+        data.append(item)
+
+    return data
+
+
+class ValuesListMixin:
+    """List action serializing .values() rows instead of model instances
+
+    Rows hold the id, the listed columns and the queryset's annotations,
+    so cursor pagination can order on any of them.
+    """
+
+    def get_list_fields(self):
+        """Return the names of the fields to list, in output order"""
+        return self.get_serializer_class().Meta.fields
+
+    def rows_to_representation(self, rows, fields):
+        """Return the representation of a page of rows"""
+        return [{field: row[field] for field in fields} for row in rows]
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        fields = self.get_list_fields()
+        many_to_many = {
+            field.name for field in queryset.model._meta.many_to_many
+        }
+        columns = dict.fromkeys([
+            'id',
+            *(field for field in fields if field not in many_to_many),
+            *queryset.query.annotations,
+        ])
+        rows = queryset.values(*columns)
+
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(
+                self.rows_to_representation(page, fields)
+            )
+
+        return Response(self.rows_to_representation(list(rows), fields))
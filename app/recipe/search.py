@@ -0,0 +1,120 @@
+"""
+Full-text search over recipes
+"""
+import weakref
+
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank,
+    SearchVector,
+)
+from django.db import transaction
+from django.db.models import F, FloatField, OuterRef, Subquery
+from django.db.models.functions import Cast
+
+from core.models import Recipe
+
+SEARCH_CONFIG = 'english'
+
+
+def _linked_names(field, target):
+    """Return a subquery of the space separated names linked to a recipe"""
+    through = getattr(Recipe, field).through
+
+    return Subquery(
+        through.objects.filter(
+            recipe_id=OuterRef('pk'),
+        ).order_by().values('recipe_id').annotate(
+            names=StringAgg(f'{target}__name', ' '),
+        ).values('names')
+    )
+
+
+def get_search_vector():
+    """Return the expression computing a recipe's search vector
+
+    Title matches weigh the most, then the description, then the names
+    of the recipe's tags and ingredients.
+    """
+    return (
+        SearchVector('title', weight='A', config=SEARCH_CONFIG)
+        + SearchVector('description', weight='B', config=SEARCH_CONFIG)
+        + SearchVector(
+            _linked_names('tags', 'tag'), weight='C', config=SEARCH_CONFIG,
+        )
+        + SearchVector(
+            _linked_names('ingredients', 'ingredient'),
+            weight='C', config=SEARCH_CONFIG,
+        )
+    )
+
+
+def update_search_vectors(recipe_ids):
+    """Recompute the stored search vector of the given recipes"""
+    recipe_ids = list(recipe_ids)
+    if recipe_ids:
+        Recipe.objects.filter(id__in=recipe_ids).update(
+            search_vector=get_search_vector(),
+        )
+
+
+class _PendingSearchUpdate:
+    """on_commit callback reindexing the recipes collected for it"""
+
+    def __init__(self):
+        self.recipe_ids = set()
+        self.done = False
+
+    def __call__(self):
+        self.done = True
+        update_search_vectors(self.recipe_ids)
+
+
+def schedule_search_update(recipe_ids):
+    """Reindex recipes once the current transaction commits
+
+    Recipes scheduled during one atomic block are reindexed together by
+    a single UPDATE, however many saves and link changes led to them.
+    Outside a transaction they are reindexed at once.
+    """
+    connection = transaction.get_connection()
+    if not connection.in_atomic_block:
+        update_search_vectors(recipe_ids)
+        return
+
+    # The pending update of each atomic block, keyed by its savepoints
+    # and held weakly: once a rollback makes Django discard the
+    # callback, it drops out of here too, and a later block with the
+    # same savepoints starts afresh.
+    pending = getattr(connection, 'pending_search_updates', None)
+    if pending is None:
+        pending = weakref.WeakValueDictionary()
+        connection.pending_search_updates = pending
+    block = tuple(connection.savepoint_ids)
+    # Join the update of the outermost enclosing block that has one. If
+    # this block rolls back, its recipes are reindexed anyway, unchanged.
+    for depth in range(len(block) + 1):
+        update = pending.get(block[:depth])
+        if update is not None and not update.done:
+            break
+    else:
+        update = pending[block] = _PendingSearchUpdate()
+        transaction.on_commit(update)
+    update.recipe_ids.update(recipe_ids)
+
+
+def search_recipes(queryset, text):
+    """Filter recipes matching the search text and annotate their rank
+
+    The text follows web search syntax: quoted phrases, OR and -word.
+    The rank is cast to double precision so it round trips exactly
+    through a pagination cursor.
+    """
+    query = SearchQuery(text, config=SEARCH_CONFIG, search_type='websearch')
+
+    return queryset.filter(search_vector=query).annotate(
+        search_rank=Cast(
+            SearchRank(F('search_vector'), query), FloatField(),
+        ),
+    )
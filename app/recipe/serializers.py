@@ -1,6 +1,12 @@
 '''Serializer for our recipe app'''
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
 from rest_framework import serializers
 from core.models import Recipe, Tag, Ingredient
+from recipe.cache import invalidate_user
+from recipe.images import enqueue_renditions, release_image
+from recipe.search import update_search_vectors
 
 class TagSerializer(serializers.ModelSerializer):
     '''Serializer for tag objects'''
@@ -18,7 +24,53 @@ class IngredientSerializer(serializers.ModelSerializer):
         fields = ['id', 'name']
         read_only_fields = ['id']
 
-class RecipeSerializer(serializers.ModelSerializer):
+
+class SparseFieldsMixin:
+    '''Serializer mixin emitting only the fields in context['fields']
+
+    Views resolve the fields= and exclude= query parameters with
+    select_fields() and pass the names on in the serializer context, so
+    they can also limit the columns and relations they load.
+    '''
+
+    @classmethod
+    def select_fields(cls, query_params):
+        '''Return the field names picked by fields= and exclude=, or None'''
+        available = cls.Meta.fields
+        selected = None
+        for param in ['fields', 'exclude']:
+            names = [
+                name.strip()
+                for name in query_params.get(param, '').split(',')
+                if name.strip()
+            ]
+            if not names:
+                continue
+            unknown = sorted(set(names) - set(available))
+            if unknown:
+                raise serializers.ValidationError({
+                    param: [f'Unknown fields: {", ".join(unknown)}.'],
+                })
+
+            selected = [
+                name for name in (available if selected is None else selected)
+                if (name in names) == (param == 'fields')
+            ]
+
+        return selected
+
+    def get_fields(self):
+        fields = super().get_fields()
+        selected = self.context.get('fields')
+        if selected is None:
+            return fields
+
+        return {
+            name: field for name, field in fields.items() if name in selected
+        }
+
+
+class RecipeSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     '''Serializer for recipe objects'''
 
     tags = TagSerializer(many=True, required=False)
@@ -32,26 +84,25 @@ class RecipeSerializer(serializers.ModelSerializer):
             ]
         read_only_fields = ['id']
 
+    def _get_or_create_attrs(self, model, items):
+        '''Return the user's objects for the given items, in order'''
+        auth_user = self.context['request'].user
+        names = [item['name'] for item in items]
+        objs = model.objects.get_or_create_many(auth_user, names)
+
+        return [objs[name] for name in dict.fromkeys(names)]
+
     def _get_or_create_tags(self, instance, tags):
         '''Get or create tags for a recipe'''
-        auth_user = self.context['request'].user
-        for tag in tags:
-            tag, created = Tag.objects.get_or_create(
-                user=auth_user,
-                **tag,
-            )
-            instance.tags.add(tag)
+        instance.tags.add(*self._get_or_create_attrs(Tag, tags))
 
     def _get_or_create_ingredients(self, instance, ingredients):
         '''Get or create ingredients for a recipe'''
-        auth_user = self.context['request'].user
-        for ingredient in ingredients:
-            ingredient, created = Ingredient.objects.get_or_create(
-                user=auth_user,
-                **ingredient,
-            )
-            instance.ingredients.add(ingredient)
+        instance.ingredients.add(
+            *self._get_or_create_attrs(Ingredient, ingredients)
+        )
 
+    @transaction.atomic
     def create(self, validated_data):
         '''Create a new recipe'''
         tags = validated_data.pop('tags', []) #remove the tags object from the validated data and store it in tags variable
@@ -62,17 +113,19 @@ class RecipeSerializer(serializers.ModelSerializer):
 
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         '''Update a recipe'''
         tags = validated_data.pop('tags', None)
         ingredients = validated_data.pop('ingredients', None)
+        # set() only deletes and inserts the links that actually changed
         if tags is not None:
-            instance.tags.clear()
-            self._get_or_create_tags(instance, tags)
+            instance.tags.set(self._get_or_create_attrs(Tag, tags))
 
         if ingredients is not None:
-            instance.ingredients.clear()
-            self._get_or_create_ingredients(instance, ingredients)
+            instance.ingredients.set(
+                self._get_or_create_attrs(Ingredient, ingredients)
+            )
 
         for key, value in validated_data.items():
             setattr(instance, key, value)
@@ -84,7 +137,9 @@ class RecipeDetailSerializer(RecipeSerializer):
     '''Serializer for recipe detail objects'''
 
     class Meta(RecipeSerializer.Meta):
-        fields = RecipeSerializer.Meta.fields + ['description', 'image']
+        fields = RecipeSerializer.Meta.fields + [
+            'description', 'image', 'image_renditions',
+        ]
         read_only_fields = ['id']
 
 class RecipeImageSerializer(serializers.ModelSerializer):
@@ -92,7 +147,248 @@ class RecipeImageSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Recipe
-        fields = ['id', 'image']
+        fields = ['id', 'image', 'image_renditions']
         read_only_fields = ['id']
         extra_kwargs = {'image': {'required': True}}
 
+    def validate_image(self, image):
+        '''Reject images of other formats or too large to render'''
+        # Pillow has only read the header: the size is known, the
+        # pixels are not decoded
+        if image.image.format not in ('JPEG', 'PNG', 'GIF', 'WEBP'):
+            raise serializers.ValidationError(
+                'Upload a JPEG, PNG, GIF or WebP image.'
+            )
+        width, height = image.image.size
+        if width * height > settings.RECIPE_IMAGE_MAX_PIXELS:
+            raise serializers.ValidationError(
+                'Image is too large, it may have at most '
+                f'{settings.RECIPE_IMAGE_MAX_PIXELS} pixels.'
+            )
+        return image
+
+    @transaction.atomic
+    def update(self, instance, validated_data):
+        '''Store the image, queue its renditions and release the old one'''
+        previous = instance.image.name
+        instance.image_renditions = {}
+        instance = super().update(instance, validated_data)
+        enqueue_renditions(instance)
+        if previous and previous != instance.image.name:
+            transaction.on_commit(lambda: release_image(previous))
+        return instance
+
+
+class RecipeBulkListSerializer(serializers.ListSerializer):
+    '''List serializer validating and writing recipes in bulk'''
+
+    def to_internal_value(self, data):
+        '''Validate every item, collecting errors per item index'''
+        self.item_errors = {}
+        validated = []
+        for index, item in enumerate(data):
+            try:
+                validated.append(self.child.run_validation(item))
+            except serializers.ValidationError as exc:
+                self.item_errors[index] = exc.detail
+                validated.append(None)
+
+        return validated
+
+    def _set_links(self, user, pairs, created):
+        '''Set tags and ingredients for (recipe, validated item) pairs'''
+        for field, model in [('tags', Tag), ('ingredients', Ingredient)]:
+            pairs_with_field = [
+                (recipe, item[field]) for recipe, item in pairs
+                if field in item
+            ]
+            if not pairs_with_field:
+                continue
+
+            names = [
+                attr['name']
+                for recipe, attrs in pairs_with_field for attr in attrs
+            ]
+            objs = model.objects.get_or_create_many(user, names)
+            through = getattr(Recipe, field).through
+            target_id = f'{model._meta.model_name}_id'
+            wanted = dict.fromkeys(
+                (recipe.id, objs[attr['name']].id)
+                for recipe, attrs in pairs_with_field for attr in attrs
+            )
+            existing = {}
+            if not created:
+                links = through.objects.filter(
+                    recipe_id__in=[recipe.id for recipe, _ in pairs_with_field]
+                ).values_list('id', 'recipe_id', target_id)
+                existing = {
+                    (recipe_id, obj_id): link_id
+                    for link_id, recipe_id, obj_id in links
+                }
+
+            stale = [
+                link_id for key, link_id in existing.items()
+                if key not in wanted
+            ]
+            if stale:
+                through.objects.filter(id__in=stale).delete()
+            through.objects.bulk_create([
+                through(recipe_id=recipe_id, **{target_id: obj_id})
+                for recipe_id, obj_id in wanted
+                if (recipe_id, obj_id) not in existing
+            ])
+
+    def bulk_create(self, user):
+        '''Create the valid items and return a result per item'''
+        items = self.validated_data
+        pairs = [
+            (Recipe(user=user, **{
+                key: value for key, value in item.items()
+                if key not in ('tags', 'ingredients')
+            }), item)
+            for item in items if item is not None
+        ]
+        Recipe.objects.bulk_create([recipe for recipe, _ in pairs])
+        self._set_links(user, pairs, created=True)
+        update_search_vectors(recipe.id for recipe, _ in pairs)
+
+        recipes = iter(recipe for recipe, _ in pairs)
+        return [
+            {'status': 400, 'errors': self.item_errors[index]}
+            if item is None else
+            {'status': 201, 'id': next(recipes).id}
+            for index, item in enumerate(items)
+        ]
+
+    def bulk_update(self, user, ids):
+        '''Update the valid items of the given ids, one result per item'''
+        items = self.validated_data
+        recipes = Recipe.objects.filter(user=user, id__in=ids).in_bulk()
+        results = []
+        pairs = []
+        fields = set()
+        for index, (recipe_id, item) in enumerate(zip(ids, items)):
+            if item is None:
+                results.append({
+                    'id': recipe_id,
+                    'status': 400,
+                    'errors': self.item_errors[index],
+                })
+                continue
+            if recipe_id not in recipes:
+                results.append({'id': recipe_id, 'status': 404})
+                continue
+
+            recipe = recipes[recipe_id]
+            for key, value in item.items():
+                if key not in ('tags', 'ingredients'):
+                    setattr(recipe, key, value)
+                    fields.add(key)
+            pairs.append((recipe, item))
+            results.append({'id': recipe_id, 'status': 200})
+
+        if pairs:
+            # bulk_update() skips auto_now, so stamp the recipes here
+            now = timezone.now()
+            for recipe, _ in pairs:
+                recipe.updated_at = now
+            Recipe.objects.bulk_update(
+                [recipe for recipe, _ in pairs],
+                sorted(fields | {'updated_at'}),
+            )
+        self._set_links(user, pairs, created=False)
+        update_search_vectors(recipe.id for recipe, _ in pairs)
+
+        return results
+
+
+class RecipeBulkItemSerializer(RecipeDetailSerializer):
+    '''Serializer for one recipe of a bulk request'''
+
+    class Meta(RecipeDetailSerializer.Meta):
+        read_only_fields = ['id', 'image']
+        list_serializer_class = RecipeBulkListSerializer
+
+
+class RecipeBulkSerializer(serializers.Serializer):
+    '''Serializer for bulk recipe create, update and delete requests'''
+
+    def get_fields(self):
+        '''Return the fields, which share their names with save() hooks'''
+        return {
+            'create': serializers.ListField(
+                child=serializers.DictField(), required=False, default=list,
+            ),
+            'update': serializers.ListField(
+                child=serializers.DictField(), required=False, default=list,
+            ),
+            'delete': serializers.ListField(
+                child=serializers.IntegerField(), required=False, default=list,
+            ),
+        }
+
+    def validate_update(self, value):
+        '''Check every update item names a different recipe'''
+        ids = set()
+        for item in value:
+            recipe_id = item.get('id')
+            # JSON true and false decode to bools, which are ints too
+            if not isinstance(recipe_id, int) or isinstance(recipe_id, bool):
+                raise serializers.ValidationError(
+                    'Every update item needs an integer id.'
+                )
+            if recipe_id in ids:
+                raise serializers.ValidationError(
+                    f'Recipe {recipe_id} is updated more than once.'
+                )
+            ids.add(recipe_id)
+
+        return value
+
+    def validate(self, attrs):
+        '''Limit the number of items in one request'''
+        total = sum(len(attrs[key]) for key in ['create', 'update', 'delete'])
+        if total > settings.RECIPE_BULK_MAX_ITEMS:
+            raise serializers.ValidationError(
+                f'At most {settings.RECIPE_BULK_MAX_ITEMS} items per request.'
+            )
+
+        return attrs
+
+    def _item_serializer(self, data, **kwargs):
+        '''Return a validated list serializer for the given items'''
+        serializer = RecipeBulkItemSerializer(
+            data=data, many=True, context=self.context, **kwargs
+        )
+        serializer.is_valid()
+        return serializer
+
+    @transaction.atomic
+    def create(self, validated_data):
+        '''Apply the request and return the results per item'''
+        user = validated_data['user']
+        created = self._item_serializer(validated_data['create'])
+        updates = validated_data['update']
+        updated = self._item_serializer(updates, partial=True)
+        recipes = Recipe.objects.filter(
+            user=user, id__in=validated_data['delete']
+        )
+        deleted = set(recipes.values_list('id', flat=True))
+        recipes.delete()
+
+        results = {
+            'create': created.bulk_create(user),
+            'update': updated.bulk_update(
+                user, [item['id'] for item in updates]
+            ),
+            'delete': [
+                {
+                    'id': recipe_id,
+                    'status': 204 if recipe_id in deleted else 404,
+                }
+                for recipe_id in validated_data['delete']
+            ],
+        }
+        invalidate_user(user.pk)
+
+        return results
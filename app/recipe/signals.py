@@ -0,0 +1,112 @@
+"""
+Signal handlers keeping search vectors, cached lists and stored images
+up to date
+
+Recipes are reindexed once per transaction, when it commits. Bulk writes
+(bulk_create, bulk_update, queryset update) send no signals; code using
+them calls recipe.search.update_search_vectors and
+recipe.cache.invalidate_user itself.
+"""
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete,
+)
+from django.db import transaction
+from django.dispatch import receiver
+
+from core.models import Recipe, Tag, Ingredient
+from recipe.cache import invalidate_user
+from recipe.images import release_image
+from recipe.search import schedule_search_update
+
+SEARCHED_FIELDS = {'title', 'description'}
+
+
+def _linked_recipe_ids(instance):
+    """Return the ids of the recipes linked to a tag or ingredient"""
+    field = {Tag: 'tags', Ingredient: 'ingredients'}[type(instance)]
+    through = getattr(Recipe, field).through
+    target_id = f'{instance._meta.model_name}_id'
+
+    return list(through.objects.filter(
+        **{target_id: instance.pk}
+    ).values_list('recipe_id', flat=True))
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_saved(sender, instance, created, update_fields, **kwargs):
+    """Index new recipes and changes to the searched fields"""
+    if update_fields is None or SEARCHED_FIELDS & set(update_fields):
+        schedule_search_update([instance.pk])
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def recipe_links_changed(sender, instance, action, reverse, pk_set,
+                         **kwargs):
+    """Reindex recipes whose tags or ingredients changed"""
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            schedule_search_update([instance.pk])
+        return
+
+    # Changed from the tag or ingredient side
+    if action == 'pre_clear':
+        instance._search_recipe_ids = _linked_recipe_ids(instance)
+    elif action == 'post_clear':
+        schedule_search_update(instance.__dict__.pop('_search_recipe_ids', []))
+    elif action in ('post_add', 'post_remove'):
+        schedule_search_update(pk_set)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+def recipe_attr_saved(sender, instance, created, update_fields, **kwargs):
+    """Reindex the recipes of a renamed tag or ingredient"""
+    if created or (update_fields is not None and 'name' not in update_fields):
+        return
+
+    schedule_search_update(_linked_recipe_ids(instance))
+
+
+@receiver(pre_delete, sender=Tag)
+@receiver(pre_delete, sender=Ingredient)
+def recipe_attr_deleting(sender, instance, **kwargs):
+    """Remember the recipes of a tag or ingredient about to be deleted"""
+    instance._search_recipe_ids = _linked_recipe_ids(instance)
+
+
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def recipe_attr_deleted(sender, instance, **kwargs):
+    """Reindex the recipes a deleted tag or ingredient was linked to"""
+    schedule_search_update(instance.__dict__.pop('_search_recipe_ids', []))
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Recipe)
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def user_object_changed(sender, instance, **kwargs):
+    """Invalidate the owner's cached lists"""
+    invalidate_user(instance.user_id)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def user_links_changed(sender, instance, action, **kwargs):
+    """Invalidate the owner's cached lists when recipe links change"""
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        invalidate_user(instance.user_id)
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deleted(sender, instance, **kwargs):
+    """Delete the image of a deleted recipe unless others share it"""
+    if instance.image:
+        name = instance.image.name
+        transaction.on_commit(lambda: release_image(name))
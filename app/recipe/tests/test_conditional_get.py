@@ -0,0 +1,168 @@
+"""
+Tests for conditional GETs of recipes, tags and ingredients
+"""
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from django.utils.http import http_date
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag
+from recipe.serializers import RecipeSerializer
+
+RECIPE_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+
+
+def detail_url(recipe_id):
+    """Return recipe detail URL"""
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+def create_recipe(user, **params):
+    """Create and return a sample recipe"""
+    defaults = {
+        'title': 'Sample recipe',
+        'time_minutes': 22,
+        'price': Decimal('5.25'),
+    }
+    defaults.update(params)
+
+    return Recipe.objects.create(user=user, **defaults)
+
+
+class ConditionalGetTests(TestCase):
+    """Test ETag and Last-Modified handling"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com', password='test123',
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_list_includes_validators(self):
+        """Test list responses carry an ETag and Last-Modified"""
+        with patch('recipe.cache.time.time', return_value=1000.5):
+            self.client.get(RECIPE_URL)
+        with patch('recipe.cache.time.time', return_value=1001.0):
+            res = self.client.get(RECIPE_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res['ETag'].startswith('"'))
+        self.assertIn('Last-Modified', res)
+        self.assertIn('private', res['Cache-Control'])
+
+    def test_if_none_match_skips_serialization(self):
+        """Test a current ETag gets a 304 without touching the database"""
+        create_recipe(user=self.user)
+        etag = self.client.get(RECIPE_URL)['ETag']
+
+        with patch.object(RecipeSerializer, 'to_representation') as rep, \
+                self.assertNumQueries(0):
+            res = self.client.get(RECIPE_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res.content, b'')
+        self.assertEqual(res['ETag'], etag)
+        rep.assert_not_called()
+
+    def test_etag_depends_on_query_and_format(self):
+        """Test different representations get different ETags"""
+        first = self.client.get(RECIPE_URL)['ETag']
+        filtered = self.client.get(RECIPE_URL, {'search': 'soup'})['ETag']
+        api = self.client.get(RECIPE_URL, {'format': 'api'})['ETag']
+
+        self.assertEqual(len({first, filtered, api}), 3)
+
+    def test_writes_change_etag(self):
+        """Test creating, linking and deleting invalidate the ETag"""
+        recipe = create_recipe(user=self.user)
+        etag = self.client.get(RECIPE_URL)['ETag']
+
+        recipe.tags.add(Tag.objects.create(user=self.user, name='Vegan'))
+        res = self.client.get(RECIPE_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res['ETag'], etag)
+
+        recipe.delete()
+        res = self.client.get(
+            RECIPE_URL, HTTP_IF_NONE_MATCH=res['ETag'],
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['results'], [])
+
+    def test_retrieve_recipe_not_modified(self):
+        """Test conditional GETs of a single recipe"""
+        recipe = create_recipe(user=self.user)
+        res = self.client.get(detail_url(recipe.id))
+
+        not_modified = self.client.get(
+            detail_url(recipe.id), HTTP_IF_NONE_MATCH=res['ETag'],
+        )
+        recipe.title = 'New title'
+        recipe.save()
+        modified = self.client.get(
+            detail_url(recipe.id), HTTP_IF_NONE_MATCH=res['ETag'],
+        )
+
+        self.assertEqual(
+            not_modified.status_code, status.HTTP_304_NOT_MODIFIED,
+        )
+        self.assertEqual(modified.status_code, status.HTTP_200_OK)
+        self.assertEqual(modified.data['title'], 'New title')
+
+    def test_tags_if_modified_since(self):
+        """Test Last-Modified based revalidation of the tag list"""
+        with patch('recipe.cache.time.time', return_value=1000.5):
+            tag = Tag.objects.create(user=self.user, name='Vegan')
+        with patch('recipe.cache.time.time', return_value=1001.5):
+            last_modified = self.client.get(TAGS_URL)['Last-Modified']
+            not_modified = self.client.get(
+                TAGS_URL, HTTP_IF_MODIFIED_SINCE=last_modified,
+            )
+            tag.delete()
+        with patch('recipe.cache.time.time', return_value=1002.0):
+            modified = self.client.get(
+                TAGS_URL, HTTP_IF_MODIFIED_SINCE=last_modified,
+            )
+
+        self.assertEqual(
+            not_modified.status_code, status.HTTP_304_NOT_MODIFIED,
+        )
+        self.assertEqual(modified.status_code, status.HTTP_200_OK)
+        self.assertEqual(modified.data['results'], [])
+
+    def test_no_last_modified_within_write_second(self):
+        """Test a write in the same second as a response is not missed"""
+        # The old whole-second date of the response would have been 1000
+        with patch('recipe.cache.time.time', return_value=1000.2):
+            Tag.objects.create(user=self.user, name='Vegan')
+            res = self.client.get(TAGS_URL)
+            Tag.objects.create(user=self.user, name='Dessert')
+        with patch('recipe.cache.time.time', return_value=1001.0):
+            modified = self.client.get(
+                TAGS_URL, HTTP_IF_MODIFIED_SINCE=http_date(1000),
+            )
+
+        self.assertNotIn('Last-Modified', res)
+        self.assertEqual(modified.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(modified.data['results']), 2)
+
+    def test_updated_at_set_on_save(self):
+        """Test objects record when they were last changed"""
+        recipe = create_recipe(user=self.user)
+        first = recipe.updated_at
+
+        recipe.title = 'Changed'
+        recipe.save()
+
+        self.assertIsNotNone(first)
+        self.assertGreater(recipe.updated_at, first)
@@ -0,0 +1,164 @@
+"""
+Tests for the background rendering of recipe images
+"""
+import io
+import shutil
+import tempfile
+from decimal import Decimal
+
+from PIL import Image
+
+from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import ImageJob, Recipe
+from recipe.images import RENDITIONS, rendition_names
+
+
+def image_upload_url(recipe_id):
+    return reverse('recipe:recipe-upload-image', args=[recipe_id])
+
+
+def make_image(size=(2000, 1000), fmt='JPEG', exif=True):
+    """Return an uploadable image carrying EXIF data"""
+    image = Image.new('RGB', size, (200, 80, 40))
+    buffer = io.BytesIO()
+    options = {}
+    if exif:
+        data = Image.Exif()
+        data[0x010F] = 'Camera maker'
+        options['exif'] = data.tobytes()
+    image.save(buffer, fmt, **options)
+
+    return SimpleUploadedFile(
+        f'photo.{fmt.lower()}', buffer.getvalue(), f'image/{fmt.lower()}',
+    )
+
+
+def run_worker():
+    call_command(
+        'process_image_jobs', once=True, workers=2, stdout=io.StringIO(),
+        stderr=io.StringIO(),
+    )
+
+
+class ImagePipelineTests(TestCase):
+    """Test uploads queue renditions rendered by process_image_jobs"""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.addCleanup(shutil.rmtree, self.media_root)
+
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'user@example.com', 'test123',
+        )
+        self.client.force_authenticate(self.user)
+        self.recipe = Recipe.objects.create(
+            user=self.user, title='Sample recipe', time_minutes=10,
+            price=Decimal('5.00'),
+        )
+
+    def upload(self, image):
+        return self.client.post(
+            image_upload_url(self.recipe.id), {'image': image},
+            format='multipart',
+        )
+
+    def test_upload_queues_job(self):
+        """Test an upload returns before rendering and queues a job"""
+        res = self.upload(make_image())
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['image_renditions'], {})
+        job = ImageJob.objects.get(recipe=self.recipe)
+        self.assertEqual(job.source, self.recipe.image.name)
+        self.assertEqual(job.status, ImageJob.PENDING)
+
+    def test_worker_renders_renditions(self):
+        """Test renditions are bounded in size and carry no EXIF data"""
+        self.upload(make_image())
+
+        run_worker()
+
+        self.recipe.refresh_from_db()
+        renditions = self.recipe.image_renditions
+        self.assertEqual(set(renditions), set(RENDITIONS))
+        for name, size in RENDITIONS.items():
+            details = renditions[name]
+            self.assertEqual(details['width'], size)
+            self.assertEqual(details['height'], size // 2)
+            stored_names = rendition_names({name: details})
+            self.assertEqual(len(stored_names), 2)
+            for stored in stored_names:
+                with default_storage.open(stored) as f, Image.open(f) as img:
+                    self.assertEqual(img.size, (size, size // 2))
+                    self.assertEqual(len(img.getexif()), 0)
+        self.assertFalse(ImageJob.objects.exists())
+
+    def test_small_image_not_enlarged(self):
+        """Test images smaller than a rendition keep their size"""
+        self.upload(make_image(size=(100, 80), fmt='PNG', exif=False))
+
+        run_worker()
+
+        self.recipe.refresh_from_db()
+        large = self.recipe.image_renditions['large']
+        self.assertEqual((large['width'], large['height']), (100, 80))
+
+    def test_detail_shows_renditions(self):
+        """Test the recipe detail lists the rendered images"""
+        self.upload(make_image())
+        run_worker()
+
+        res = self.client.get(
+            reverse('recipe:recipe-detail', args=[self.recipe.id])
+        )
+
+        self.assertIn('thumbnail', res.data['image_renditions'])
+
+    def test_replaced_image_job_dropped(self):
+        """Test jobs for an image replaced before rendering do nothing"""
+        self.upload(make_image())
+        job = ImageJob.objects.get()
+        self.upload(make_image(size=(300, 300)))
+
+        run_worker()
+
+        self.recipe.refresh_from_db()
+        self.assertFalse(ImageJob.objects.filter(pk=job.pk).exists())
+        self.assertEqual(self.recipe.image_renditions['large']['width'], 300)
+
+    def test_unreadable_image_fails_job(self):
+        """Test a job whose image cannot be decoded is marked failed"""
+        name = default_storage.save(
+            'uploads/recipe/broken.jpg', io.BytesIO(b'not an image'),
+        )
+        Recipe.objects.filter(pk=self.recipe.pk).update(image=name)
+        ImageJob.objects.create(recipe=self.recipe, source=name)
+
+        run_worker()
+
+        job = ImageJob.objects.get()
+        self.assertEqual(job.status, ImageJob.FAILED)
+        self.assertEqual(job.attempts, 1)
+        self.assertIn('UnidentifiedImageError', job.error)
+
+    @override_settings(RECIPE_IMAGE_MAX_PIXELS=100)
+    def test_oversized_image_rejected(self):
+        """Test images with too many pixels are refused"""
+        res = self.upload(make_image(size=(20, 20), exif=False))
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(ImageJob.objects.exists())
@@ -0,0 +1,179 @@
+"""
+Tests for streaming and checking recipe image uploads
+"""
+import io
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from decimal import Decimal
+
+from PIL import Image
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.test.client import MULTIPART_CONTENT, encode_multipart, BOUNDARY
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+from rest_framework.test import (
+    APIClient,
+    APIRequestFactory,
+    force_authenticate,
+)
+
+from core.models import Recipe
+from recipe.uploads import BoundedImageUploadHandler, UploadTooLarge
+from recipe.views import RecipeViewSet
+
+
+def image_upload_url(recipe_id):
+    return reverse('recipe:recipe-upload-image', args=[recipe_id])
+
+
+def rss_growth(func):
+    """Return func's result and the resident memory it added, in bytes
+
+    Resets the process's peak resident set size (VmHWM) first, so the
+    peak covers everything func touches: Python objects as well as
+    Pillow's and other C buffers.
+    """
+    def status(field):
+        with open('/proc/self/status') as lines:
+            for line in lines:
+                if line.startswith(field + ':'):
+                    return int(line.split()[1]) * 1024
+
+    with open('/proc/self/clear_refs', 'w') as clear_refs:
+        clear_refs.write('5')
+    before = status('VmRSS')
+    result = func()
+
+    return result, status('VmHWM') - before
+
+
+def image_bytes(size, fmt='PNG', noise=False):
+    """Return an encoded image, random noise keeps it incompressible"""
+    if noise:
+        image = Image.frombytes('RGB', size, os.urandom(size[0] * size[1] * 3))
+    else:
+        image = Image.new('RGB', size)
+    buffer = io.BytesIO()
+    image.save(buffer, fmt)
+
+    return buffer.getvalue()
+
+
+class ImageUploadTests(TestCase):
+    """Test the upload handler of the upload-image endpoint"""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.addCleanup(shutil.rmtree, self.media_root)
+
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'user@example.com', 'test123',
+        )
+        self.client.force_authenticate(self.user)
+        self.recipe = Recipe.objects.create(
+            user=self.user, title='Sample recipe', time_minutes=10,
+            price=Decimal('5.00'),
+        )
+
+    def upload(self, content, name='photo.png'):
+        upload = io.BytesIO(content)
+        upload.name = name
+        return self.client.post(
+            image_upload_url(self.recipe.id), {'image': upload},
+            format='multipart',
+        )
+
+    def test_upload_valid_image(self):
+        """Test accepted images are stored"""
+        res = self.upload(image_bytes((40, 30)))
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(os.path.exists(self.recipe.image.path))
+
+    def test_wrong_magic_bytes_rejected(self):
+        """Test files not starting like an image are refused"""
+        res = self.upload(b'%PDF-1.4 ' + b'x' * 1000, name='photo.png')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('image', res.data)
+
+    def test_truncated_image_rejected(self):
+        """Test files with an image signature but no image are refused"""
+        res = self.upload(b'\x89PNG\r\n\x1a\n' + b'\0' * 100)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_unsupported_image_format_rejected(self):
+        """Test images Pillow reads but the API does not accept"""
+        res = self.upload(image_bytes((20, 20), fmt='BMP'), name='photo.bmp')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(RECIPE_IMAGE_MAX_BYTES=1000)
+    def test_large_body_rejected_before_reading(self):
+        """Test requests declaring a too large body get a 413"""
+        res = self.upload(image_bytes((200, 200), noise=True))
+
+        self.assertEqual(
+            res.status_code, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        )
+
+    @override_settings(RECIPE_IMAGE_MAX_BYTES=100)
+    def test_large_file_rejected_while_streaming(self):
+        """Test files are cut off once they pass the limit"""
+        handler = BoundedImageUploadHandler()
+        handler.new_file('image', 'photo.png', 'image/png', None)
+        chunk = image_bytes((20, 20), noise=True)[:80]
+        handler.receive_data_chunk(chunk, 0)
+
+        with self.assertRaises(UploadTooLarge):
+            handler.receive_data_chunk(chunk, 80)
+        self.assertTrue(handler.file.closed)
+
+    def test_header_checked_on_first_chunk(self):
+        """Test bad files are refused before the rest arrives"""
+        handler = BoundedImageUploadHandler()
+        handler.new_file('image', 'photo.png', 'image/png', None)
+
+        with self.assertRaises(ValidationError):
+            handler.receive_data_chunk(b'<html>' + b' ' * 100, 0)
+        self.assertTrue(handler.file.closed)
+
+    @unittest.skipUnless(
+        sys.platform.startswith('linux'), 'Reads peak RSS from /proc',
+    )
+    def test_upload_memory_bounded(self):
+        """Test peak process memory stays far below the upload's size"""
+        content = image_bytes((1600, 1600), noise=True)
+        self.assertGreater(len(content), 7 * 2 ** 20)
+        upload = io.BytesIO(content)
+        upload.name = 'photo.png'
+        request = APIRequestFactory().generic(
+            'POST', image_upload_url(self.recipe.id),
+            encode_multipart(BOUNDARY, {'image': upload}),
+            content_type=MULTIPART_CONTENT,
+        )
+        force_authenticate(request, user=self.user)
+        view = RecipeViewSet.as_view({'post': 'upload_image'})
+        size = len(content)
+        del content, upload
+
+        res, growth = rss_growth(lambda: view(request, pk=self.recipe.id))
+        # Without a request handler nobody else closes the upload
+        for upload in res.renderer_context['request'].FILES.values():
+            upload.close()
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertLess(growth, size // 4)
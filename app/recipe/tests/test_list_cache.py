@@ -0,0 +1,109 @@
+"""
+Tests for the cached recipe, tag and ingredient lists
+"""
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag
+
+RECIPE_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+BULK_URL = reverse('recipe:recipe-bulk')
+
+
+def create_recipe(user, **params):
+    """Create and return a sample recipe"""
+    defaults = {
+        'title': 'Sample recipe',
+        'time_minutes': 22,
+        'price': Decimal('5.25'),
+    }
+    defaults.update(params)
+
+    return Recipe.objects.create(user=user, **defaults)
+
+
+class ListCacheTests(TestCase):
+    """Test list responses are cached per user"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com', password='test123',
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_repeated_list_served_from_cache(self):
+        """Test an identical request does not query the database"""
+        create_recipe(user=self.user)
+        first = self.client.get(RECIPE_URL, {'tags': '', 'page_size': 5})
+
+        with self.assertNumQueries(0):
+            second = self.client.get(RECIPE_URL, {'page_size': 5})
+
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertEqual(second.data, first.data)
+
+    def test_cache_keyed_on_user_and_params(self):
+        """Test other users and other params get their own responses"""
+        other = get_user_model().objects.create_user(
+            email='other@example.com', password='test123',
+        )
+        create_recipe(user=self.user, title='Mine')
+        create_recipe(user=other, title='Theirs')
+        self.client.get(RECIPE_URL)
+
+        small = self.client.get(RECIPE_URL, {'page_size': 1, 'search': 'x'})
+        self.client.force_authenticate(other)
+        res = self.client.get(RECIPE_URL)
+
+        self.assertEqual(small.data['results'], [])
+        self.assertEqual(
+            [item['title'] for item in res.data['results']], ['Theirs']
+        )
+
+    def test_writes_invalidate_cached_lists(self):
+        """Test saving, linking and deleting objects refreshes the lists"""
+        recipe = create_recipe(user=self.user)
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        self.client.get(RECIPE_URL)
+        self.client.get(TAGS_URL, {'assigned_only': 1})
+
+        recipe.tags.add(tag)
+        recipes = self.client.get(RECIPE_URL)
+        tags = self.client.get(TAGS_URL, {'assigned_only': 1})
+        self.assertEqual(len(recipes.data['results'][0]['tags']), 1)
+        self.assertEqual(len(tags.data['results']), 1)
+
+        tag.name = 'Vegetarian'
+        tag.save()
+        res = self.client.get(RECIPE_URL)
+        self.assertEqual(
+            res.data['results'][0]['tags'][0]['name'], 'Vegetarian'
+        )
+
+        recipe.delete()
+        res = self.client.get(RECIPE_URL)
+        self.assertEqual(res.data['results'], [])
+
+    def test_bulk_writes_invalidate_cached_lists(self):
+        """Test the bulk endpoint refreshes the lists"""
+        self.client.get(RECIPE_URL)
+        payload = {'create': [
+            {'title': 'Stew', 'time_minutes': 10, 'price': '2.50'},
+        ]}
+
+        self.client.post(BULK_URL, payload, format='json')
+        res = self.client.get(RECIPE_URL)
+
+        self.assertEqual(
+            [item['title'] for item in res.data['results']], ['Stew']
+        )
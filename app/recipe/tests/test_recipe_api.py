@@ -1,22 +1,34 @@
 '''test for recipe model'''
 from decimal import Decimal
+from unittest.mock import patch
+import json
 import tempfile
 import os
 
 from PIL import Image
 
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.db import connection, transaction
+from django.db.models import Prefetch
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
 from rest_framework import status
+from rest_framework.renderers import JSONRenderer
 from rest_framework.test import APIClient
 
 from core.models import Recipe, Tag, Ingredient
 
+from recipe.cache import invalidate_user
+from recipe.export import iter_recipes
+from recipe.pagination import RecipeCursorPagination
+from recipe.search import schedule_search_update
 from recipe.serializers import RecipeSerializer, RecipeDetailSerializer
 
 RECIPE_URL = reverse('recipe:recipe-list')
+BULK_URL = reverse('recipe:recipe-bulk')
+EXPORT_URL = reverse('recipe:recipe-export')
 
 def detail_url(recipe_id):
     """Return recipe detail URL"""
@@ -74,7 +86,7 @@ class PrivateRecipeApiTests(TestCase):
         serializer = RecipeSerializer(recipes, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_recipes_limited_to_user(self):
         """Test retrieving recipes for user"""
@@ -88,7 +100,7 @@ class PrivateRecipeApiTests(TestCase):
         serializer = RecipeSerializer(recipes, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
+        self.assertEqual(len(res.data['results']), 1)
 
     def test_view_recipe_detail(self):
         """Test viewing a recipe detail"""
@@ -362,6 +374,65 @@ class PrivateRecipeApiTests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         self.assertEqual(recipe.ingredients.count(), 0)
 
+    def test_create_recipe_query_count_independent_of_ingredients(self):
+        """Test ingredients are resolved and linked in bulk on create"""
+        Ingredient.objects.create(user=self.user, name='Ingredient 0')
+        payload = {
+            'title': 'Big stew',
+            'time_minutes': 120,
+            'price': Decimal('15.00'),
+            'ingredients': [{'name': f'Ingredient {i}'} for i in range(30)],
+        }
+
+        # Savepoint, recipe insert, ingredient lookup, insert of the
+        # missing ones and re-read, existing links, link insert, release,
+        # then the response's tags and ingredients; the search vector is
+        # updated on commit
+        with self.assertNumQueries(10):
+            res = self.client.post(RECIPE_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        recipe = Recipe.objects.get(id=res.data['id'])
+        self.assertEqual(recipe.ingredients.count(), 30)
+        self.assertEqual(
+            Ingredient.objects.filter(user=self.user).count(), 30
+        )
+
+    def test_create_recipe_with_duplicate_tags(self):
+        """Test repeated tag names are only created and linked once"""
+        payload = {
+            'title': 'Pancakes',
+            'time_minutes': 15,
+            'price': Decimal('3.00'),
+            'tags': [{'name': 'Breakfast'}, {'name': 'Breakfast'}],
+        }
+        res = self.client.post(RECIPE_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 1)
+        recipe = Recipe.objects.get(id=res.data['id'])
+        self.assertEqual(recipe.tags.count(), 1)
+
+    def test_update_recipe_keeps_unchanged_tag_links(self):
+        """Test updating tags only touches the links that changed"""
+        recipe = create_recipe(user=self.user)
+        breakfast = Tag.objects.create(user=self.user, name='Breakfast')
+        lunch = Tag.objects.create(user=self.user, name='Lunch')
+        recipe.tags.add(breakfast, lunch)
+        link = Recipe.tags.through.objects.get(recipe=recipe, tag=breakfast)
+
+        payload = {'tags': [{'name': 'Breakfast'}, {'name': 'Dinner'}]}
+        res = self.client.patch(detail_url(recipe.id), payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(
+            Recipe.tags.through.objects.filter(id=link.id).exists()
+        )
+        self.assertEqual(
+            sorted(tag.name for tag in recipe.tags.all()),
+            ['Breakfast', 'Dinner'],
+        )
+
     def test_filter_by_tags(self):
         """Test filtering recipe by tags."""
         r1 = create_recipe(user= self.user, title="Thai Red Curry")
@@ -380,9 +451,9 @@ class PrivateRecipeApiTests(TestCase):
         serializer3 = RecipeSerializer(r3)
 
         self.assertEqual(rs.status_code, status.HTTP_200_OK)
-        self.assertIn(serializer1.data, rs.data)
-        self.assertIn(serializer2.data, rs.data)
-        self.assertNotIn(serializer3.data, rs.data)
+        self.assertIn(serializer1.data, rs.data['results'])
+        self.assertIn(serializer2.data, rs.data['results'])
+        self.assertNotIn(serializer3.data, rs.data['results'])
 
     def test_filter_by_ingredients(self):
         """Test filtering recipe by ingredients."""
@@ -402,9 +473,492 @@ class PrivateRecipeApiTests(TestCase):
         serializer3 = RecipeSerializer(r3)
 
         self.assertEqual(rs.status_code, status.HTTP_200_OK)
-        self.assertIn(serializer1.data, rs.data)
-        self.assertIn(serializer2.data, rs.data)
-        self.assertNotIn(serializer3.data, rs.data)
+        self.assertIn(serializer1.data, rs.data['results'])
+        self.assertIn(serializer2.data, rs.data['results'])
+        self.assertNotIn(serializer3.data, rs.data['results'])
+
+    def test_list_recipes_query_count_is_constant(self):
+        """Test listing recipes does not run a query per recipe"""
+        tag = Tag.objects.create(user=self.user, name='Dinner')
+        ingredient = Ingredient.objects.create(user=self.user, name='Salt')
+        created = 0
+        for total in [1, 10, 1000]:
+            recipes = Recipe.objects.bulk_create([
+                Recipe(
+                    user=self.user,
+                    title=f'Recipe {i}',
+                    time_minutes=10,
+                    price=Decimal('1.00'),
+                )
+                for i in range(total - created)
+            ])
+            Recipe.tags.through.objects.bulk_create([
+                Recipe.tags.through(recipe=recipe, tag=tag)
+                for recipe in recipes
+            ])
+            Recipe.ingredients.through.objects.bulk_create([
+                Recipe.ingredients.through(
+                    recipe=recipe,
+                    ingredient=ingredient,
+                )
+                for recipe in recipes
+            ])
+            invalidate_user(self.user.id)
+            created = total
+
+            with self.assertNumQueries(3):
+                res = self.client.get(RECIPE_URL, {'page_size': 1000})
+
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertEqual(len(res.data['results']), total)
+
+    def test_list_recipes_paginated_by_cursor(self):
+        """Test walking the recipe list with cursors"""
+        recipes = [create_recipe(user=self.user) for i in range(5)]
+
+        res = self.client.get(RECIPE_URL, {'page_size': 2})
+        seen = [item['id'] for item in res.data['results']]
+        while res.data['next']:
+            res = self.client.get(res.data['next'])
+            seen += [item['id'] for item in res.data['results']]
+
+        self.assertEqual(seen, [recipe.id for recipe in reversed(recipes)])
+
+    def test_list_recipes_page_size_capped(self):
+        """Test the requested page size cannot exceed the maximum"""
+        for i in range(3):
+            create_recipe(user=self.user)
+
+        with patch.object(RecipeCursorPagination, 'max_page_size', 2):
+            res = self.client.get(RECIPE_URL, {'page_size': 50})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['results']), 2)
+        self.assertIsNotNone(res.data['next'])
+
+    def test_view_recipe_detail_query_count(self):
+        """Test retrieving a recipe loads its relations in bulk"""
+        recipe = create_recipe(user=self.user)
+        for i in range(5):
+            recipe.tags.add(Tag.objects.create(user=self.user, name=f'T{i}'))
+            recipe.ingredients.add(
+                Ingredient.objects.create(user=self.user, name=f'I{i}')
+            )
+
+        with self.assertNumQueries(3):
+            res = self.client.get(detail_url(recipe.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['tags']), 5)
+        self.assertEqual(len(res.data['ingredients']), 5)
+
+    def test_filter_by_tags_and_ingredients_unique(self):
+        """Test combined filters return each recipe once"""
+        recipe = create_recipe(user=self.user)
+        tags = [
+            Tag.objects.create(user=self.user, name=name)
+            for name in ['Vegan', 'Quick']
+        ]
+        ingredients = [
+            Ingredient.objects.create(user=self.user, name=name)
+            for name in ['Tofu', 'Rice']
+        ]
+        recipe.tags.add(*tags)
+        recipe.ingredients.add(*ingredients)
+
+        params = {
+            'tags': ','.join(str(tag.id) for tag in tags),
+            'ingredients': ','.join(str(i.id) for i in ingredients),
+        }
+        res = self.client.get(RECIPE_URL, params)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [item['id'] for item in res.data['results']], [recipe.id]
+        )
+
+    def test_filter_by_all_tags(self):
+        """Test tags_match=all keeps recipes having every tag"""
+        vegan = Tag.objects.create(user=self.user, name='Vegan')
+        quick = Tag.objects.create(user=self.user, name='Quick')
+        both = create_recipe(user=self.user, title='Salad')
+        both.tags.add(vegan, quick)
+        one = create_recipe(user=self.user, title='Stew')
+        one.tags.add(vegan)
+
+        params = {'tags': f'{vegan.id},{quick.id}', 'tags_match': 'all'}
+        res = self.client.get(RECIPE_URL, params)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [item['id'] for item in res.data['results']], [both.id]
+        )
+
+    def test_filter_invalid_params(self):
+        """Test malformed filters are rejected"""
+        for params in [
+            {'tags': 'abc'},
+            {'ingredients': '1,x'},
+            {'tags': '1', 'tags_match': 'some'},
+        ]:
+            res = self.client.get(RECIPE_URL, params)
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_search_recipes_ranked(self):
+        """Test search matches all fields, best matches first"""
+        with self.captureOnCommitCallbacks(execute=True):
+            in_title = create_recipe(user=self.user, title='Lemon tart')
+            in_description = create_recipe(
+                user=self.user, title='Tart', description='With lemons',
+            )
+            in_tag = create_recipe(user=self.user, title='Pie')
+            in_tag.tags.add(Tag.objects.create(user=self.user, name='Lemon'))
+            create_recipe(user=self.user, title='Apple pie')
+            other = create_user(email='other@example.com', password='test123')
+            create_recipe(user=other, title='Lemon cake')
+
+        res = self.client.get(RECIPE_URL, {'search': 'lemon'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [item['id'] for item in res.data['results']],
+            [in_title.id, in_description.id, in_tag.id],
+        )
+
+    def test_create_indexes_once(self):
+        """Test a recipe with tags and ingredients is indexed once"""
+        payload = {
+            'title': 'Thai curry', 'time_minutes': 30, 'price': '5.00',
+            'tags': [{'name': 'Thai'}, {'name': 'Dinner'}],
+            'ingredients': [{'name': 'Lime'}],
+        }
+
+        with CaptureQueriesContext(connection) as queries, \
+                self.captureOnCommitCallbacks(execute=True):
+            res = self.client.post(RECIPE_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        updates = [
+            query for query in queries.captured_queries
+            if query['sql'].startswith('UPDATE "core_recipe" SET "search_')
+        ]
+        self.assertEqual(len(updates), 1)
+        search = self.client.get(RECIPE_URL, {'search': 'lime'})
+        self.assertEqual(len(search.data['results']), 1)
+
+    def test_rolled_back_reindex_dropped(self):
+        """Test reindexing scheduled in a rolled back block is dropped"""
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe = create_recipe(user=self.user)
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            with transaction.atomic():
+                schedule_search_update([recipe.id])
+                transaction.set_rollback(True)
+            schedule_search_update([recipe.id])
+
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(callbacks[0].recipe_ids, {recipe.id})
+
+    def test_search_follows_renamed_ingredients(self):
+        """Test the search index tracks changes to linked names"""
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe = create_recipe(user=self.user, title='Soup')
+            ingredient = Ingredient.objects.create(user=self.user, name='Leek')
+            recipe.ingredients.add(ingredient)
+            ingredient.name = 'Fennel'
+            ingredient.save()
+
+        leek = self.client.get(RECIPE_URL, {'search': 'leek'})
+        fennel = self.client.get(RECIPE_URL, {'search': 'fennel'})
+
+        self.assertEqual(leek.data['results'], [])
+        self.assertEqual(
+            [item['id'] for item in fennel.data['results']], [recipe.id]
+        )
+
+    def test_search_paginated_by_rank(self):
+        """Test walking search results with cursors"""
+        with self.captureOnCommitCallbacks(execute=True):
+            for i in range(5):
+                create_recipe(
+                    user=self.user,
+                    title='Curry' if i % 2 else 'Rice',
+                    description='Curry ' * i,
+                )
+
+        res = self.client.get(RECIPE_URL, {'search': 'curry', 'page_size': 2})
+        seen = [item['id'] for item in res.data['results']]
+        while res.data['next']:
+            res = self.client.get(res.data['next'])
+            seen += [item['id'] for item in res.data['results']]
+
+        expected = Recipe.objects.filter(
+            user=self.user, title='Curry',
+        ).union(Recipe.objects.filter(
+            user=self.user, description__contains='Curry',
+        ))
+        self.assertEqual(len(seen), len(set(seen)))
+        self.assertEqual(set(seen), {recipe.id for recipe in expected})
+
+    def test_search_ties_paged_by_keyset(self):
+        """Test recipes of equal rank page by cursor, without offsets"""
+        with self.captureOnCommitCallbacks(execute=True):
+            recipes = [
+                create_recipe(user=self.user, title='Curry') for _ in range(5)
+            ]
+
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(
+                RECIPE_URL, {'search': 'curry', 'page_size': 2},
+            )
+            seen = [item['id'] for item in res.data['results']]
+            while res.data['next']:
+                res = self.client.get(res.data['next'])
+                seen += [item['id'] for item in res.data['results']]
+
+        self.assertEqual(seen, sorted(r.id for r in recipes)[::-1])
+        self.assertFalse(any(
+            'OFFSET' in query['sql'] for query in queries.captured_queries
+        ))
+
+
+class BulkRecipeApiTests(TestCase):
+    """Test the bulk recipe endpoint"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(email='user@example.com', password='test123')
+        self.client.force_authenticate(self.user)
+
+    def _payload(self, count, **params):
+        """Return create items for count recipes"""
+        return [
+            {
+                'title': f'Recipe {i}',
+                'time_minutes': 10,
+                'price': '2.50',
+                'tags': [{'name': 'Dinner'}, {'name': f'Tag {i}'}],
+                'ingredients': [{'name': 'Salt'}],
+                **params,
+            }
+            for i in range(count)
+        ]
+
+    def test_bulk_create_recipes(self):
+        """Test creating recipes with nested tags and ingredients"""
+        res = self.client.post(
+            BULK_URL, {'create': self._payload(3)}, format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([r['status'] for r in res.data['create']], [201] * 3)
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 3)
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 4)
+        self.assertEqual(Ingredient.objects.filter(user=self.user).count(), 1)
+        recipe = Recipe.objects.get(id=res.data['create'][1]['id'])
+        self.assertEqual(recipe.title, 'Recipe 1')
+        self.assertEqual(
+            sorted(tag.name for tag in recipe.tags.all()),
+            ['Dinner', 'Tag 1'],
+        )
+
+    def test_bulk_create_query_count_is_constant(self):
+        """Test the number of queries does not grow with the batch"""
+        with CaptureQueriesContext(connection) as small:
+            self.client.post(
+                BULK_URL, {'create': self._payload(2)}, format='json'
+            )
+        with CaptureQueriesContext(connection) as large:
+            self.client.post(
+                BULK_URL,
+                {'create': self._payload(
+                    200, ingredients=[{'name': 'Pepper'}]
+                )},
+                format='json',
+            )
+
+        self.assertEqual(len(small), len(large))
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 202)
+
+    def test_bulk_create_indexes_recipes_for_search(self):
+        """Test recipes created in bulk can be searched"""
+        res = self.client.post(
+            BULK_URL, {'create': self._payload(2)}, format='json'
+        )
+
+        search = self.client.get(RECIPE_URL, {'search': 'salt dinner'})
+
+        self.assertEqual(
+            sorted(item['id'] for item in search.data['results']),
+            sorted(item['id'] for item in res.data['create']),
+        )
+
+    def test_bulk_create_reports_invalid_items(self):
+        """Test invalid items are reported and valid ones still created"""
+        items = self._payload(2)
+        items[0]['time_minutes'] = 'soon'
+
+        res = self.client.post(BULK_URL, {'create': items}, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['create'][0]['status'], 400)
+        self.assertIn('time_minutes', res.data['create'][0]['errors'])
+        self.assertEqual(res.data['create'][1]['status'], 201)
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 1)
+
+    def test_bulk_update_recipes(self):
+        """Test partially updating recipes and replacing their tags"""
+        recipe = create_recipe(user=self.user, title='Old title')
+        recipe.tags.add(Tag.objects.create(user=self.user, name='Lunch'))
+        other = create_recipe(
+            user=create_user(email='other@example.com', password='test123')
+        )
+        payload = {'update': [
+            {'id': recipe.id, 'title': 'New title', 'tags': [{'name': 'Tea'}]},
+            {'id': other.id, 'title': 'Hijacked'},
+        ]}
+
+        res = self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [r['status'] for r in res.data['update']], [200, 404]
+        )
+        recipe.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual(recipe.title, 'New title')
+        self.assertEqual(recipe.link, 'https://sample.com')
+        self.assertEqual([tag.name for tag in recipe.tags.all()], ['Tea'])
+        self.assertEqual(other.title, 'Sample recipe')
+
+    def test_bulk_delete_recipes(self):
+        """Test deleting recipes only removes the user's own"""
+        recipe = create_recipe(user=self.user)
+        other = create_recipe(
+            user=create_user(email='other@example.com', password='test123')
+        )
+
+        res = self.client.post(
+            BULK_URL, {'delete': [recipe.id, other.id]}, format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [r['status'] for r in res.data['delete']], [204, 404]
+        )
+        self.assertFalse(Recipe.objects.filter(id=recipe.id).exists())
+        self.assertTrue(Recipe.objects.filter(id=other.id).exists())
+
+    def test_bulk_update_rejects_bool_ids(self):
+        """Test true and false are not taken for recipe ids"""
+        recipe = create_recipe(user=self.user)
+
+        res = self.client.post(
+            BULK_URL, {'update': [{'id': True, 'title': 'New'}]},
+            format='json',
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.title, 'Sample recipe')
+
+    def test_bulk_update_rejects_duplicate_ids(self):
+        """Test a recipe can only be updated once per request"""
+        recipe = create_recipe(user=self.user)
+
+        res = self.client.post(BULK_URL, {'update': [
+            {'id': recipe.id, 'title': 'First'},
+            {'id': recipe.id, 'title': 'Second'},
+        ]}, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.title, 'Sample recipe')
+
+    @override_settings(RECIPE_BULK_MAX_ITEMS=2)
+    def test_bulk_rejects_too_many_items(self):
+        """Test requests over the item limit are rejected"""
+        res = self.client.post(
+            BULK_URL, {'create': self._payload(3)}, format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Recipe.objects.filter(user=self.user).exists())
+
+
+class RecipeExportApiTests(TestCase):
+    """Test streaming recipe exports"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(email='user@example.com', password='test123')
+        self.client.force_authenticate(self.user)
+
+    def test_export_recipes_as_ndjson(self):
+        """Test every recipe is exported with its tags and ingredients"""
+        recipe = create_recipe(user=self.user, title='Curry')
+        recipe.tags.add(Tag.objects.create(user=self.user, name='Spicy'))
+        recipe.ingredients.add(
+            Ingredient.objects.create(user=self.user, name='Rice')
+        )
+        create_recipe(user=self.user, title='Soup')
+        create_recipe(
+            user=create_user(email='other@example.com', password='test123')
+        )
+
+        res = self.client.get(EXPORT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res.streaming)
+        self.assertEqual(res['Content-Type'], 'application/x-ndjson')
+        lines = b''.join(res.streaming_content).decode().splitlines()
+        recipes = [json.loads(line) for line in lines]
+        self.assertEqual([r['title'] for r in recipes], ['Curry', 'Soup'])
+        self.assertEqual(recipes[0]['price'], '5.25')
+        self.assertEqual(recipes[0]['tags'], [{
+            'id': recipe.tags.get().id, 'name': 'Spicy',
+        }])
+        self.assertEqual(recipes[0]['ingredients'][0]['name'], 'Rice')
+        self.assertEqual(recipes[1]['tags'], [])
+
+    def test_export_reads_by_keyset(self):
+        """Test exports read bounded chunks by keyset"""
+        recipes = [create_recipe(user=self.user) for _ in range(5)]
+
+        with CaptureQueriesContext(connection) as queries:
+            exported = list(iter_recipes(self.user, chunk_size=2))
+
+        self.assertEqual(
+            [recipe['id'] for recipe in exported],
+            [recipe.id for recipe in recipes],
+        )
+        reads = [
+            query['sql'] for query in queries.captured_queries
+            if query['sql'].startswith('SELECT "core_recipe"."id"')
+        ]
+        self.assertEqual(len(reads), 4)
+        self.assertTrue(all('LIMIT 2' in sql for sql in reads))
+
+    def test_export_spooled_in_asgi_mode(self):
+        """Test exports run their queries in the view under ASGI"""
+        for title in ['Curry', 'Soup']:
+            create_recipe(user=self.user, title=title)
+        expected = b''.join(self.client.get(EXPORT_URL).streaming_content)
+
+        with override_settings(SERVER_MODE='asgi'):
+            res = self.client.get(EXPORT_URL)
+            with self.assertNumQueries(0):
+                content = b''.join(res.streaming_content)
+
+        self.assertEqual(content, expected)
+
+    def test_export_requires_auth(self):
+        """Test exporting requires authentication"""
+        res = APIClient().get(EXPORT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
 
 class RecipeImageUploadTests(TestCase):
     def setUp(self):
@@ -441,18 +995,141 @@ class RecipeImageUploadTests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
 
 
+class SparseFieldsetTests(TestCase):
+    """Test picking response fields with fields= and exclude="""
 
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(email='user@example.com', password='test123')
+        self.client.force_authenticate(self.user)
+        self.recipe = create_recipe(user=self.user)
+        self.recipe.tags.add(Tag.objects.create(user=self.user, name='Vegan'))
 
+    def test_list_only_requested_fields(self):
+        """Test a list with fields= skips other columns and relations"""
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(RECIPE_URL, {'fields': 'id,title'})
 
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            res.data['results'],
+            [{'id': self.recipe.id, 'title': self.recipe.title}],
+        )
+        sql = ' '.join(query['sql'] for query in queries)
+        self.assertNotIn('recipe_tags', sql)
+        self.assertNotIn('"description"', sql)
+        self.assertNotIn('"search_vector"', sql)
+
+    def test_list_exclude_fields(self):
+        """Test exclude= leaves fields out"""
+        res = self.client.get(RECIPE_URL, {'exclude': 'tags,ingredients'})
+
+        item = res.data['results'][0]
+        self.assertNotIn('tags', item)
+        self.assertNotIn('ingredients', item)
+        self.assertEqual(item['title'], self.recipe.title)
+
+    def test_list_without_fields_unchanged(self):
+        """Test the full representation is returned by default"""
+        res = self.client.get(RECIPE_URL)
 
+        serializer = RecipeSerializer([self.recipe], many=True)
+        self.assertEqual(res.data['results'], serializer.data)
 
+    def test_retrieve_requested_fields(self):
+        """Test the detail honours fields= and exclude= together"""
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(
+                detail_url(self.recipe.id),
+                {'fields': 'id,description,tags', 'exclude': 'id'},
+            )
 
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            res.data,
+            {
+                'description': self.recipe.description,
+                'tags': [{'id': self.recipe.tags.get().id, 'name': 'Vegan'}],
+            },
+        )
+        sql = ' '.join(query['sql'] for query in queries)
+        self.assertNotIn('recipe_ingredients', sql)
 
+    def test_unknown_field_rejected(self):
+        """Test naming a field the resource lacks is an error"""
+        res = self.client.get(RECIPE_URL, {'fields': 'id,secret'})
 
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('fields', res.data)
+
+    def test_detail_only_field_not_listable(self):
+        """Test list fields are limited to the list representation"""
+        res = self.client.get(RECIPE_URL, {'fields': 'description'})
 
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
 
+    def test_update_ignores_fields(self):
+        """Test writes always answer with the full representation"""
+        res = self.client.patch(
+            detail_url(self.recipe.id) + '?fields=id', {'title': 'New'},
+        )
 
+        self.assertEqual(res.data['title'], 'New')
+        self.assertIn('tags', res.data)
 
 
+class RecipeListRowsTests(TestCase):
+    """Test lists built from rows match the serializers"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(email='user@example.com', password='test123')
+        self.client.force_authenticate(self.user)
+
+    def test_list_matches_serializer_bytes(self):
+        """Test the list renders exactly as RecipeSerializer would"""
+        tags = [
+            Tag.objects.create(user=self.user, name=f'Tag {i}')
+            for i in range(3)
+        ]
+        for i in range(3):
+            recipe = create_recipe(
+                user=self.user, title=f'Recipe "{i}" \u00e9', link='',
+                price=Decimal('10.50') if i else Decimal('0.00'),
+            )
+            # One by one, as add() links a batch in no particular order
+            for tag in tags[i:]:
+                recipe.tags.add(tag)
+            recipe.ingredients.add(Ingredient.objects.create(
+                user=self.user, name=f'Ingredient {i}',
+            ))
+        # Rows list linked objects in the order they were linked, here
+        # that of their ids
+        recipes = Recipe.objects.filter(user=self.user).order_by(
+            '-id',
+        ).prefetch_related(*(
+            Prefetch(name, queryset=model.objects.order_by('id'))
+            for name, model in [('tags', Tag), ('ingredients', Ingredient)]
+        ))
+
+        res = self.client.get(RECIPE_URL, HTTP_ACCEPT='application/json')
+
+        expected = RecipeSerializer(recipes, many=True).data
+        self.assertEqual(
+            JSONRenderer().render(res.data['results']),
+            JSONRenderer().render(expected),
+        )
+
+    def test_search_list_pages_by_rank(self):
+        """Test search results page through the rank annotation"""
+        with self.captureOnCommitCallbacks(execute=True):
+            for i in range(3):
+                create_recipe(user=self.user, title=f'Bread {i}')
 
+        res = self.client.get(RECIPE_URL, {'search': 'bread', 'page_size': 2})
+        rest = self.client.get(res.data['next'])
 
+        items = res.data['results'] + rest.data['results']
+        ids = [item['id'] for item in items]
+        self.assertEqual(len(set(ids)), 3)
+        self.assertNotIn('search_rank', res.data['results'][0])
@@ -0,0 +1,142 @@
+"""
+Tests for reading from the read replica
+"""
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connections
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.db.routers import (
+    REPLICA,
+    ReplicaRouter,
+    read_from,
+    replica_configured,
+)
+from core.models import Recipe, Tag
+
+RECIPE_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+
+
+def detail_url(recipe_id):
+    """Return recipe detail URL"""
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+def add_replica():
+    """Configure a replica alias mirroring the test database
+
+    Like the test mirror of a configured replica, it has a connection of
+    its own and so, like a lagging replica, does not see rows the test
+    wrote in its still open transaction.
+    """
+    connections.databases[REPLICA] = {
+        **connections['default'].settings_dict,
+        'TEST': {'MIRROR': 'default'},
+    }
+
+
+def remove_replica():
+    """Remove the replica alias added by add_replica()"""
+    connections[REPLICA].close()
+    del connections[REPLICA]
+    del connections.databases[REPLICA]
+
+
+class ReplicaRouterTests(TestCase):
+    """Test the database router"""
+
+    def setUp(self):
+        self.router = ReplicaRouter()
+
+    def test_reads_from_default(self):
+        """Test reads use the default database outside read_from()"""
+        self.assertIsNone(self.router.db_for_read(Recipe))
+
+    def test_read_from(self):
+        """Test reads inside read_from() use its alias"""
+        with read_from(REPLICA):
+            self.assertEqual(self.router.db_for_read(Recipe), REPLICA)
+
+        self.assertIsNone(self.router.db_for_read(Recipe))
+
+    def test_writes_to_default(self):
+        """Test writes use the default database, even in read_from()"""
+        with read_from(REPLICA):
+            self.assertEqual(self.router.db_for_write(Recipe), 'default')
+
+    def test_no_migrations_on_replica(self):
+        """Test migrations are not run on the replica"""
+        self.assertFalse(self.router.allow_migrate(REPLICA, 'core'))
+        self.assertIsNone(self.router.allow_migrate('default', 'core'))
+
+
+class ReplicaReadTests(TestCase):
+    """Test safe requests read from the replica"""
+    databases = '__all__'
+
+    def setUp(self):
+        cache.clear()
+        if not replica_configured():
+            add_replica()
+            self.addCleanup(remove_replica)
+
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com', password='test123',
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.recipe = Recipe.objects.create(
+            user=self.user, title='Sample recipe', time_minutes=5,
+            price=Decimal('5.00'),
+        )
+        Tag.objects.create(user=self.user, name='Vegan')
+
+    @override_settings(REPLICA_STICKY_SECONDS=0)
+    def test_list_reads_replica(self):
+        """Test recipe and tag lists read from the replica"""
+        recipes = self.client.get(RECIPE_URL)
+        tags = self.client.get(TAGS_URL)
+
+        self.assertEqual(recipes.status_code, status.HTTP_200_OK)
+        self.assertEqual(recipes.data['results'], [])
+        self.assertEqual(tags.data['results'], [])
+
+    @override_settings(REPLICA_STICKY_SECONDS=0)
+    def test_retrieve_reads_replica(self):
+        """Test recipe details read from the replica"""
+        res = self.client.get(detail_url(self.recipe.id))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_reads_primary_after_write(self):
+        """Test users read from the primary right after they write"""
+        res = self.client.get(RECIPE_URL)
+
+        self.assertEqual(len(res.data['results']), 1)
+
+    @override_settings(REPLICA_STICKY_SECONDS=0)
+    def test_writes_go_to_primary(self):
+        """Test unsafe requests read and write the primary"""
+        res = self.client.patch(
+            detail_url(self.recipe.id), {'title': 'New title'},
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.title, 'New title')
+
+    @override_settings(REPLICA_STICKY_SECONDS=0)
+    @patch('recipe.routing.replica_configured', return_value=False)
+    def test_without_replica(self, _):
+        """Test reads use the primary when no replica is configured"""
+        res = self.client.get(RECIPE_URL)
+
+        self.assertEqual(len(res.data['results']), 1)
@@ -0,0 +1,92 @@
+"""
+Upload handling for recipe images
+"""
+from django.conf import settings
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from django.utils.translation import gettext_lazy as _
+from rest_framework import status
+from rest_framework.exceptions import APIException, ValidationError
+
+# Leading bytes of each accepted image format
+SIGNATURES = [
+    (b'\xff\xd8\xff', 'JPEG'),
+    (b'\x89PNG\r\n\x1a\n', 'PNG'),
+    (b'GIF87a', 'GIF'),
+    (b'GIF89a', 'GIF'),
+]
+
+# Bytes needed to tell the formats apart, WebP included
+HEADER_SIZE = 12
+
+# Room for the multipart boundaries and headers around the file
+BODY_OVERHEAD = 64 * 2 ** 10
+
+
+class UploadTooLarge(APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = _('Upload is too large.')
+    default_code = 'upload_too_large'
+
+
+def sniff_format(header):
+    """Return the image format the leading bytes belong to, or None"""
+    if header[:4] == b'RIFF' and header[8:12] == b'WEBP':
+        return 'WEBP'
+    for signature, fmt in SIGNATURES:
+        if header.startswith(signature):
+            return fmt
+
+    return None
+
+
+class BoundedImageUploadHandler(TemporaryFileUploadHandler):
+    """Stream uploaded images to disk, rejecting bad files early
+
+    Chunks are written to a temporary file as they arrive, so memory use
+    does not grow with the file. The request is refused before the body
+    is read if its declared length is too large, and the file as soon as
+    its first bytes are not an accepted image format or it passes
+    RECIPE_IMAGE_MAX_BYTES.
+    """
+
+    def handle_raw_input(self, input_data, META, content_length, boundary,
+                         encoding=None):
+        if content_length > settings.RECIPE_IMAGE_MAX_BYTES + BODY_OVERHEAD:
+            raise UploadTooLarge()
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.received = 0
+        self.header = b''
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > settings.RECIPE_IMAGE_MAX_BYTES:
+            self._reject(UploadTooLarge())
+
+        if len(self.header) < HEADER_SIZE:
+            self.header += raw_data[:HEADER_SIZE - len(self.header)]
+            if len(self.header) == HEADER_SIZE:
+                self._check_header()
+
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        if len(self.header) < HEADER_SIZE:
+            self._check_header()
+
+        return super().file_complete(file_size)
+
+    def _check_header(self):
+        if sniff_format(self.header) is None:
+            self._reject(ValidationError({
+                self.field_name: [_(
+                    'Upload a JPEG, PNG, GIF or WebP image.'
+                )],
+            }))
+
+    def _reject(self, exc):
+        # The parser does not clean up after errors other than its own;
+        # closing the temporary file also deletes it
+        self.file.close()
+        raise exc
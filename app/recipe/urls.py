@@ -5,6 +5,7 @@ URL mapping for recipe app
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 
+from core.async_views import read_concurrently_patterns
 from recipe import views
 
 router = DefaultRouter()
@@ -15,5 +16,8 @@ router.register('ingredients', views.IngredientViewSet)
 app_name = 'recipe'
 
 urlpatterns = [
-    path('', include(router.urls)),
+    path('', include(read_concurrently_patterns(
+        router.urls,
+        ['recipe-list', 'recipe-detail', 'tag-list', 'ingredient-list'],
+    ))),
 ]
\ No newline at end of file
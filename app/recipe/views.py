@@ -7,19 +7,58 @@ from drf_spectacular.utils import (
     OpenApiParameter,
     OpenApiTypes,)
 
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Prefetch
+from django.http import StreamingHttpResponse
+
 from rest_framework import viewsets, mixins, status # mixin is used to add list, create, update, delete functionalities
-from rest_framework.authentication import TokenAuthentication
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 
 from core.models import Recipe, Tag, Ingredient
 from recipe import serializers
+from recipe.cache import CachedListMixin
+from recipe.export import NDJSONRenderer, iter_ndjson, spool
+from recipe.filters import filter_assigned, filter_recipes
+from recipe.pagination import (
+    RecipeCursorPagination,
+    RecipeAttrCursorPagination,
+)
+from recipe.routing import ReplicaReadMixin
+from recipe.rows import ValuesListMixin, recipe_rows_to_representation
+from recipe.uploads import BoundedImageUploadHandler
+
+FIELD_PARAMETERS = [
+    OpenApiParameter(
+        name='fields',
+        type=OpenApiTypes.STR,
+        description=(
+            'Comma separated fields to include; unlisted columns and '
+            'relations are not loaded'
+        ),
+    ),
+    OpenApiParameter(
+        name='exclude',
+        type=OpenApiTypes.STR,
+        description='Comma separated fields to leave out',
+    ),
+]
 
 @extend_schema_view(
     list=extend_schema(
         description='List all recipes',
         parameters=[
+            OpenApiParameter(
+                name='search',
+                type=OpenApiTypes.STR,
+                description=(
+                    'Full-text search in titles, descriptions, tags and '
+                    'ingredients; results are ordered by relevance'
+                ),
+            ),
             OpenApiParameter(
                 name='tags',
                 type=OpenApiTypes.STR,
@@ -33,6 +72,19 @@ from recipe import serializers
                 location='query',
                 description='Filter by ingredients',
             ),
+            OpenApiParameter(
+                name='tags_match',
+                type=OpenApiTypes.STR,
+                enum=['any', 'all'],
+                description='Match any (default) or all of the tags',
+            ),
+            OpenApiParameter(
+                name='ingredients_match',
+                type=OpenApiTypes.STR,
+                enum=['any', 'all'],
+                description='Match any (default) or all of the ingredients',
+            ),
+            *FIELD_PARAMETERS,
         ],
     ),
     create=extend_schema(
@@ -40,6 +92,7 @@ from recipe import serializers
     ),
     retrieve=extend_schema(
         description='Retrieve a recipe',
+        parameters=FIELD_PARAMETERS,
     ),
     update=extend_schema(
         description='Update a recipe',
@@ -53,32 +106,89 @@ from recipe import serializers
     upload_image=extend_schema(
         description='Upload an image to a recipe',
     ),
+    bulk=extend_schema(
+        description='Create, update and delete recipes in bulk',
+    ),
+    export=extend_schema(
+        description='Export all recipes as newline-delimited JSON',
+        responses={(200, 'application/x-ndjson'): OpenApiTypes.STR},
+    ),
 )
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(ReplicaReadMixin,
+                    CachedListMixin,
+                    ValuesListMixin,
+                    viewsets.ModelViewSet):
     """Manage recipes in the database"""
     serializer_class = serializers.RecipeSerializer
     queryset = Recipe.objects.all()
-    authentication_classes = [TokenAuthentication]
     permission_classes = [IsAuthenticated]
+    pagination_class = RecipeCursorPagination
+
+    def _get_selected_fields(self):
+        """Return the response fields picked with fields= and exclude="""
+        if self.action not in ('list', 'retrieve'):
+            return None
+        if not hasattr(self, '_selected_fields'):
+            self._selected_fields = self.get_serializer_class().select_fields(
+                self.request.query_params
+            )
 
-    def _params_to_ints(self, qs):
-        """Convert a list of string IDs to a list of integers"""
-        return [int(str_id) for str_id in qs.split(',')]
+        return self._selected_fields
+
+    def _get_prefetch_plan(self, fields):
+        """Return the related lookups to load for a single recipe"""
+        # The tags and ingredients are read together with their link
+        # rows, so a single recipe always costs three queries.
+        return [
+            Prefetch(name, queryset=model.objects.only('id', 'name'))
+            for name, model in [('tags', Tag), ('ingredients', Ingredient)]
+            if name in fields
+        ]
 
     def get_queryset(self):
         """Return objects for the current authenticated user only"""
-        tags = self.request.query_params.get('tags')
-        ingredients = self.request.query_params.get('ingredients')
-        queryset = self.queryset
-        if tags:
-            tag_ids = self._params_to_ints(tags)
-            queryset = queryset.filter(tags__id__in=tag_ids)
-        if ingredients:
-            ingredient_ids = self._params_to_ints(ingredients)
-            queryset = queryset.filter(ingredients__id__in=ingredient_ids)
+        queryset = filter_recipes(self.queryset, self.request.query_params)
+        queryset = queryset.filter(user=self.request.user).order_by('-id')
+        if self.action != 'retrieve':
+            # Lists read .values() rows, see ValuesListMixin
+            return queryset
 
-        return queryset.filter(user=self.request.user).order_by('-id').distinct()
+        # Load only the columns and relations the response shows; the
+        # search vector and unlisted text columns stay in the database
+        fields = self.get_list_fields()
+        columns = [
+            name for name in fields if name not in ('tags', 'ingredients')
+        ]
+
+        return queryset.only('id', *columns).prefetch_related(
+            *self._get_prefetch_plan(fields)
+        )
+
+    def get_list_fields(self):
+        """Return the fields picked by the client, or all of them"""
+        return (
+            self._get_selected_fields()
+            or self.get_serializer_class().Meta.fields
+        )
+
+    def rows_to_representation(self, rows, fields):
+        return recipe_rows_to_representation(rows, fields)
+
+    def get_serializer_context(self):
+        """Pass the fields picked by the client on to the serializer"""
+        context = super().get_serializer_context()
+        context['fields'] = self._get_selected_fields()
+
+        return context
+
+    def initialize_request(self, request, *args, **kwargs):
+        """Stream image uploads to disk, checking them as they arrive"""
+        request = super().initialize_request(request, *args, **kwargs)
+        if self.action == 'upload_image':
+            request.upload_handlers = [BoundedImageUploadHandler(request)]
+
+        return request
 
     def get_serializer_class(self):
         """Return the serializer class for request"""
@@ -86,9 +196,20 @@ class RecipeViewSet(viewsets.ModelViewSet):
             return serializers.RecipeSerializer
         elif self.action == 'upload_image':
             return serializers.RecipeImageSerializer
+        elif self.action == 'bulk':
+            return serializers.RecipeBulkSerializer
 
         return serializers.RecipeDetailSerializer
 
+    def retrieve(self, request, *args, **kwargs):
+        """Return a recipe, or a 304 if the client's copy is current"""
+        parent = super()
+
+        return self.get_conditional_response(
+            request,
+            lambda marker, url: parent.retrieve(request, *args, **kwargs),
+        )
+
     def perform_create(self, serializer):
         """Create a new recipe"""
         serializer.save(user=self.request.user)
@@ -111,6 +232,38 @@ class RecipeViewSet(viewsets.ModelViewSet):
             status=status.HTTP_400_BAD_REQUEST,
         )
 
+    @action(methods=['POST'], detail=False, url_path='bulk')
+    def bulk(self, request):
+        """Create, update and delete many recipes in one request"""
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        results = serializer.save(user=request.user)
+
+        return Response(results, status=status.HTTP_200_OK)
+
+    @action(
+        methods=['GET'],
+        detail=False,
+        url_path='export',
+        renderer_classes=[NDJSONRenderer],
+    )
+    def export(self, request):
+        """Stream all of the user's recipes as newline-delimited JSON"""
+        content = iter_ndjson(request.user)
+        if settings.SERVER_MODE == 'asgi':
+            # Django 3.2 iterates streaming responses on the event loop,
+            # where queries are not allowed, so run them here first
+            content = spool(content)
+
+        response = StreamingHttpResponse(
+            content, content_type=NDJSONRenderer.media_type,
+        )
+        response['Content-Disposition'] = (
+            'attachment; filename="recipes.ndjson"'
+        )
+
+        return response
+
 @extend_schema_view(
     list=extend_schema(
         parameters=[
@@ -126,13 +279,16 @@ class RecipeViewSet(viewsets.ModelViewSet):
         description='Create a new tag',
     ),
 )
-class BaseRecipeAttrViewSet(mixins.UpdateModelMixin,
+class BaseRecipeAttrViewSet(ReplicaReadMixin,
+                 CachedListMixin,
+                 ValuesListMixin,
+                 mixins.UpdateModelMixin,
                  mixins.ListModelMixin,
                  mixins.DestroyModelMixin,
                  viewsets.GenericViewSet):
     """Base viewset for user owned recipe attributes"""
-    authentication_classes = [TokenAuthentication]
     permission_classes = [IsAuthenticated]
+    pagination_class = RecipeAttrCursorPagination
 
     def get_queryset(self):
         """Return objects for the current authenticated user only"""
@@ -141,11 +297,19 @@ class BaseRecipeAttrViewSet(mixins.UpdateModelMixin,
         )
         queryset = self.queryset
         if assigned_only:
-            queryset = queryset.filter(recipe__isnull=False)
+            queryset = filter_assigned(queryset)
 
         return queryset.filter(
             user=self.request.user
-        ).order_by('-name').distinct()
+        ).order_by('-name')
+
+    def perform_update(self, serializer):
+        """Update the object, rejecting names the user already has"""
+        try:
+            with transaction.atomic():
+                serializer.save()
+        except IntegrityError:
+            raise ValidationError({'name': ['This name is already in use.']})
 
 class TagViewSet(BaseRecipeAttrViewSet):
     """Manage tags in the database"""
@@ -0,0 +1,236 @@
+"""
+Authentication classes for the API
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import connection, router, transaction
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import (
+    BaseAuthentication,
+    TokenAuthentication,
+    get_authorization_header,
+)
+
+from user import tokens
+
+
+class LRUCache:
+    """Thread safe, size bounded mapping whose entries expire"""
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return the value of a live entry, or None"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+
+            return value
+
+    def set(self, key, value):
+        """Store a value, evicting the least recently used entries"""
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+local_cache = LRUCache(
+    settings.AUTH_TOKEN_CACHE_SIZE, settings.AUTH_TOKEN_CACHE_TTL,
+)
+
+
+def _token_cache_key(key):
+    # Raw tokens never end up in cache keys, which may be logged
+    return 'auth:token:' + hashlib.sha256(key.encode()).hexdigest()
+
+
+def _user_cache_key(user_id):
+    return f'auth:user:{user_id}'
+
+
+def _get_shared_cache():
+    alias = settings.AUTH_TOKEN_SHARED_CACHE
+    return caches[alias] if alias else None
+
+
+def _get_cached(cache_key, load, local=True):
+    """Return a value from the local or shared cache, or load it
+
+    With local=False the value is only kept in the shared cache, when
+    there is one, so that invalidating it takes effect in all processes.
+    """
+    shared = _get_shared_cache()
+    local = local or shared is None
+    value = local_cache.get(cache_key) if local else None
+    if value is None and shared is not None:
+        value = shared.get(cache_key)
+        if value is not None and local:
+            local_cache.set(cache_key, value)
+
+    if value is None:
+        value = load()
+        if local:
+            local_cache.set(cache_key, value)
+        if shared is not None:
+            shared.set(cache_key, value, settings.AUTH_TOKEN_SHARED_CACHE_TTL)
+
+    return value
+
+
+def _forget(cache_keys):
+    """Drop entries from this process's cache and the shared one"""
+    def forget():
+        for cache_key in cache_keys:
+            local_cache.delete(cache_key)
+        shared = _get_shared_cache()
+        if shared is not None and cache_keys:
+            shared.delete_many(cache_keys)
+
+    forget()
+    if connection.in_atomic_block:
+        # Requests reading the old rows before the commit may cache them
+        # again in the meantime
+        transaction.on_commit(forget)
+
+
+def forget_tokens(keys):
+    """Drop cached lookups of the given token keys"""
+    _forget([_token_cache_key(key) for key in keys])
+
+
+def forget_user_state(user_id):
+    """Drop the cached signed token state of a user"""
+    _forget([_user_cache_key(user_id)])
+
+
+def get_user_state(user_id):
+    """Return the (token_epoch, is_active) pair of a user
+
+    Kept in the shared cache only, when there is one, so deactivation and
+    revocation apply to every process at once.
+    """
+    def load():
+        state = get_user_model().objects.filter(pk=user_id).values_list(
+            'token_epoch', 'is_active',
+        ).first()
+        return state or (None, False)
+
+    return _get_cached(_user_cache_key(user_id), load, local=False)
+
+
+def _user_from_state(user_id, epoch):
+    """Return an active user with only the cached fields loaded
+
+    Other fields are each loaded by a query of their own on first
+    access; views needing them should load the user in one go.
+    """
+    User = get_user_model()
+    return User.from_db(
+        router.db_for_read(User),
+        ['id', 'is_active', 'token_epoch'],
+        [user_id, True, epoch],
+    )
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Token authentication remembering recent token lookups
+
+    Only the id of a token's user is cached, in a per-process LRU cache
+    and, when AUTH_TOKEN_SHARED_CACHE names a cache, in that cache for
+    all processes. The user's active flag comes from get_user_state(),
+    so deactivating a user rejects their tokens everywhere at once. A
+    deleted token drops its entries in this process and the shared
+    cache; other processes may accept it from their own copy for up to
+    AUTH_TOKEN_CACHE_TTL seconds. request.user is built like that of
+    SignedTokenAuthentication.
+    """
+
+    def authenticate_credentials(self, key):
+        model = self.get_model()
+
+        def load():
+            user_id = model.objects.filter(key=key).values_list(
+                'user_id', flat=True,
+            ).first()
+            if user_id is None:
+                raise exceptions.AuthenticationFailed(_('Invalid token.'))
+            return user_id
+
+        user_id = _get_cached(_token_cache_key(key), load)
+        epoch, is_active = get_user_state(user_id)
+        if not is_active:
+            raise exceptions.AuthenticationFailed(
+                _('User inactive or deleted.')
+            )
+
+        token = model.from_db(
+            router.db_for_read(model), ['key', 'user_id'], [key, user_id],
+        )
+        return (_user_from_state(user_id, epoch), token)
+
+
+class SignedTokenAuthentication(BaseAuthentication):
+    """Authenticate signed access tokens: "Authorization: Bearer <token>"
+
+    The signature and expiry are checked by HMAC alone. Revocation is
+    checked against the user's token epoch and active flag, cached like
+    token lookups, so a warm request runs no query at all. request.user
+    is built from the token; fields other than the id load from the
+    database on first access.
+    """
+    keyword = 'Bearer'
+
+    def authenticate(self, request):
+        auth = get_authorization_header(request).split()
+        if not auth or auth[0].lower() != self.keyword.lower().encode():
+            return None
+        if len(auth) != 2:
+            raise exceptions.AuthenticationFailed(
+                _('Invalid token header.')
+            )
+
+        try:
+            token = auth[1].decode()
+        except UnicodeError:
+            raise exceptions.AuthenticationFailed(_('Invalid token.'))
+
+        payload = tokens.read_access_token(token)
+        epoch, is_active = get_user_state(payload['u'])
+        if not is_active or epoch != payload['e']:
+            raise exceptions.AuthenticationFailed(
+                _('Token has been revoked.')
+            )
+
+        return (_user_from_state(payload['u'], epoch), payload)
+
+    def authenticate_header(self, request):
+        return self.keyword
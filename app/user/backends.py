@@ -0,0 +1,111 @@
+"""
+Authentication backends for the user app
+"""
+import os
+import random
+
+from django.conf import settings
+from django.contrib.auth import get_user_model, hashers
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+
+class LoginBusy(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = _('Too many logins in progress, try again shortly.')
+    default_code = 'login_busy'
+
+
+class HashingSlots:
+    """Limit on password hashes in flight across every worker process
+
+    Each hash holds one of `slots` cache keys while it runs. Keys are
+    taken with cache.add(), which is atomic, so all processes sharing
+    the cache (Redis, see REDIS_URL) count against one limit. A login
+    finding every slot taken fails at once with LoginBusy: a burst of
+    logins holds at most `slots` workers and leaves the rest to other
+    requests. Keys expire after `timeout` seconds, so the slots of a
+    killed worker come back.
+    """
+    key_prefix = 'login-hash-slot'
+
+    def __init__(self, slots, timeout):
+        self.slots = slots
+        self.timeout = timeout
+
+    def _acquire(self):
+        """Return the key of a free slot, or None if all are taken"""
+        # Starting at a random slot spreads the attempts over the keys
+        start = random.randrange(self.slots)
+        for i in range(self.slots):
+            key = f'{self.key_prefix}:{(start + i) % self.slots}'
+            added = cache.add(key, os.getpid(), self.timeout)
+            # None: the cache is down and ignores errors; let the
+            # throttles alone guard logins rather than refuse them all
+            if added or added is None:
+                return key
+
+        return None
+
+    def run(self, func, *args):
+        """Return func(*args), computed while holding a slot"""
+        key = self._acquire()
+        if key is None:
+            raise LoginBusy()
+        try:
+            return func(*args)
+        finally:
+            cache.delete(key)
+
+
+hashing_slots = HashingSlots(
+    settings.LOGIN_HASH_SLOTS, settings.LOGIN_HASH_SLOT_TIMEOUT,
+)
+
+
+def _must_update(encoded):
+    """Return True if a hash does not match the preferred hasher"""
+    preferred = hashers.get_hasher('default')
+    hasher = hashers.identify_hasher(encoded)
+
+    return (
+        hasher.algorithm != preferred.algorithm
+        or preferred.must_update(encoded)
+    )
+
+
+class SlottedModelBackend(ModelBackend):
+    """ModelBackend hashing passwords within the shared hashing slots
+
+    Only the hashes hold a slot, not the user lookup. Hashes made with
+    another hasher or other costs are replaced after a successful login.
+    """
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        UserModel = get_user_model()
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+
+        try:
+            user = UserModel._default_manager.get_by_natural_key(username)
+        except UserModel.DoesNotExist:
+            # Hash anyway, so response times do not reveal which emails
+            # have an account
+            hashing_slots.run(hashers.make_password, password)
+            return None
+
+        encoded = user.password
+        valid = hashing_slots.run(hashers.check_password, password, encoded)
+        if not valid or not self.user_can_authenticate(user):
+            return None
+
+        if _must_update(encoded):
+            user.password = hashing_slots.run(hashers.make_password, password)
+            user.save(update_fields=['password'])
+
+        return user
@@ -7,6 +7,8 @@ from django.contrib.auth import get_user_model, authenticate, password_validatio
 from django.utils.translation import gettext as _
 from rest_framework import serializers
 
+from user import tokens
+
 class UserSerializer(serializers.ModelSerializer):
     """Serializer for the users object"""
 
@@ -22,13 +24,21 @@ class UserSerializer(serializers.ModelSerializer):
     def update(self, instance, validated_data):
         """Update a user, setting the password correctly and return it"""
         password = validated_data.pop('password', None)
-        user = super().update(instance, validated_data)
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+        fields = list(validated_data)
+        if password:
+            instance.set_password(password)
+            fields.append('password')
+        # Only the changed fields: a full save would write back the
+        # token epoch loaded with the user, undoing a concurrent revoke
+        instance.save(update_fields=fields)
 
         if password:
-            user.set_password(password)
-            user.save()
+            # A new password signs the user out of every signed token
+            tokens.revoke_tokens(instance)
 
-        return user
+        return instance
 
 class AuthTokenSerializer(serializers.Serializer):
     """Serializer for the user authentication object"""
@@ -56,5 +66,6 @@ class AuthTokenSerializer(serializers.Serializer):
         return attrs
 
 
-
-
+class RefreshTokenSerializer(serializers.Serializer):
+    """Serializer for signed token refresh requests"""
+    refresh = serializers.CharField(trim_whitespace=False)
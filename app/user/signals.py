@@ -0,0 +1,25 @@
+"""
+Signal handlers dropping cached token lookups
+"""
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from user.authentication import forget_tokens, forget_user_state
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(sender, instance, **kwargs):
+    """Stop accepting a deleted token"""
+    forget_tokens([instance.key])
+
+
+@receiver(post_save, sender=get_user_model())
+def user_saved(sender, instance, created, **kwargs):
+    """Reload users whose status, password or profile changed"""
+    if not created:
+        forget_tokens(
+            Token.objects.filter(user=instance).values_list('key', flat=True)
+        )
+        forget_user_state(instance.pk)
@@ -0,0 +1,167 @@
+"""
+Tests for the cached token authentication
+"""
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient, APIRequestFactory
+
+from user.authentication import (
+    CachedTokenAuthentication,
+    LRUCache,
+    _token_cache_key,
+    _user_cache_key,
+    local_cache,
+)
+
+ME_URL = reverse('user:me')
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    """Test token lookups are cached and invalidated"""
+
+    def setUp(self):
+        local_cache.clear()
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email='test@example.com', password='testpass', name='Test',
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def authenticate(self):
+        request = APIRequestFactory().get(
+            ME_URL, HTTP_AUTHORIZATION=f'Token {self.token.key}',
+        )
+        return CachedTokenAuthentication().authenticate(request)
+
+    def test_token_lookup_cached(self):
+        """Test repeated authentication does not query the database"""
+        self.authenticate()
+
+        with self.assertNumQueries(0):
+            user, token = self.authenticate()
+
+        self.assertEqual(user.pk, self.user.pk)
+        self.assertEqual(token.key, self.token.key)
+
+    def test_shared_cache_used_by_other_processes(self):
+        """Test a lookup cached by another process is reused"""
+        self.authenticate()
+        local_cache.clear()
+
+        with self.assertNumQueries(0):
+            user, _ = self.authenticate()
+
+        self.assertEqual(user.pk, self.user.pk)
+
+    @override_settings(AUTH_TOKEN_SHARED_CACHE='')
+    def test_works_without_shared_cache(self):
+        """Test the per-process cache alone"""
+        self.authenticate()
+
+        with self.assertNumQueries(0):
+            self.authenticate()
+        local_cache.clear()
+        with self.assertNumQueries(2):
+            user, _ = self.authenticate()
+
+        self.assertEqual(user.pk, self.user.pk)
+
+    def test_user_not_cached(self):
+        """Test only ids and state are cached, never the user's fields"""
+        self.authenticate()
+
+        self.assertEqual(
+            cache.get(_token_cache_key(self.token.key)), self.user.pk,
+        )
+        self.assertEqual(
+            cache.get(_user_cache_key(self.user.pk)), (0, True),
+        )
+
+    def test_deactivation_seen_by_all_processes(self):
+        """Test deactivation applies despite a warm per-process cache"""
+        self.authenticate()
+        get_user_model().objects.filter(pk=self.user.pk).update(
+            is_active=False,
+        )
+        # What the process saving the user drops from the shared cache
+        cache.delete(_user_cache_key(self.user.pk))
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_password_change_applies(self):
+        """Test a changed password is not served from a cached user"""
+        self.client.get(ME_URL)
+        self.client.patch(ME_URL, {'password': 'newpass123'})
+
+        user, _ = self.authenticate()
+
+        self.assertTrue(user.check_password('newpass123'))
+
+    def test_deleted_token_rejected(self):
+        """Test a deleted token stops working at once"""
+        self.client.get(ME_URL)
+        self.token.delete()
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deactivated_user_rejected(self):
+        """Test deactivating a user revokes its cached token"""
+        self.client.get(ME_URL)
+        self.user.is_active = False
+        self.user.save()
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_profile_update_reloads_user(self):
+        """Test changes to the user are seen by the next request"""
+        self.client.get(ME_URL)
+        self.client.patch(ME_URL, {'name': 'New name'})
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.data['name'], 'New name')
+
+    def test_retrieve_me_loads_user_once(self):
+        """Test the profile is read with one query once tokens are cached"""
+        self.client.get(ME_URL)
+
+        with self.assertNumQueries(1):
+            res = self.client.get(ME_URL)
+
+        self.assertEqual(res.data['email'], 'test@example.com')
+        self.assertEqual(res.data['name'], 'Test')
+
+
+class LRUCacheTests(TestCase):
+    """Test the per-process LRU cache"""
+
+    def test_evicts_least_recently_used(self):
+        """Test the oldest unused entry goes first"""
+        lru = LRUCache(maxsize=2, ttl=60)
+        lru.set('a', 1)
+        lru.set('b', 2)
+        lru.get('a')
+        lru.set('c', 3)
+
+        self.assertEqual(lru.get('a'), 1)
+        self.assertIsNone(lru.get('b'))
+        self.assertEqual(lru.get('c'), 3)
+
+    def test_entries_expire(self):
+        """Test entries are dropped after their TTL"""
+        lru = LRUCache(maxsize=2, ttl=-1)
+        lru.set('a', 1)
+
+        self.assertIsNone(lru.get('a'))
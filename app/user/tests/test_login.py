@@ -0,0 +1,142 @@
+"""
+Tests for password checking and throttling on login
+"""
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model, hashers
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from user import backends
+from user.throttles import LoginEmailThrottle
+
+TOKEN_URL = reverse('user:token')
+SIGNED_TOKEN_URL = reverse('user:signed-token')
+
+
+class LoginTests(TestCase):
+    """Test logins through the hashing slots"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='test@example.com', password='testpass',
+        )
+        self.payload = {'email': 'test@example.com', 'password': 'testpass'}
+
+    def test_login_hashes_in_slot(self):
+        """Test the password is checked while holding a hashing slot"""
+        with patch.object(
+            backends.hashing_slots, 'run', wraps=backends.hashing_slots.run,
+        ) as run:
+            res = self.client.post(TOKEN_URL, self.payload)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        run.assert_called_once_with(
+            hashers.check_password, 'testpass', self.user.password,
+        )
+
+    def test_unknown_email_still_hashes(self):
+        """Test unknown accounts cost as much as wrong passwords"""
+        with patch.object(
+            backends.hashing_slots, 'run', wraps=backends.hashing_slots.run,
+        ) as run:
+            res = self.client.post(
+                TOKEN_URL, {'email': 'nobody@example.com', 'password': 'x'},
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        run.assert_called_once()
+
+    def test_inactive_user_rejected(self):
+        """Test inactive users cannot log in"""
+        self.user.is_active = False
+        self.user.save()
+
+        res = self.client.post(TOKEN_URL, self.payload)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_outdated_hash_replaced_on_login(self):
+        """Test a hash with other costs is upgraded after login"""
+        with override_settings(PASSWORD_PBKDF2_ITERATIONS=1000):
+            self.user.set_password('testpass')
+            self.user.save()
+
+        res = self.client.post(SIGNED_TOKEN_URL, self.payload)
+
+        self.user.refresh_from_db()
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertFalse(backends._must_update(self.user.password))
+        self.assertTrue(self.user.check_password('testpass'))
+
+    def test_full_slots_reject_logins(self):
+        """Test logins beyond the slots in flight get a 503 at once"""
+        slots = backends.HashingSlots(slots=2, timeout=30)
+        # Slots held by other worker processes, through the shared cache
+        for i in range(2):
+            cache.add(f'{slots.key_prefix}:{i}', 1234)
+
+        with patch.object(backends, 'hashing_slots', slots), \
+                patch.object(hashers, 'check_password') as check_password:
+            res = self.client.post(TOKEN_URL, self.payload)
+
+        self.assertEqual(res.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        check_password.assert_not_called()
+
+    def test_slot_released_after_hash(self):
+        """Test a login frees its slot, also when the hash fails"""
+        slots = backends.HashingSlots(slots=1, timeout=30)
+
+        with self.assertRaises(ValueError):
+            slots.run(int, 'not a number')
+        self.assertEqual(slots.run(int, '42'), 42)
+
+        self.assertIsNone(cache.get(f'{slots.key_prefix}:0'))
+
+    def test_slot_expires(self):
+        """Test the slot of a worker killed mid hash comes back"""
+        slots = backends.HashingSlots(slots=1, timeout=30)
+        key = f'{slots.key_prefix}:0'
+        cache.add(key, 1234, timeout=-1)
+
+        self.assertEqual(slots.run(int, '42'), 42)
+
+    def test_email_throttled_before_hashing(self):
+        """Test repeated attempts on an account stop before the hash"""
+        rates = {'login_email': '2/min'}
+        with patch.dict(LoginEmailThrottle.THROTTLE_RATES, rates), \
+                patch.object(backends.hashing_slots, 'run') as run:
+            run.return_value = False
+            for ip in ['10.0.0.1', '10.0.0.2', '10.0.0.3']:
+                res = self.client.post(
+                    TOKEN_URL,
+                    {'email': ' TEST@example.com', 'password': 'wrong'},
+                    REMOTE_ADDR=ip,
+                )
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(run.call_count, 2)
+
+    def test_non_object_body_rejected(self):
+        """Test JSON bodies other than objects get a 400, not a 500"""
+        for body in ([self.payload], 'test@example.com', 42):
+            res = self.client.post(TOKEN_URL, body, format='json')
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_ip_throttled(self):
+        """Test repeated attempts from one address are limited"""
+        rates = {'login_ip': '1/min'}
+        with patch.dict(LoginEmailThrottle.THROTTLE_RATES, rates):
+            self.client.post(SIGNED_TOKEN_URL, self.payload)
+            res = self.client.post(
+                SIGNED_TOKEN_URL,
+                {'email': 'other@example.com', 'password': 'x'},
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
@@ -0,0 +1,203 @@
+"""
+Tests for the signed, expiring tokens
+"""
+import datetime
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient, APIRequestFactory
+
+from core.models import UsedRefreshToken
+from user import tokens
+from user.authentication import SignedTokenAuthentication, local_cache
+from user.serializers import UserSerializer
+
+SIGNED_TOKEN_URL = reverse('user:signed-token')
+REFRESH_URL = reverse('user:token-refresh')
+REVOKE_URL = reverse('user:token-revoke')
+ME_URL = reverse('user:me')
+
+
+class SignedTokenTests(TestCase):
+    """Test issuing, using, refreshing and revoking signed tokens"""
+
+    def setUp(self):
+        local_cache.clear()
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email='test@example.com', password='testpass', name='Test',
+        )
+        self.client = APIClient()
+        res = self.client.post(
+            SIGNED_TOKEN_URL,
+            {'email': 'test@example.com', 'password': 'testpass'},
+        )
+        self.tokens = res.data
+
+    def _use(self, token):
+        """Authenticate the client with a signed token"""
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def test_issue_tokens(self):
+        """Test valid credentials get a token pair"""
+        self.assertEqual(self.tokens['token_type'], 'Bearer')
+        self.assertIn('access', self.tokens)
+        self.assertIn('refresh', self.tokens)
+
+    def test_issue_tokens_invalid_credentials(self):
+        """Test no tokens are issued for a wrong password"""
+        res = self.client.post(
+            SIGNED_TOKEN_URL,
+            {'email': 'test@example.com', 'password': 'wrong'},
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertNotIn('access', res.data)
+
+    def test_access_token_authenticates(self):
+        """Test the access token gives access to the API"""
+        self._use(self.tokens['access'])
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['email'], 'test@example.com')
+
+    def test_verification_runs_no_queries(self):
+        """Test a warm verification needs no database access"""
+        request = APIRequestFactory().get(
+            ME_URL, HTTP_AUTHORIZATION=f'Bearer {self.tokens["access"]}',
+        )
+        SignedTokenAuthentication().authenticate(request)
+
+        with self.assertNumQueries(0):
+            user, _ = SignedTokenAuthentication().authenticate(request)
+
+        self.assertEqual(user.pk, self.user.pk)
+
+    @override_settings(SIGNED_TOKEN_ACCESS_TTL=-1)
+    def test_expired_access_token_rejected(self):
+        """Test access tokens stop working once expired"""
+        self._use(self.tokens['access'])
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_refresh_token_is_not_an_access_token(self):
+        """Test refresh tokens cannot authenticate requests"""
+        self._use(self.tokens['refresh'])
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_refresh_rotates_tokens(self):
+        """Test a refresh token gets a new pair only once"""
+        res = self.client.post(
+            REFRESH_URL, {'refresh': self.tokens['refresh']},
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res.data['refresh'], self.tokens['refresh'])
+
+        reused = self.client.post(
+            REFRESH_URL, {'refresh': self.tokens['refresh']},
+        )
+        self._use(res.data['access'])
+        after_reuse = self.client.get(ME_URL)
+
+        self.assertEqual(reused.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(
+            after_reuse.status_code, status.HTTP_401_UNAUTHORIZED,
+        )
+
+    def test_refresh_reuse_detected_without_cache(self):
+        """Test reuse is detected from the database, not a cache"""
+        self.client.post(REFRESH_URL, {'refresh': self.tokens['refresh']})
+        cache.clear()
+        local_cache.clear()
+
+        reused = self.client.post(
+            REFRESH_URL, {'refresh': self.tokens['refresh']},
+        )
+
+        self.assertEqual(reused.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(UsedRefreshToken.objects.count(), 1)
+
+    def test_expired_uses_cleared(self):
+        """Test records of expired refresh tokens are deleted on refresh"""
+        UsedRefreshToken.objects.create(
+            jti='expired', user=self.user,
+            expires_at=timezone.now() - datetime.timedelta(seconds=1),
+        )
+
+        self.client.post(REFRESH_URL, {'refresh': self.tokens['refresh']})
+
+        self.assertFalse(
+            UsedRefreshToken.objects.filter(jti='expired').exists(),
+        )
+
+    def test_revoke_tokens(self):
+        """Test revoking invalidates issued access and refresh tokens"""
+        self._use(self.tokens['access'])
+
+        res = self.client.post(REVOKE_URL)
+        me = self.client.get(ME_URL)
+        refresh = self.client.post(
+            REFRESH_URL, {'refresh': self.tokens['refresh']},
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(me.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(refresh.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deactivated_user_rejected(self):
+        """Test deactivation revokes cached access at once"""
+        self._use(self.tokens['access'])
+        self.client.get(ME_URL)
+        self.user.is_active = False
+        self.user.save()
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_password_change_revokes_tokens(self):
+        """Test changing the password signs out signed tokens"""
+        self._use(self.tokens['access'])
+
+        self.client.patch(ME_URL, {'password': 'newpassword'})
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_password_change_keeps_concurrent_revoke(self):
+        """Test a password change on a stale user adds to the epoch"""
+        stale = get_user_model().objects.get(pk=self.user.pk)
+        tokens.revoke_tokens(self.user)
+
+        serializer = UserSerializer(
+            stale, data={'password': 'newpassword'}, partial=True,
+        )
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.token_epoch, 2)
+
+    def test_profile_change_keeps_concurrent_revoke(self):
+        """Test updating other fields does not write back the epoch"""
+        stale = get_user_model().objects.get(pk=self.user.pk)
+        tokens.revoke_tokens(self.user)
+
+        serializer = UserSerializer(stale, data={'name': 'New'}, partial=True)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.name, 'New')
+        self.assertEqual(self.user.token_epoch, 1)
@@ -0,0 +1,95 @@
+"""
+Signed, expiring access and refresh tokens
+
+Tokens are django.core.signing payloads carrying the user id and the
+user's token epoch; refresh tokens also carry a unique id, recorded in
+core.models.UsedRefreshToken once exchanged. Bumping the epoch on
+core.models.User revokes every token issued before.
+"""
+import datetime
+import uuid
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.db.models import F
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+
+from core.models import UsedRefreshToken
+
+ACCESS_SALT = 'user.tokens.access'
+REFRESH_SALT = 'user.tokens.refresh'
+
+
+def issue_tokens(user):
+    """Return a new access and refresh token pair for the user"""
+    claims = {'u': user.pk, 'e': user.token_epoch}
+
+    return {
+        'token_type': 'Bearer',
+        'access': signing.dumps(claims, salt=ACCESS_SALT),
+        'refresh': signing.dumps(
+            {**claims, 'j': uuid.uuid4().hex}, salt=REFRESH_SALT,
+        ),
+        'expires_in': settings.SIGNED_TOKEN_ACCESS_TTL,
+    }
+
+
+def _read_token(token, salt, max_age):
+    try:
+        return signing.loads(token, salt=salt, max_age=max_age)
+    except signing.SignatureExpired:
+        raise exceptions.AuthenticationFailed(_('Token has expired.'))
+    except signing.BadSignature:
+        raise exceptions.AuthenticationFailed(_('Invalid token.'))
+
+
+def read_access_token(token):
+    """Return the claims of a valid, unexpired access token"""
+    return _read_token(token, ACCESS_SALT, settings.SIGNED_TOKEN_ACCESS_TTL)
+
+
+def revoke_tokens(user):
+    """Revoke all signed tokens of the user"""
+    user.token_epoch = F('token_epoch') + 1
+    user.save(update_fields=['token_epoch'])
+    user.refresh_from_db(fields=['token_epoch'])
+
+
+def refresh_tokens(refresh):
+    """Exchange a refresh token for a new token pair
+
+    Every refresh token can be used once. Presenting one again means it
+    leaked, so all of the user's tokens are revoked.
+    """
+    claims = _read_token(
+        refresh, REFRESH_SALT, settings.SIGNED_TOKEN_REFRESH_TTL,
+    )
+    user = get_user_model().objects.filter(
+        pk=claims['u'], is_active=True,
+    ).first()
+    if user is None or user.token_epoch != claims['e']:
+        raise exceptions.AuthenticationFailed(_('Token has been revoked.'))
+
+    # The primary key makes recording a use atomic across processes
+    now = timezone.now()
+    _use, first_use = UsedRefreshToken.objects.get_or_create(
+        jti=claims['j'],
+        defaults={
+            'user': user,
+            'expires_at': now + datetime.timedelta(
+                seconds=settings.SIGNED_TOKEN_REFRESH_TTL,
+            ),
+        },
+    )
+    if not first_use:
+        revoke_tokens(user)
+        raise exceptions.AuthenticationFailed(
+            _('Token has already been used.')
+        )
+
+    UsedRefreshToken.objects.filter(user=user, expires_at__lt=now).delete()
+
+    return issue_tokens(user)
@@ -3,12 +3,36 @@ URL mapping for the user app
 """
 from django.urls import path
 
+from core.async_views import login_concurrently, read_concurrently
 from user import views
 
 app_name = 'user'
 
 urlpatterns = [
     path('create/', views.CreateUserView.as_view(), name='create'),
-    path('token/', views.CreateTokenView.as_view(), name='token'),
-    path('me/', views.ManageUserView.as_view(), name='me'),
+    path(
+        'token/',
+        login_concurrently(views.CreateTokenView.as_view()),
+        name='token',
+    ),
+    path(
+        'token/signed/',
+        login_concurrently(views.CreateSignedTokenView.as_view()),
+        name='signed-token',
+    ),
+    path(
+        'token/refresh/',
+        views.RefreshSignedTokenView.as_view(),
+        name='token-refresh',
+    ),
+    path(
+        'token/revoke/',
+        views.RevokeSignedTokensView.as_view(),
+        name='token-revoke',
+    ),
+    path(
+        'me/',
+        read_concurrently(views.ManageUserView.as_view()),
+        name='me',
+    ),
 ]
\ No newline at end of file
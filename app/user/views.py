@@ -2,12 +2,23 @@
 Views for the User API
 """
 
-from rest_framework import generics, authentication, permissions
+from django.contrib.auth import get_user_model
+from drf_spectacular.utils import extend_schema
+
+from rest_framework import generics, permissions, status
 
 from rest_framework.authtoken.views import ObtainAuthToken
+from rest_framework.response import Response
+from rest_framework.views import APIView
 from rest_framework.settings import api_settings
 
-from user.serializers import UserSerializer, AuthTokenSerializer
+from user import tokens
+from user.throttles import LoginEmailThrottle, LoginIPThrottle
+from user.serializers import (
+    UserSerializer,
+    AuthTokenSerializer,
+    RefreshTokenSerializer,
+)
 
 
 
@@ -19,16 +30,54 @@ class CreateTokenView(ObtainAuthToken):
     """Create a new auth token for user"""
     serializer_class = AuthTokenSerializer
     renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
+    throttle_classes = [LoginIPThrottle, LoginEmailThrottle]
+
+
+class CreateSignedTokenView(generics.GenericAPIView):
+    """Create a signed access and refresh token pair for user"""
+    serializer_class = AuthTokenSerializer
+    throttle_classes = [LoginIPThrottle, LoginEmailThrottle]
+
+    def post(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        return Response(tokens.issue_tokens(serializer.validated_data['user']))
+
+
+class RefreshSignedTokenView(generics.GenericAPIView):
+    """Exchange a refresh token for a new signed token pair"""
+    serializer_class = RefreshTokenSerializer
+
+    def post(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        return Response(
+            tokens.refresh_tokens(serializer.validated_data['refresh'])
+        )
+
+
+class RevokeSignedTokensView(APIView):
+    """Revoke every signed token of the authenticated user"""
+    permission_classes = [permissions.IsAuthenticated]
+
+    @extend_schema(request=None, responses={204: None})
+    def post(self, request):
+        tokens.revoke_tokens(request.user)
+
+        return Response(status=status.HTTP_204_NO_CONTENT)
 
 class ManageUserView(generics.RetrieveUpdateAPIView):
     """Manage the authenticated user"""
     serializer_class = UserSerializer
-    authentication_classes = [authentication.TokenAuthentication]
     permission_classes = [permissions.IsAuthenticated]
 
     def get_object(self):
         """Retrieve and return authenticated user"""
-        return self.request.user
+        # request.user only has the fields token authentication caches;
+        # load the others in one query rather than one per field
+        return get_user_model().objects.get(pk=self.request.user.pk)
 
 
 
@@ -0,0 +1,113 @@
+"""
+Load test of the recipe API
+
+Each simulated user signs up, logs in, creates a few recipes and then
+browses them, with about 50 reads for every write like production
+traffic. Run it against the proxy of a deployment started with the
+settings under test:
+
+    pip install -r loadtest/requirements.txt
+    locust -f loadtest/locustfile.py --host http://localhost:8000
+
+Logins are throttled per client address (LOGIN_IP_RATE), so raise the
+rate on the deployment under test when simulating many users from one
+machine.
+"""
+import random
+import uuid
+from decimal import Decimal
+
+from locust import HttpUser, between, task
+
+TAGS = ['Vegan', 'Dessert', 'Quick', 'Dinner', 'Breakfast', 'Spicy']
+INGREDIENTS = [
+    'Salt', 'Pepper', 'Garlic', 'Onion', 'Tomato', 'Basil', 'Rice', 'Egg',
+]
+SEARCHES = ['pasta', 'curry', 'soup', 'cake']
+
+
+def make_recipe():
+    """Return the body of a random recipe"""
+    return {
+        'title': f'{random.choice(SEARCHES).title()} {uuid.uuid4().hex[:8]}',
+        'time_minutes': random.randint(5, 120),
+        'price': str(Decimal(random.randint(100, 5000)) / 100),
+        'link': '',
+        'tags': [{'name': name} for name in random.sample(TAGS, 2)],
+        'ingredients': [
+            {'name': name} for name in random.sample(INGREDIENTS, 4)
+        ],
+    }
+
+
+class RecipeUser(HttpUser):
+    """A signed in user browsing and editing their recipes"""
+    wait_time = between(0.5, 2)
+
+    def on_start(self):
+        email = f'load-{uuid.uuid4().hex}@example.com'
+        password = uuid.uuid4().hex
+        self.client.post('/api/user/create/', json={
+            'email': email, 'password': password, 'name': 'Load test',
+        })
+        res = self.client.post('/api/user/token/', json={
+            'email': email, 'password': password,
+        })
+        self.client.headers['Authorization'] = f'Token {res.json()["token"]}'
+
+        self.recipe_ids = []
+        for _ in range(5):
+            self.create_recipe()
+
+    @task(40)
+    def list_recipes(self):
+        self.client.get('/api/recipe/recipes/')
+
+    @task(8)
+    def list_recipes_filtered(self):
+        self.client.get(
+            '/api/recipe/recipes/',
+            params={'tags': ','.join(random.sample(TAGS, 2))},
+            name='/api/recipe/recipes/?tags=',
+        )
+
+    @task(8)
+    def search_recipes(self):
+        self.client.get(
+            '/api/recipe/recipes/',
+            params={'search': random.choice(SEARCHES)},
+            name='/api/recipe/recipes/?search=',
+        )
+
+    @task(25)
+    def retrieve_recipe(self):
+        self.client.get(
+            f'/api/recipe/recipes/{random.choice(self.recipe_ids)}/',
+            name='/api/recipe/recipes/[id]/',
+        )
+
+    @task(8)
+    def list_tags(self):
+        self.client.get('/api/recipe/tags/')
+
+    @task(8)
+    def list_ingredients(self):
+        self.client.get('/api/recipe/ingredients/')
+
+    @task(3)
+    def retrieve_me(self):
+        self.client.get('/api/user/me/')
+
+    @task(1)
+    def create_recipe(self):
+        res = self.client.post('/api/recipe/recipes/', json=make_recipe())
+        if res.ok:
+            self.recipe_ids.append(res.json()['id'])
+
+    @task(1)
+    def update_recipe(self):
+        self.client.patch(
+            f'/api/recipe/recipes/{random.choice(self.recipe_ids)}/',
+            json={'time_minutes': random.randint(5, 120)},
+            name='/api/recipe/recipes/[id]/',
+        )
@@ -2,5 +2,14 @@
 
 set -e
 
-envsubst < /etc/nginx/default.conf.tpl > /etc/nginx/conf.d/default.conf
-nginx -g 'daemon off;'
\ No newline at end of file
+# SERVER_MODE=asgi proxies over HTTP to the app's ASGI server instead
+# of over the uwsgi protocol
+if [ "$SERVER_MODE" = "asgi" ]; then
+    template=/etc/nginx/default-http.conf.tpl
+else
+    template=/etc/nginx/default.conf.tpl
+fi
+
+envsubst '${LISTEN_PORT} ${APP_HOST} ${APP_PORT}' \
+    < "$template" > /etc/nginx/conf.d/default.conf
+nginx -g 'daemon off;'
@@ -0,0 +1,26 @@
+"""
+gunicorn configuration for SERVER_MODE=asgi, started by run.sh
+
+Serves app.asgi with uvicorn workers over HTTP on the port the proxy
+forwards to. Settings come from the environment.
+"""
+import os
+
+# The loopback port is for the healthcheck's readiness probe, as under
+# uWSGI
+bind = [':9000', '127.0.0.1:9001']
+worker_class = 'uvicorn.workers.UvicornWorker'
+workers = int(os.environ.get('WEB_CONCURRENCY', 4))
+
+# Seconds a worker may stay unresponsive before it is replaced, and
+# may take to finish its requests on shutdown
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 60))
+graceful_timeout = 30
+keepalive = 5
+
+# Recycle workers after this many requests, 0 to disable
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 5000))
+max_requests_jitter = max_requests // 10
+
+# Client addresses come from the proxy's X-Forwarded-For
+forwarded_allow_ips = '*'
@@ -0,0 +1,32 @@
+"""
+Readiness probe of the app container, run by its compose healthcheck
+
+Exits with 0 when the app answers /api/health/ready/ with 200 on the
+loopback port uWSGI and gunicorn listen on for it. The request names
+the first of ALLOWED_HOSTS, as Django refuses other hosts.
+"""
+import os
+import sys
+import urllib.request
+
+URL = 'http://127.0.0.1:9001/api/health/ready/'
+
+
+def main():
+    hosts = [host for host in os.environ.get('ALLOWED_HOSTS', '').split(',')
+             if host]
+    # Patterns like .example.com also match the bare domain
+    host = hosts[0].lstrip('.*') if hosts else ''
+    request = urllib.request.Request(
+        URL, headers={'Host': host or 'localhost'},
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=5):
+            pass
+    except OSError as error:
+        print(error, file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -2,8 +2,40 @@
 
 set -e
 
+# uWSGI settings read by uwsgi.ini
+export UWSGI_WORKERS="${UWSGI_WORKERS:-4}"
+export UWSGI_THREADS="${UWSGI_THREADS:-1}"
+export UWSGI_LAZY_APPS="${UWSGI_LAZY_APPS:-0}"
+export UWSGI_CHEAPER="${UWSGI_CHEAPER:-0}"
+export UWSGI_CHEAPER_INITIAL="${UWSGI_CHEAPER_INITIAL:-$UWSGI_WORKERS}"
+export UWSGI_CHEAPER_STEP="${UWSGI_CHEAPER_STEP:-1}"
+export UWSGI_LISTEN="${UWSGI_LISTEN:-128}"
+export UWSGI_HARAKIRI="${UWSGI_HARAKIRI:-60}"
+export UWSGI_MAX_REQUESTS="${UWSGI_MAX_REQUESTS:-5000}"
+export UWSGI_RELOAD_ON_RSS="${UWSGI_RELOAD_ON_RSS:-512}"
+export UWSGI_MAX_WORKER_LIFETIME="${UWSGI_MAX_WORKER_LIFETIME:-3600}"
+
+# The default cache is private to each process: with several workers,
+# a write would leave the others serving stale cached lists and ETags
+if [ "$SERVER_MODE" = "asgi" ]; then
+    processes="${WEB_CONCURRENCY:-4}"
+else
+    processes="$UWSGI_WORKERS"
+fi
+if [ "$processes" -gt 1 ] && [ -z "$REDIS_URL" ]; then
+    echo "REDIS_URL must be set to run $processes worker processes" >&2
+    exit 1
+fi
+
 python manage.py wait_for_db
-python manage.py collectstatic --noinput
-python manage.py migrate
+# Both are usually up to date already, and independent of each other
+python manage.py collectstatic_if_changed &
+collectstatic=$!
+python manage.py migrate_if_needed
+wait $collectstatic
+
+if [ "$SERVER_MODE" = "asgi" ]; then
+    exec gunicorn app.asgi:application --config /scripts/gunicorn.conf.py
+fi
 
-uwsgi --socket :9000 --workers 4 --master --enable-threads --module app.wsgi
\ No newline at end of file
+exec uwsgi --ini /scripts/uwsgi.ini